@@ -1,9 +1,20 @@
 import { ApplicationConfig, provideZoneChangeDetection } from '@angular/core';
 import { provideRouter } from '@angular/router';
+import { provideHttpClient, withFetch, withInterceptors } from '@angular/common/http';
 
-import { routes } from './app.routes';
-import { provideClientHydration, withEventReplay } from '@angular/platform-browser';
+import { appRoutes } from './app.routes';
+import { provideClientHydration, withEventReplay, withNoHttpTransferCache } from '@angular/platform-browser';
+import { provideAnimations } from '@angular/platform-browser/animations';
+import { jwtInterceptorFn } from './core/interceptors/jwt.interceptor.fn';
 
 export const appConfig: ApplicationConfig = {
-  providers: [provideZoneChangeDetection({ eventCoalescing: true }), provideRouter(routes), provideClientHydration(withEventReplay())]
+  providers: [
+    provideZoneChangeDetection({ eventCoalescing: true }),
+    provideRouter(appRoutes),
+    provideHttpClient(withFetch(), withInterceptors([jwtInterceptorFn])), // fetch: HttpClient on the Node SSR server
+    provideAnimations(),
+    // Routes are prerendered without a user, so there is no API data to hand over; the generic HTTP
+    // transfer cache stays off since it keys on URL alone and would mix users' responses
+    provideClientHydration(withEventReplay(), withNoHttpTransferCache())
+  ]
 };
@@ -75,6 +75,11 @@ export class ApiService {
       return this.http.get<any>(`${this.apiUrl}/profile/`);
    }
 
+   // Dashboard initial state in one request (shared by the dashboards via BootstrapService)
+   getBootstrap(): Observable<any> {
+      return this.http.get<any>(`${this.apiUrl}/bootstrap/`);
+   }
+
    updateProfile(data: any): Observable<any> {
       // Use PUT or PATCH based on your backend endpoint definition
       return this.http.put<any>(`${this.apiUrl}/profile/`, data);
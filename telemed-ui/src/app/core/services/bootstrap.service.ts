@@ -0,0 +1,37 @@
+// src/app/core/services/bootstrap.service.ts
+import { Injectable } from '@angular/core';
+import { Observable } from 'rxjs';
+import { shareReplay } from 'rxjs/operators';
+import { ApiService } from './api.service';
+
+// Shape of GET /api/bootstrap/ (role-specific keys are absent for the other role)
+export interface BootstrapState {
+  profile: any;
+  upcoming_appointments: any[];
+  recent_vitals?: any[]; // Patients
+  doctors?: any[];       // Patients (for booking)
+  patients?: any[];      // Doctors
+}
+
+@Injectable({
+  providedIn: 'root'
+})
+export class BootstrapService {
+  private state$: Observable<BootstrapState> | null = null;
+
+  constructor(private apiService: ApiService) { }
+
+  // One shared request serves every caller until invalidate(). Tokens live in localStorage, so
+  // the server render has no user and this always runs in the browser.
+  load(): Observable<BootstrapState> {
+    if (!this.state$) {
+      this.state$ = this.apiService.getBootstrap().pipe(shareReplay(1));
+    }
+    return this.state$;
+  }
+
+  // Call after changes (booking, new vitals) so the next load() fetches again
+  invalidate(): void {
+    this.state$ = null;
+  }
+}
@@ -4,8 +4,9 @@ import { CommonModule } from '@angular/common';
 import { RouterLink } from '@angular/router';
 import { AuthService, UserInfo } from '../../../core/services/auth.service';
 import { ApiService } from '../../../core/services/api.service';
-import { Observable, forkJoin, of } from 'rxjs';
-import { map, catchError } from 'rxjs/operators';
+import { BootstrapService } from '../../../core/services/bootstrap.service';
+import { Observable, of } from 'rxjs';
+import { map, catchError, finalize } from 'rxjs/operators';
 
 @Component({
   selector: 'app-doctor-dashboard',
@@ -20,14 +21,30 @@ export class DoctorDashboardComponent implements OnInit {
   isLoading = true;
   errorMessage: string | null = null;
 
-  constructor(private authService: AuthService, private apiService: ApiService) { }
+  constructor(private authService: AuthService, private apiService: ApiService, private bootstrapService: BootstrapService) { }
 
   ngOnInit(): void {
     this.authService.currentUser$.subscribe(user => this.currentUser = user);
     this.loadDashboardData();
   }
 
-  loadDashboardData(): void { /* ... same logic ... */ }
+  loadDashboardData(): void {
+    this.isLoading = true;
+    this.errorMessage = null;
+    // Patients and upcoming appointments both come from the bootstrap state (transferred from SSR when available)
+    this.dashboardStats$ = this.bootstrapService.load().pipe(
+      map(state => ({
+        upcomingAppointments: state.upcoming_appointments ?? [],
+        totalPatients: state.patients?.length ?? 0
+      })),
+      catchError(err => {
+        console.error("Error fetching dashboard data:", err);
+        this.errorMessage = "Could not load dashboard data.";
+        return of(null);
+      }),
+      finalize(() => this.isLoading = false)
+    );
+  }
 
   // Fix: Ensure function always returns a string value
   formatDate(dateString: string | null): string {
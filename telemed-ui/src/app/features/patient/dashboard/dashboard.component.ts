@@ -4,7 +4,8 @@ import { CommonModule } from '@angular/common';
 import { RouterLink } from '@angular/router';
 import { AuthService, UserInfo } from '../../../core/services/auth.service';
 import { ApiService } from '../../../core/services/api.service';
-import { Observable, forkJoin, of, Subject, tap } from 'rxjs'; // Import tap
+import { BootstrapService } from '../../../core/services/bootstrap.service';
+import { Observable, of, Subject, tap } from 'rxjs'; // Import tap
 import { map, catchError, takeUntil, finalize } from 'rxjs/operators';
 import { LoadingSpinnerComponent } from '../../../shared/components/loading-spinner/loading-spinner.component';
 
@@ -30,6 +31,7 @@ export class PatientDashboardComponent implements OnInit, OnDestroy {
     constructor(
         private authService: AuthService,
         private apiService: ApiService,
+        private bootstrapService: BootstrapService,
         private cdRef: ChangeDetectorRef
     ) { }
 
@@ -58,33 +60,21 @@ export class PatientDashboardComponent implements OnInit, OnDestroy {
        this.dashboardData = null; // Clear previous data
        this.cdRef.detectChanges(); // Manually trigger change detection for immediate loading state update
 
-       const appointments$ = this.apiService.getAppointments({ status: 'SCHEDULED', limit: 5, ordering: 'appointment_time' }).pipe(
-           tap(data => console.log("Appointments data received:", data)), // Log data received
+       // One request (or none, when the server-rendered page carried the data) instead of two
+       const bootstrap$ = this.bootstrapService.load().pipe(
+           tap(data => console.log("Bootstrap data received:", data)), // Log data received
            catchError(err => {
-               console.error("Error fetching appointments:", err);
-               this.errorMessage = "Could not load upcoming appointments.";
-               return of([]); // Important: return empty array on error for forkJoin
+               console.error("Error fetching dashboard data:", err);
+               this.errorMessage = "Could not load upcoming appointments or recent vitals.";
+               return of(null);
            })
         );
 
-       const vitals$ = this.apiService.getVitals({ limit: 5 }).pipe(
-            tap(data => console.log("Vitals data received:", data)), // Log data received
-            catchError(err => {
-               console.error("Error fetching vitals:", err);
-               if (!this.errorMessage) this.errorMessage = "Could not load recent vitals.";
-               else this.errorMessage += " Could not load recent vitals.";
-               return of([]); // Important: return empty array on error for forkJoin
-           })
-        );
-
-       forkJoin({
-         appointments: appointments$,
-         vitals: vitals$
-       })
+       bootstrap$
        .pipe(
            // Use finalize to guarantee isLoading is set to false
            finalize(() => {
-               console.log("forkJoin finalized. Setting isLoading = false");
+               console.log("Dashboard load finalized. Setting isLoading = false");
                this.isLoading = false;
                this.cdRef.detectChanges(); // Trigger change detection after loading finishes
            }),
@@ -92,18 +82,18 @@ export class PatientDashboardComponent implements OnInit, OnDestroy {
         )
        .subscribe({
            next: (results) => {
-               console.log("forkJoin next - Data received:", results);
+               console.log("Dashboard data received:", results);
                // We can directly assign the results here
                this.dashboardData = {
-                 upcomingAppointments: Array.isArray(results.appointments) ? results.appointments : [],
-                 recentVitals: Array.isArray(results.vitals) ? results.vitals : []
+                 upcomingAppointments: results?.upcoming_appointments ?? [],
+                 recentVitals: results?.recent_vitals ?? []
                };
                // No need to set isLoading false here if using finalize
                // this.isLoading = false;
                // this.cdRef.detectChanges(); // Let finalize handle the final CD trigger
            },
-           error: (err) => { // Catch errors from forkJoin itself (less likely if inner catches work)
-                console.error("Error in forkJoin subscribe:", err);
+           error: (err) => { // Catch errors from the stream itself (less likely if the inner catch works)
+                console.error("Error in dashboard subscribe:", err);
                 this.errorMessage = this.errorMessage || "Failed to load all dashboard data."; // Keep specific errors if they occurred
                 // isLoading is handled by finalize
            }
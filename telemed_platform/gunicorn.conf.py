@@ -0,0 +1,16 @@
+# telemed_platform/gunicorn.conf.py
+# Picked up automatically by `gunicorn telemed_platform.wsgi` run from this directory.
+import multiprocessing
+
+wsgi_app = 'telemed_platform.wsgi:application'
+workers = multiprocessing.cpu_count() * 2 + 1
+
+# Load Django once in the master and fork workers from it: boot cost is paid once,
+# and the loaded code/objects are shared copy-on-write between workers.
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before the first worker is forked
+    from health.startup import preload
+    preload()
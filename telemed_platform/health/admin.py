@@ -1,8 +1,117 @@
 # telemed_platform/health/admin.py
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile, DoctorProfile, PatientProfile, Appointment, HealthRecord
+from django.core.paginator import Paginator
+from django.db import connections, DatabaseError
+from django.forms import Media
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from .models import UserProfile, DoctorProfile, PatientProfile, Appointment, HealthRecord, AccessLog
+
+# health.lifecycle and health.search are imported where used: this module is
+# loaded by admin autodiscovery in every process, including ones that never
+# serve the admin.
+Status = Appointment.StatusChoices
+
+# --- Scalable Changelist Helpers ---
+
+def estimate_row_count(model, using='default'):
+    """
+    Planner/statistics estimate of a table's row count, or None if unavailable.
+    SQLite needs ANALYZE to have populated sqlite_stat1.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql, params = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table]
+    elif connection.vendor == 'sqlite':
+        # First number of the stat column is the table's row count
+        sql, params = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table]
+    elif connection.vendor == 'mysql':
+        sql, params = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", [table]
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None:
+        return None
+    value = int(str(row[0]).split()[0])
+    return value if value >= 0 else None # reltuples is -1 for never-analyzed tables
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the table statistics instead of COUNT(*) for unfiltered changelists on
+    large tables (above ADMIN_ESTIMATED_COUNT_THRESHOLD rows). Filtered
+    changelists still get an exact count.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100_000):
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Foreign-key list filter rendered as an admin autocomplete box. Only the
+    selected object is loaded, never the full list of related rows.
+    """
+    template = 'admin/health/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        # Parameters expected by the admin:autocomplete view
+        self.app_label = model._meta.app_label
+        self.model_name = model._meta.model_name
+        self.field_name = field.name
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def selected_object(self):
+        if not self.lookup_val:
+            return None
+        return self.field.related_model._default_manager.filter(pk=self.lookup_val).first()
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': _('All'),
+        }
+
+
+class ScalableChangeListMixin:
+    """
+    Changelist settings for tables that grow to millions of rows: estimated
+    counts, no full-result COUNT(*), autocomplete filters and a date hierarchy
+    built from MIN/MAX (see templates/admin/health/change_list.html).
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        # Autocomplete assets are normally only pulled in by change-form widgets
+        field = self.model._meta.get_field(self.autocomplete_fields[0])
+        return (
+            super().media
+            + AutocompleteSelect(field, self.admin_site).media
+            + Media(js=['health/admin/autocomplete_filter.js'])
+        )
 
 # --- Inline Admins ---
 
@@ -85,10 +194,12 @@ class PatientProfileAdmin(admin.ModelAdmin):
 
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     list_display = ('patient', 'doctor', 'appointment_time', 'status', 'reason_short')
-    list_filter = ('status', 'doctor', 'patient') # Allow filtering by doctor/patient
-    search_fields = ('patient__username', 'doctor__username', 'reason')
+    list_filter = ('status', ('doctor', AutocompleteFilter), ('patient', AutocompleteFilter)) # Autocomplete instead of listing every user
+    autocomplete_fields = ('patient', 'doctor')
+    actions = ['mark_completed', 'mark_cancelled', 'mark_expired', 'expire_all_stale']
+    search_fields = ('patient__username', 'doctor__username') # reason/notes go through the full-text index
     list_select_related = ('patient', 'doctor') # Optimize queries
     date_hierarchy = 'appointment_time' # Add date navigation
     ordering = ('-appointment_time',)
@@ -99,6 +210,44 @@ class AppointmentAdmin(admin.ModelAdmin):
         ('Timestamps', {'fields': ('created_at', 'updated_at'), 'classes': ('collapse',)}),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        from .search import appointment_ids_matching
+
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        matching_ids = appointment_ids_matching(search_term)
+        if matching_ids is None:
+            # No full-text index on this backend: fall back to LIKE on reason
+            return results | queryset.filter(reason__icontains=search_term), may_have_duplicates
+        if matching_ids:
+            results = results | queryset.filter(pk__in=matching_ids)
+        return results, may_have_duplicates
+
+    # --- Bulk lifecycle actions (batched set-based updates, see health/lifecycle.py) ---
+
+    def _transition_selected(self, request, queryset, to_status):
+        from .lifecycle import transition
+
+        result = transition(queryset, to_status)
+        self.message_user(request, f"{Status(to_status).label}: {result}")
+
+    @admin.action(description='Mark selected scheduled appointments as completed')
+    def mark_completed(self, request, queryset):
+        self._transition_selected(request, queryset, Status.COMPLETED)
+
+    @admin.action(description='Cancel selected scheduled appointments')
+    def mark_cancelled(self, request, queryset):
+        self._transition_selected(request, queryset, Status.CANCELLED)
+
+    @admin.action(description='Expire selected scheduled appointments')
+    def mark_expired(self, request, queryset):
+        self._transition_selected(request, queryset, Status.EXPIRED)
+
+    @admin.action(description='Expire ALL scheduled appointments in the past (ignores selection)')
+    def expire_all_stale(self, request, queryset):
+        from .lifecycle import stale_scheduled
+
+        self._transition_selected(request, stale_scheduled(), Status.EXPIRED)
+
     @admin.display(description='Reason (Short)')
     def reason_short(self, obj):
         # Display a truncated version of the reason
@@ -108,9 +257,10 @@ class AppointmentAdmin(admin.ModelAdmin):
 
 
 @admin.register(HealthRecord)
-class HealthRecordAdmin(admin.ModelAdmin):
+class HealthRecordAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     list_display = ('patient', 'record_time', 'get_bp', 'heart_rate', 'glucose_level', 'temperature')
-    list_filter = ('patient',) # Filter by patient
+    list_filter = (('patient', AutocompleteFilter),) # Filter by patient
+    autocomplete_fields = ('patient',)
     search_fields = ('patient__username', 'notes')
     list_select_related = ('patient',) # Optimize query
     date_hierarchy = 'record_time'
@@ -122,4 +272,24 @@ class HealthRecordAdmin(admin.ModelAdmin):
         # Combine BP fields for display
         if obj.blood_pressure_systolic is not None or obj.blood_pressure_diastolic is not None:
             return f"{obj.blood_pressure_systolic or '-'} / {obj.blood_pressure_diastolic or '-'}"
-        return 'N/A'
\ No newline at end of file
+        return 'N/A'
+
+
+@admin.register(AccessLog)
+class AccessLogAdmin(admin.ModelAdmin):
+    # Append-only: viewable, never edited or deleted here. Search by exact patient/actor id.
+    list_display = ('accessed_at', 'actor_id', 'patient_id', 'resource', 'method', 'endpoint')
+    list_filter = ('resource',)
+    search_fields = ('=patient_id', '=actor_id')
+    ordering = ('-accessed_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
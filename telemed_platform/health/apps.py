@@ -3,4 +3,12 @@ from django.apps import AppConfig
 
 class HealthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'health'
\ No newline at end of file
+    name = 'health'
+
+    def ready(self):
+        # Appointment writes feed the reminder scheduler (see health/changefeed.py)
+        from .changefeed import connect_signals
+        connect_signals()
+        # Ids for sharded rows, and user deletes reaching the shards (see health/sharding.py)
+        from . import sharding
+        sharding.connect_signals()
@@ -0,0 +1,288 @@
+# health/archive.py
+"""
+Archive tier for historical vitals.
+
+HealthRecords older than ``VITALS_ARCHIVE['HORIZON_DAYS']`` are moved out of
+the hot ``HealthRecord`` table into one ``ArchivedVitalsChunk`` per
+patient-month: a zlib-compressed JSON object of parallel columns. Each
+patient-month is archived in its own transaction (insert/merge chunk, delete
+hot rows), so ``manage.py archive_vitals`` can be interrupted and re-run at
+any point and simply continues with whatever is still in the hot table.
+
+Chunks are stored on ``default`` whether or not vitals are sharded. The
+notes of archived readings stay searchable on SQLite (see health/search.py).
+
+Readers get archived readings back as unsaved ``HealthRecord`` instances
+(with their original ids), so serializers do not need to know about tiers.
+``merged_records`` reads both tiers in list order and merges them lazily, so
+a page decodes only the chunks it reaches.
+"""
+import base64
+import heapq
+import json
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import HealthRecord, ArchivedVitalsChunk
+from .search import index_archived_notes
+from .sharding import shard_for, shard_queryset
+
+COLUMNS = [
+    'id', 'record_time', 'blood_pressure_systolic', 'blood_pressure_diastolic',
+    'heart_rate', 'glucose_level', 'temperature', 'notes',
+]
+DECIMAL_COLUMNS = {'glucose_level', 'temperature'}
+NOTES = COLUMNS.index('notes')
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def archive_setting(name, default):
+    return getattr(settings, 'VITALS_ARCHIVE', {}).get(name, default)
+
+
+def archive_cutoff(now=None, horizon_days=None):
+    """Start of the month containing (now - horizon): only whole months are archived."""
+    now = now or timezone.now()
+    if horizon_days is None:
+        horizon_days = archive_setting('HORIZON_DAYS', 365)
+    edge = now - timedelta(days=horizon_days)
+    return edge.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+# --- Encoding ---
+
+def encode_rows(rows):
+    """rows: iterable of tuples in COLUMNS order -> compressed bytes."""
+    columns = {name: [] for name in COLUMNS}
+    for row in rows:
+        for name, value in zip(COLUMNS, row):
+            if name == 'record_time':
+                value = int(value.timestamp() * 1_000_000) # Epoch microseconds
+            elif name in DECIMAL_COLUMNS and value is not None:
+                value = str(value) # Keep the exact decimal
+            columns[name].append(value)
+    return zlib.compress(json.dumps(columns, separators=(',', ':')).encode(), 6)
+
+
+def decode_rows(data):
+    """Compressed bytes -> list of tuples in COLUMNS order."""
+    columns = json.loads(zlib.decompress(bytes(data)))
+    columns['record_time'] = [
+        datetime.fromtimestamp(us / 1_000_000, tz=dt_timezone.utc) for us in columns['record_time']
+    ]
+    for name in DECIMAL_COLUMNS:
+        columns[name] = [Decimal(v) if v is not None else None for v in columns[name]]
+    return list(zip(*(columns[name] for name in COLUMNS)))
+
+
+# --- Writing ---
+
+def _month_of(record_time):
+    return record_time.astimezone(dt_timezone.utc).date().replace(day=1)
+
+
+def _next_month(start):
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def _archive_month(patient_id, month, cutoff):
+    """Move the patient's hot readings of ``month`` (before ``cutoff``) into its chunk. Returns the number moved."""
+    alias = shard_for(patient_id)
+    month_start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    # Chunks live on 'default', hot rows on the patient's shard. The chunk commits first: if the
+    # delete then fails, the rows are in both and a re-run merges them into the chunk again.
+    with transaction.atomic(using=alias), transaction.atomic(using='default'):
+        # Read here, locked until the delete: what is encoded is what is deleted, edits included
+        rows = list(
+            HealthRecord.objects.using(alias).select_for_update()
+            .filter(patient_id=patient_id, record_time__gte=month_start, record_time__lt=min(_next_month(month_start), cutoff))
+            .order_by('record_time')
+            .values_list(*COLUMNS)
+        )
+        if not rows:
+            return 0
+        _write_chunk(patient_id, month, rows)
+        HealthRecord.objects.using(alias).filter(pk__in=[row[0] for row in rows]).delete()
+        # The delete trigger dropped their search index entries
+        index_archived_notes(connections[alias], patient_id, [(row[0], row[NOTES]) for row in rows])
+    return len(rows)
+
+
+def _write_chunk(patient_id, month, rows):
+    chunk = ArchivedVitalsChunk.objects.select_for_update().filter(patient_id=patient_id, month=month).first()
+    if chunk is not None:
+        # Late-arriving readings for an already archived month
+        known = {row[0] for row in rows}
+        rows = [row for row in decode_rows(chunk.data) if row[0] not in known] + list(rows)
+        rows.sort(key=lambda row: row[1])
+    else:
+        chunk = ArchivedVitalsChunk(patient_id=patient_id, month=month)
+
+    chunk.data = encode_rows(rows)
+    chunk.record_count = len(rows)
+    chunk.first_time = rows[0][1]
+    chunk.last_time = rows[-1][1]
+    chunk.min_record_id = min(row[0] for row in rows)
+    chunk.max_record_id = max(row[0] for row in rows)
+    chunk.save()
+
+
+def archive_patient(patient_id, cutoff):
+    """Archive one patient's readings older than ``cutoff``. Returns (months, rows) archived."""
+    times = HealthRecord.objects.for_patient(patient_id).filter(record_time__lt=cutoff).values_list('record_time', flat=True)
+    moved = [_archive_month(patient_id, month, cutoff) for month in sorted({_month_of(t) for t in times})]
+    return sum(1 for rows in moved if rows), sum(moved)
+
+
+def pending_patient_ids(cutoff):
+    """Patients that still have hot readings older than ``cutoff`` (on any shard: in shard order, then by id)."""
+    return shard_queryset(
+        HealthRecord.objects.filter(record_time__lt=cutoff)
+        .order_by('patient_id')
+        .values_list('patient_id', flat=True)
+        .distinct()
+    )
+
+
+def archived_notes(alias):
+    """(patient_id, [(id, notes), ...]) per chunk of the patients on shard ``alias``, to re-index."""
+    for chunk in ArchivedVitalsChunk.objects.order_by('patient_id', 'month').iterator():
+        if shard_for(chunk.patient_id) == alias:
+            yield chunk.patient_id, [(row[0], row[NOTES]) for row in decode_rows(chunk.data) if row[NOTES]]
+
+
+# --- Reading ---
+
+def chunk_records(chunk, users, start=None, end=None):
+    patient = users.get(chunk.patient_id)
+    records = []
+    for row in decode_rows(chunk.data):
+        record_time = row[1]
+        if (start and record_time < start) or (end and record_time >= end):
+            continue
+        record = HealthRecord(patient_id=chunk.patient_id, **dict(zip(COLUMNS, row)))
+        if patient is not None:
+            record.patient = patient # Avoid a query per record for patient.username
+        records.append(record)
+    return records
+
+
+def archived_chunks(patient_ids, start=None, end=None):
+    """Chunks of ``patient_ids`` that may hold readings within [start, end)."""
+    chunks = ArchivedVitalsChunk.objects.filter(patient_id__in=patient_ids)
+    if start:
+        chunks = chunks.filter(last_time__gte=start)
+    if end:
+        chunks = chunks.filter(first_time__lt=end)
+    return chunks
+
+
+def get_archived_record(pk, patient_ids):
+    """A single archived reading by its original id, or None."""
+    chunks = ArchivedVitalsChunk.objects.filter(
+        patient_id__in=patient_ids, min_record_id__lte=pk, max_record_id__gte=pk,
+    ).select_related('patient')
+    for chunk in chunks:
+        for record in chunk_records(chunk, {chunk.patient_id: chunk.patient}):
+            if record.pk == pk:
+                return record
+    return None
+
+
+# --- Merged Reads (both tiers, in list order) ---
+
+def encode_list_cursor(record):
+    """Cursor past ``record``: its (patient id, time, id) position in the list."""
+    raw = json.dumps([record.patient_id, (record.record_time - EPOCH) // MICROSECOND, record.pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_list_cursor(value):
+    """Cursor string -> (patient_id, record_time, id); raises ValueError if malformed."""
+    try:
+        patient_id, micros, pk = json.loads(base64.urlsafe_b64decode(value.encode()))
+        return int(patient_id), EPOCH + int(micros) * MICROSECOND, int(pk)
+    except (TypeError, ValueError, OverflowError) as exc: # JSONDecodeError and binascii.Error are ValueErrors
+        raise ValueError('Invalid cursor.') from exc
+
+
+def _list_rank(patient_ids):
+    """Each row's patient's position in ``patient_ids``, to ORDER BY."""
+    whens = [When(patient_id=patient_id, then=Value(rank)) for rank, patient_id in enumerate(patient_ids)]
+    return Case(*whens, output_field=IntegerField())
+
+
+def _later_patients(patient_ids, cursor):
+    return patient_ids[patient_ids.index(cursor[0]) + 1:] # ValueError: not one of the caller's patients
+
+
+def _hot_in_order(hot, patients, cursor, limit):
+    patient_ids = list(patients)
+    if cursor:
+        patient_id, when, pk = cursor
+        after = Q(patient_id=patient_id) & (Q(record_time__lt=when) | Q(record_time=when, pk__lt=pk))
+        hot = hot.filter(after | Q(patient_id__in=_later_patients(patient_ids, cursor)))
+    if len(patient_ids) > 1:
+        hot = hot.annotate(list_rank=_list_rank(patient_ids)).order_by('list_rank', '-record_time', '-pk')
+    else:
+        hot = hot.order_by('-record_time', '-pk')
+    for record in hot[:limit]:
+        record.patient = patients[record.patient_id] # Avoid a query per record for patient.username
+        yield record
+
+
+def _archived_in_order(patients, start, end, cursor, lazy):
+    patient_ids = list(patients)
+    chunks = archived_chunks(patient_ids, start, end)
+    if cursor:
+        patient_id, when, _ = cursor
+        chunks = chunks.filter(Q(patient_id=patient_id, first_time__lte=when) | Q(patient_id__in=_later_patients(patient_ids, cursor)))
+    if len(patient_ids) > 1:
+        chunks = chunks.annotate(list_rank=_list_rank(patient_ids)).order_by('list_rank', '-month')
+    else:
+        chunks = chunks.order_by('-month') # A patient's months don't overlap: newest chunk holds the newest readings
+    if lazy:
+        chunks = chunks.defer('data') # Loaded per chunk, when the merge reaches it
+    for chunk in chunks.iterator():
+        records = chunk_records(chunk, patients, start, end)
+        records.sort(key=lambda r: (r.record_time, r.pk), reverse=True)
+        for record in records:
+            if cursor and record.patient_id == cursor[0] and (record.record_time, record.pk) >= cursor[1:]:
+                continue
+            yield record
+
+
+def merged_records(hot, patients, start=None, end=None, cursor=None, page_size=None):
+    """
+    Readings of ``patients`` ({id: User}, in list order) within [start, end)
+    from both tiers: by patient in that order, newest first. ``hot`` is the
+    caller's HealthRecord queryset (or ShardQuerySet), already range-filtered.
+    Each tier is read from the database in list order and the two are merged
+    lazily: a page reads at most ``page_size + 1`` hot rows and decodes only
+    the chunks it reaches. Returns (records, cursor of the next page or None);
+    without ``page_size``, all records. Raises ValueError for a cursor on
+    another caller's patient.
+    """
+    if not patients:
+        return [], None
+    ranks = {patient_id: rank for rank, patient_id in enumerate(patients)}
+    limit = page_size + 1 if page_size else None
+    merged = heapq.merge(
+        _hot_in_order(hot, patients, cursor, limit),
+        _archived_in_order(patients, start, end, cursor, lazy=page_size is not None),
+        key=lambda r: (ranks[r.patient_id], -((r.record_time - EPOCH) // MICROSECOND), -r.pk),
+    )
+    records = list(islice(merged, limit))
+    if page_size and len(records) > page_size:
+        records = records[:page_size]
+        return records, encode_list_cursor(records[-1])
+    return records, None
@@ -0,0 +1,201 @@
+# health/audit.py
+"""
+Access audit log: who read which patient's vitals, appointments or listing,
+when, and through which endpoint (``AccessLog``, append-only).
+
+Recording must not add a database write to every read, so events go into a
+per-process in-memory buffer and are inserted in batches with ``bulk_create``:
+
+- a background flusher thread writes the buffer once it holds ``BATCH_SIZE``
+  events, or once the oldest buffered event is ``FLUSH_INTERVAL`` seconds old;
+- backpressure: a request that finds ``MAX_BUFFER`` events waiting writes the
+  buffer out itself before returning, so memory stays bounded and no event is
+  ever dropped (if the database is down, those requests fail instead);
+- the buffer is flushed at interpreter exit (in serving processes).
+
+The flusher is started by the WSGI/ASGI entry points (``enable_background()``).
+Without it (management commands, tests) the recording request flushes
+whenever ``BATCH_SIZE`` is reached, and ``flush()`` can be called directly.
+Reads of a patient's own data are not logged unless ``INCLUDE_SELF`` is set.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BATCH_SIZE': 500,        # Events per INSERT batch; a full batch is flushed right away
+    'FLUSH_INTERVAL': 1.0,    # Max seconds an event waits in the buffer (with the flusher running)
+    'MAX_BUFFER': 10_000,     # Backpressure threshold
+    'INCLUDE_SELF': False,    # Also log patients reading their own data
+}
+
+
+def audit_setting(name):
+    return getattr(settings, 'AUDIT_LOG', {}).get(name, DEFAULTS[name])
+
+
+class AuditBuffer:
+    def __init__(self):
+        self._background = False
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock() # One writer at a time keeps insert order
+        self._events = []
+        self._oldest = None # monotonic() when the oldest buffered event arrived
+        self._thread = None
+
+    def enable_background(self):
+        """Flush from a background thread (started on first use in each process), and at exit."""
+        if not self._background:
+            self._background = True
+            atexit.register(self._flush_at_exit)
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Audit log flush at exit failed; %d events lost", len(self))
+
+    def __len__(self):
+        return len(self._events)
+
+    # --- Producers ---
+
+    def record(self, actor_id, patient_ids, resource, method, endpoint, object_id=None):
+        accessed_at = timezone.now()
+        events = [(actor_id, patient_id, resource, object_id, method, endpoint[:255], accessed_at)
+                  for patient_id in patient_ids]
+        if not events:
+            return
+        with self._lock:
+            first = not self._events
+            self._events.extend(events)
+            size = len(self._events)
+            if first:
+                self._oldest = time.monotonic()
+            if first or size >= audit_setting('BATCH_SIZE'):
+                self._wakeup.notify() # Start the interval timer, or flush a full batch now
+        if size >= audit_setting('MAX_BUFFER') or (not self._background and size >= audit_setting('BATCH_SIZE')):
+            self.flush()
+        elif self._background:
+            self._ensure_flusher()
+
+    # --- Writing ---
+
+    def flush(self):
+        """Insert everything buffered so far; returns the number of events written."""
+        from .models import AccessLog
+
+        with self._flush_lock:
+            with self._lock:
+                events, self._events, self._oldest = self._events, [], None
+            if not events:
+                return 0
+            try:
+                AccessLog.objects.bulk_create([
+                    AccessLog(actor_id=actor_id, patient_id=patient_id, resource=resource, object_id=object_id,
+                              method=method, endpoint=endpoint, accessed_at=accessed_at)
+                    for actor_id, patient_id, resource, object_id, method, endpoint, accessed_at in events
+                ], batch_size=audit_setting('BATCH_SIZE'))
+            except Exception:
+                with self._lock: # Put them back in front; the next flush retries
+                    self._events[:0] = events
+                    self._oldest = time.monotonic()
+                raise
+            return len(events)
+
+    def clear(self):
+        """Drop buffered events without writing them (tests)."""
+        with self._lock:
+            self._events, self._oldest = [], None
+
+    def _due(self):
+        if not self._events:
+            return False
+        return (len(self._events) >= audit_setting('BATCH_SIZE')
+                or time.monotonic() - self._oldest >= audit_setting('FLUSH_INTERVAL'))
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._due():
+                    timeout = None
+                    if self._events:
+                        timeout = max(self._oldest + audit_setting('FLUSH_INTERVAL') - time.monotonic(), 0.01)
+                    self._wakeup.wait(timeout)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit log flush failed; retrying")
+                time.sleep(audit_setting('FLUSH_INTERVAL'))
+            finally:
+                connections.close_all() # This thread's connections only
+
+
+audit_log = AuditBuffer()
+# A forked worker starts with an empty buffer and its own locks; the flusher thread does not survive fork
+os.register_at_fork(after_in_child=audit_log._reset)
+
+
+def enable_background():
+    audit_log.enable_background()
+
+
+def record_reads(request, resource, patient_ids, object_id=None):
+    """Log that ``request.user`` read ``resource`` data of each of ``patient_ids``."""
+    actor_id = request.user.id
+    if not audit_setting('INCLUDE_SELF'):
+        patient_ids = [patient_id for patient_id in patient_ids if patient_id != actor_id]
+    audit_log.record(actor_id, patient_ids, resource, request.method, request.path, object_id)
+
+
+class AuditedReadMixin:
+    """
+    Logs every object a GET renders: the serializer is the one point that list,
+    retrieve and custom read paths all go through. ``audit_patient_field`` is the
+    attribute holding the patient's user id.
+    """
+    audit_resource = None
+    audit_patient_field = 'patient_id'
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if args and self.request.method in ('GET', 'HEAD'):
+            if kwargs.get('many'):
+                patient_ids = {getattr(obj, self.audit_patient_field) for obj in args[0]}
+                record_reads(self.request, self.audit_resource, sorted(patient_ids))
+            else:
+                obj = args[0]
+                record_reads(self.request, self.audit_resource, [getattr(obj, self.audit_patient_field)], obj.pk)
+        return serializer
+
+
+def access_history(patient_id, start=None, end=None):
+    """A patient's access log, newest first, optionally limited to [start, end) (uses the patient/time index)."""
+    from .models import AccessLog
+
+    queryset = AccessLog.objects.filter(patient_id=patient_id)
+    if start:
+        queryset = queryset.filter(accessed_at__gte=start)
+    if end:
+        queryset = queryset.filter(accessed_at__lt=end)
+    return queryset.order_by('-accessed_at', '-id')
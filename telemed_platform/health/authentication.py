@@ -0,0 +1,63 @@
+# health/authentication.py
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from rest_framework.authentication import BaseAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .hashing import hash_password, verify_password
+from .revocation import revocations, claims_cache
+
+
+class RevocationAwareJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with a decoded-claims cache and an in-memory revocation
+    check. Neither step touches the database on the request path.
+    """
+    def get_validated_token(self, raw_token):
+        cache_key = raw_token.decode() if isinstance(raw_token, bytes) else raw_token
+        token = claims_cache.get(cache_key)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            claims_cache.put(cache_key, token)
+
+        if revocations.is_revoked(
+            token.payload.get(settings.SIMPLE_JWT['JTI_CLAIM']),
+            token.payload.get(settings.SIMPLE_JWT['USER_ID_CLAIM']),
+            token.payload.get('iat'),
+        ):
+            raise InvalidToken({'detail': 'Token has been revoked.', 'code': 'token_revoked'})
+        return token
+
+
+class BatchSubRequestAuthentication(BaseAuthentication):
+    """
+    Authenticates a ``/api/batch/`` sub-request as the batch caller, whose
+    token was checked once for the batch (see health/batch.py). Only requests
+    built in-process by the batch carry ``batch_credentials``.
+    """
+    def authenticate(self, request):
+        return getattr(request._request, 'batch_credentials', None)
+
+
+class PooledPasswordBackend(ModelBackend):
+    """
+    ModelBackend that verifies passwords through the hashing policy in
+    health/hashing.py (bounded pool + rehash-on-login).
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords
+            hash_password(password)
+            return None
+        if verify_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,176 @@
+# health/batch.py
+"""
+``POST /api/batch/``: several API calls in one round trip.
+
+Body::
+
+    {"requests": [
+        {"id": "me", "method": "GET", "path": "/api/profile/"},
+        {"id": "book", "method": "POST", "path": "/api/appointments/", "body": {...},
+         "headers": {"Idempotency-Key": "..."}}
+    ]}
+
+Each sub-request is dispatched in-process to the view its path resolves to,
+authenticated as the batch caller (the token is checked once, for the batch
+itself); permissions and throttles still apply per sub-request. Runs of
+consecutive read-only sub-requests (GET/HEAD/OPTIONS) execute concurrently in
+a thread pool; a write waits for everything before it and blocks everything
+after it, so writes keep the order the client gave. The result has one
+``{"id", "status", "body"}`` entry per sub-request, in request order.
+"""
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger('django.request')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+ALLOWED_METHODS = SAFE_METHODS + ('POST', 'PUT', 'PATCH', 'DELETE')
+
+DEFAULTS = {
+    'MAX_OPERATIONS': 20,
+    'MAX_WORKERS': 4,       # Threads for concurrent read-only sub-requests (1 = run inline)
+    'PATH_PREFIX': '/api/',
+    # Routes that make no sense inside a batch (they authenticate, are batches themselves or take file bodies)
+    'EXCLUDED_URL_NAMES': ['batch', 'auth_register', 'token_obtain_pair', 'token_refresh', 'auth_logout', 'user_import'],
+    # Per-item headers passed through to the sub-request; credentials always come from the batch
+    'ALLOWED_HEADERS': ['Idempotency-Key', 'X-Device-Id', 'Accept-Language'],
+}
+
+
+def batch_setting(name):
+    return getattr(settings, 'API_BATCH', {}).get(name, DEFAULTS[name])
+
+
+class BatchError(ValueError):
+    """The batch body itself is malformed (reported as a 400 for the whole batch)."""
+
+
+def parse_operations(data):
+    """Validate the batch body; returns a list of normalized operation dicts."""
+    operations = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise BatchError("'requests' must be a non-empty list.")
+    if len(operations) > batch_setting('MAX_OPERATIONS'):
+        raise BatchError(f"At most {batch_setting('MAX_OPERATIONS')} requests per batch.")
+
+    allowed_headers = {name.lower(): name for name in batch_setting('ALLOWED_HEADERS')}
+    normalized = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or not isinstance(operation.get('path'), str):
+            raise BatchError(f"Request {index}: an object with a 'path' is required.")
+        method = str(operation.get('method', 'GET')).upper()
+        if method not in ALLOWED_METHODS:
+            raise BatchError(f"Request {index}: unsupported method {method}.")
+        headers = operation.get('headers') or {}
+        if not isinstance(headers, dict) or any(name.lower() not in allowed_headers for name in headers):
+            raise BatchError(f"Request {index}: only these headers are allowed: {', '.join(allowed_headers.values())}.")
+        normalized.append({
+            'id': operation.get('id', index),
+            'method': method,
+            'path': operation['path'],
+            'body': operation.get('body'),
+            'headers': headers,
+        })
+    return normalized
+
+
+def _sub_request(parent, operation):
+    """A Django HttpRequest for one operation, sharing the parent's client metadata and credentials."""
+    path, _, query = operation['path'].partition('?')
+    body = b'' if operation['body'] is None else json.dumps(operation['body']).encode()
+
+    request = HttpRequest()
+    request.META = {
+        key: value for key, value in parent.META.items()
+        if not key.startswith('HTTP_') or key in ('HTTP_HOST', 'HTTP_USER_AGENT', 'HTTP_X_FORWARDED_FOR')
+    }
+    request.META.update({
+        'REQUEST_METHOD': operation['method'],
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(body),
+    })
+    for name, value in operation['headers'].items():
+        request.META['HTTP_' + name.upper().replace('-', '_')] = str(value)
+    request.method = operation['method']
+    request.path = request.path_info = path
+    request.GET = QueryDict(query)
+    request._stream = io.BytesIO(body)
+    request._read_started = False
+    request._dont_enforce_csrf_checks = True # Token-authenticated, like the batch itself
+    request.batch_credentials = (parent.user, parent.auth) # Picked up by BatchSubRequestAuthentication
+    return request
+
+
+def _dispatch(parent, operation):
+    path = operation['path'].partition('?')[0]
+    if not path.startswith(batch_setting('PATH_PREFIX')):
+        return {'id': operation['id'], 'status': 400, 'body': {'detail': 'Only API paths can be batched.'}}
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {'id': operation['id'], 'status': 404, 'body': {'detail': 'Not found.'}}
+    if match.url_name in batch_setting('EXCLUDED_URL_NAMES'):
+        return {'id': operation['id'], 'status': 400, 'body': {'detail': 'This endpoint cannot be batched.'}}
+
+    request = _sub_request(parent, operation)
+    request.resolver_match = match
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    except Exception:
+        # One failing item must not lose the results of the others
+        logger.exception("Batch sub-request failed: %s %s", operation['method'], path)
+        return {'id': operation['id'], 'status': 500, 'body': {'detail': 'Internal server error.'}}
+    if hasattr(response, 'data'):
+        body = response.data # DRF response: use the data as is, rendering it happens once for the whole batch
+    else:
+        content = response.content if not response.streaming else b''.join(response.streaming_content)
+        try:
+            body = json.loads(content) if content else None
+        except ValueError:
+            body = content.decode(errors='replace')
+    return {'id': operation['id'], 'status': response.status_code, 'body': body}
+
+
+def _dispatch_in_thread(parent, operation):
+    try:
+        return _dispatch(parent, operation)
+    finally:
+        connections.close_all() # Pool threads get their own DB connections; don't leak them
+
+
+def run_batch(parent, operations):
+    """Execute ``operations`` for the (already authenticated) DRF request ``parent``; results in order."""
+    results = [None] * len(operations)
+    workers = batch_setting('MAX_WORKERS')
+
+    def flush_reads(pending):
+        if len(pending) == 1 or workers <= 1:
+            for index in pending:
+                results[index] = _dispatch(parent, operations[index])
+        elif pending:
+            with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                futures = {index: pool.submit(_dispatch_in_thread, parent, operations[index]) for index in pending}
+            for index, future in futures.items():
+                results[index] = future.result()
+        pending.clear()
+
+    reads = []
+    for index, operation in enumerate(operations):
+        if operation['method'] in SAFE_METHODS:
+            reads.append(index)
+            continue
+        flush_reads(reads) # Writes are barriers
+        results[index] = _dispatch(parent, operation)
+    flush_reads(reads)
+    return results
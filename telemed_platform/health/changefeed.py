@@ -0,0 +1,69 @@
+# health/changefeed.py
+"""
+Appointment change feed: every write to an appointment appends its id to
+``AppointmentChange``, in the same transaction as the write. Readers keep a
+cursor (the last change id seen) and poll for rows after it, an indexed
+primary-key range scan however large the appointments table grows.
+
+Signal receivers cover ``save()`` and ``delete()``. ``QuerySet.update()`` and
+``bulk_create()`` send no signals, so bulk writers call ``record_changes()``
+themselves (health/lifecycle.py does). ``seed_data`` does not; readers that
+load their state from the appointments table at startup pick those rows up.
+"""
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+
+from .models import Appointment, AppointmentChange
+
+# Ids are allocated at insert time, so a transaction that commits late can add an
+# id below ones already read; re-read this many below the cursor (see revocation.py)
+SYNC_OVERLAP = 64
+
+
+def record_changes(appointment_ids):
+    AppointmentChange.objects.bulk_create([AppointmentChange(appointment_id=pk) for pk in appointment_ids])
+
+
+def _appointment_saved(sender, instance, raw=False, **kwargs):
+    if not raw: # Fixture loading
+        AppointmentChange.objects.create(appointment_id=instance.pk)
+
+
+def _appointment_deleted(sender, instance, **kwargs):
+    AppointmentChange.objects.create(appointment_id=instance.pk)
+
+
+def connect_signals():
+    # Called from HealthConfig.ready()
+    post_save.connect(_appointment_saved, sender=Appointment, dispatch_uid='appointment_change_feed_save')
+    post_delete.connect(_appointment_deleted, sender=Appointment, dispatch_uid='appointment_change_feed_delete')
+
+
+class ChangeFeedReader:
+    """Tails AppointmentChange: ``poll()`` returns the appointment ids changed since the previous call."""
+    def __init__(self):
+        self.cursor = 0
+        self._seen = set() # Change ids within SYNC_OVERLAP of the cursor, already returned
+
+    def start(self):
+        """Skip the existing backlog: call before loading current state from the appointments table."""
+        self.cursor = AppointmentChange.objects.aggregate(top=Max('id'))['top'] or 0
+        self._seen = set(AppointmentChange.objects.filter(id__gt=self.cursor - SYNC_OVERLAP).values_list('id', flat=True))
+
+    def poll(self):
+        rows = (AppointmentChange.objects.filter(id__gt=max(self.cursor - SYNC_OVERLAP, 0))
+                .order_by('id').values_list('id', 'appointment_id'))
+        changed = []
+        for change_id, appointment_id in rows:
+            if change_id in self._seen:
+                continue
+            self._seen.add(change_id)
+            changed.append(appointment_id)
+            self.cursor = max(self.cursor, change_id)
+        floor = self.cursor - SYNC_OVERLAP
+        self._seen = {change_id for change_id in self._seen if change_id > floor}
+        return list(dict.fromkeys(changed)) # Unique, in change order
+
+    def prune(self, before):
+        """Delete changes older than ``before`` that every poll has moved past."""
+        return AppointmentChange.objects.filter(changed_at__lt=before, id__lte=self.cursor - SYNC_OVERLAP).delete()[0]
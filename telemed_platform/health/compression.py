@@ -0,0 +1,167 @@
+# health/compression.py
+"""
+Negotiated response compression for the API.
+
+``CompressionMiddleware`` picks the best encoding the client accepts
+(``Accept-Encoding`` with q-values): Brotli when the optional ``brotli``
+package is installed, otherwise gzip. Bodies smaller than ``MIN_SIZE`` are
+sent as is (the framing would outweigh the saving). Streaming responses are
+compressed chunk by chunk with a sync flush after each chunk, so clients
+still receive data as it is produced.
+
+Only paths under ``PATH_PREFIXES`` are compressed: API responses carry no
+CSRF tokens or other secrets reflected next to user input, which is what
+makes compressed HTML pages open to BREACH-style attacks.
+"""
+import gzip
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli # Optional dependency
+except ImportError:
+    brotli = None
+
+DEFAULTS = {
+    'MIN_SIZE': 1024,               # Bytes; smaller bodies are not worth compressing
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,            # 0-11; 4-6 is the usual speed/ratio sweet spot for dynamic content
+    'PATH_PREFIXES': ['/api/'],
+    'CONTENT_TYPES': ['application/json', 'text/', 'application/javascript', 'application/xml'],
+}
+
+_split_re = re.compile(r'\s*,\s*')
+
+
+def compression_setting(name):
+    return getattr(settings, 'COMPRESSION', {}).get(name, DEFAULTS[name])
+
+
+def available_encodings():
+    """Encodings this process can produce, in server preference order."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encoding, available=None):
+    """Best encoding from ``available`` allowed by an Accept-Encoding header, or None for identity."""
+    available = available if available is not None else available_encodings()
+    weights = {}
+    for item in _split_re.split(accept_encoding.strip()):
+        if not item:
+            continue
+        coding, _, params = item.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    wildcard = weights.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in available: # Ties keep the server's preference order
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+# --- Compressors ---
+
+def compress(encoding, data):
+    if encoding == 'br':
+        return brotli.compress(data, quality=compression_setting('BROTLI_QUALITY'))
+    return gzip.compress(data, compresslevel=compression_setting('GZIP_LEVEL'), mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental compressor; ``feed`` returns whatever can be sent so far, flushed."""
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=compression_setting('BROTLI_QUALITY'))
+        else:
+            self._compressor = zlib.compressobj(compression_setting('GZIP_LEVEL'), zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def feed(self, chunk):
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress_stream(encoding, chunks):
+    compressor = _StreamCompressor(encoding)
+    for chunk in chunks:
+        data = compressor.feed(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(encoding, chunks):
+    compressor = _StreamCompressor(encoding)
+    async for chunk in chunks:
+        data = compressor.feed(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+# --- Middleware ---
+
+class CompressionMiddleware:
+    """Compress API responses with the best encoding the client accepts (see module docstring)."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not request.path.startswith(tuple(compression_setting('PATH_PREFIXES'))):
+            return response
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not self._compressible_type(response):
+            return response
+        # The representation depends on Accept-Encoding from here on, whether or not we compress this one
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and len(response.content) < compression_setting('MIN_SIZE'):
+            return response
+
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(encoding, response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(encoding, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is a different byte sequence: a strong ETag would no longer match it
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _compressible_type(response):
+        content_type = response.get('Content-Type', '').lower()
+        return any(content_type.startswith(prefix) for prefix in compression_setting('CONTENT_TYPES'))
@@ -0,0 +1,45 @@
+# health/dirty.py
+"""
+Field-level dirty tracking for partial updates.
+
+``assign_changes`` copies validated data onto a model instance and reports
+which fields really changed, so callers can ``save(update_fields=...)`` just
+those columns, or skip the UPDATE entirely when nothing changed. Instances
+keep their in-memory state, so the response can be rendered from them
+without reloading.
+"""
+from django.db import transaction
+
+
+def assign_changes(instance, data):
+    """Set ``data`` (field name -> value) on ``instance``; returns the names of the fields that changed."""
+    changed = []
+    for name, value in data.items():
+        if getattr(instance, name) != value:
+            setattr(instance, name, value)
+            changed.append(name)
+    return changed
+
+
+def save_changes(pending):
+    """
+    Save ``pending`` ((instance, changed field names) pairs): an UPDATE of only the changed
+    columns per instance, an INSERT for unsaved ones, nothing for unchanged ones. Several
+    writes run in one transaction; a single statement is atomic on its own.
+    Returns the number of instances written.
+    """
+    writes = [(instance, fields) for instance, fields in pending if fields or instance._state.adding]
+    if len(writes) > 1:
+        with transaction.atomic():
+            for instance, fields in writes:
+                _save(instance, fields)
+    elif writes:
+        _save(*writes[0])
+    return len(writes)
+
+
+def _save(instance, fields):
+    if instance._state.adding:
+        instance.save(force_insert=True)
+    else:
+        instance.save(update_fields=fields)
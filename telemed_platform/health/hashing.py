@@ -0,0 +1,154 @@
+# health/hashing.py
+"""
+Password hashing policy.
+
+- ``TunedPBKDF2PasswordHasher`` reads its iteration count from
+  ``PASSWORD_HASHING['PBKDF2_ITERATIONS']`` (see ``manage.py calibrate_hashing``).
+  Stored hashes with a different count are upgraded on the next successful login.
+- ``hash_password`` / ``verify_password`` run the hashing work in a bounded
+  thread or process pool (``PASSWORD_HASHING['EXECUTOR']``) so bursts of logins
+  queue for a fixed number of hashing slots instead of occupying every worker
+  thread. ``ahash_password`` / ``averify_password`` do the same for async views
+  without blocking the event loop.
+- ``hash_passwords`` hashes a batch, optionally in a caller-owned process pool.
+"""
+import asyncio
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password, identify_hasher
+
+DEFAULTS = {
+    'PBKDF2_ITERATIONS': PBKDF2PasswordHasher.iterations,
+    'EXECUTOR': 'inline',   # 'inline', 'thread' or 'process'
+    'MAX_WORKERS': 4,       # Concurrent hashing slots per worker process
+    'TIMEOUT': 30,          # Seconds a request waits for a hashing slot
+}
+
+
+def hashing_setting(name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Same algorithm and hash format as Django's PBKDF2 hasher (so existing hashes
+    keep verifying), with the cost taken from settings.
+    """
+    @property
+    def iterations(self):
+        return hashing_setting('PBKDF2_ITERATIONS')
+
+
+# --- Executor ---
+
+_executor = None
+_executor_kind = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_kind
+    kind = hashing_setting('EXECUTOR')
+    if kind == 'inline':
+        return None
+    with _executor_lock:
+        if _executor is None or _executor_kind != kind:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # Imported on first use: concurrent.futures.process pulls in multiprocessing
+            if kind == 'process':
+                from concurrent.futures import ProcessPoolExecutor as pool_class
+            else:
+                from concurrent.futures import ThreadPoolExecutor as pool_class
+            _executor = pool_class(max_workers=hashing_setting('MAX_WORKERS'))
+            _executor_kind = kind
+        return _executor
+
+
+def shutdown_executor():
+    global _executor, _executor_kind
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+        _executor, _executor_kind = None, None
+
+
+def _forget_executor():
+    # A forked child (e.g. a gunicorn worker of a preloaded master) must not reuse the parent's pool
+    global _executor, _executor_kind, _executor_lock
+    _executor, _executor_kind, _executor_lock = None, None, threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_executor)
+
+
+def _run(func, *args):
+    executor = _get_executor()
+    if executor is None:
+        return func(*args)
+    return executor.submit(func, *args).result(timeout=hashing_setting('TIMEOUT'))
+
+
+async def _arun(func, *args):
+    executor = _get_executor()
+    loop = asyncio.get_running_loop()
+    # Inline mode still must not block the loop: fall back to the default executor
+    return await asyncio.wait_for(loop.run_in_executor(executor, func, *args), hashing_setting('TIMEOUT'))
+
+
+# Module-level callables so they can be pickled for the process pool
+def _make(raw_password):
+    return make_password(raw_password)
+
+def _check(raw_password, encoded):
+    return check_password(raw_password, encoded)
+
+
+def _needs_rehash(encoded):
+    try:
+        return identify_hasher(encoded).must_update(encoded)
+    except ValueError:
+        return False
+
+
+# --- Public API ---
+
+def hash_password(raw_password):
+    return _run(_make, raw_password)
+
+
+def hash_passwords(raw_passwords, executor=None):
+    """
+    Hash many passwords at once (bulk imports), in order. Pass a process pool to
+    spread them over cores; the request-path pool above is sized for logins.
+    """
+    if executor is None:
+        return [_make(raw_password) for raw_password in raw_passwords]
+    return list(executor.map(_make, raw_passwords, chunksize=8))
+
+
+def verify_password(user, raw_password):
+    """Check ``raw_password`` for ``user``, upgrading the stored hash if its policy is stale."""
+    if not _run(_check, raw_password, user.password):
+        return False
+    if _needs_rehash(user.password):
+        user.password = hash_password(raw_password)
+        user.save(update_fields=['password'])
+    return True
+
+
+async def ahash_password(raw_password):
+    return await _arun(_make, raw_password)
+
+
+async def averify_password(user, raw_password):
+    if not await _arun(_check, raw_password, user.password):
+        return False
+    if _needs_rehash(user.password):
+        encoded = await ahash_password(raw_password)
+        user.password = encoded
+        await user.asave(update_fields=['password'])
+    return True
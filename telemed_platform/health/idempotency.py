@@ -0,0 +1,142 @@
+# health/idempotency.py
+"""
+``Idempotency-Key`` support for POST endpoints that create or change state.
+
+The first request with a given (user, key) claims an ``IdempotencyKey`` row,
+runs the view and stores the status code and JSON body. Retries with the same
+key and payload get that stored response back (``Idempotent-Replayed: true``)
+without running the view again. While the first request is still in flight a
+duplicate waits up to ``WAIT_SECONDS`` for it to finish, then gets 409 with
+``Retry-After``. Reusing a key for a different payload is a 422.
+
+Exceptions raised by the view and 5xx responses release the key, so the
+client may retry; other responses (including 4xx) are stored and replayed.
+An in-flight claim is only a lease: if the worker dies, the key becomes
+claimable again after ``LEASE_SECONDS``.
+"""
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+DEFAULTS = {
+    'TTL_SECONDS': 24 * 3600,   # How long a completed response is replayed
+    'LEASE_SECONDS': 30,        # How long an in-flight claim blocks duplicates
+    'WAIT_SECONDS': 1.0,        # How long a duplicate waits for the in-flight request
+    'POLL_INTERVAL': 0.05,
+}
+
+
+def idempotency_setting(name):
+    return getattr(settings, 'IDEMPOTENCY', {}).get(name, DEFAULTS[name])
+
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, cls=JSONEncoder, default=str)
+    raw = '\n'.join([request.method, request.path, payload])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# --- Store ---
+
+def claim(user, key, fingerprint):
+    """Return (record, claimed): claimed is True if the caller now owns the key and must run the view."""
+    from .models import IdempotencyKey
+
+    now = timezone.now()
+    lease = now + timedelta(seconds=idempotency_setting('LEASE_SECONDS'))
+    with transaction.atomic():
+        record, created = IdempotencyKey.objects.get_or_create(
+            user=user, key=key, defaults={'fingerprint': fingerprint, 'expires_at': lease},
+        )
+    if created:
+        return record, True
+    # Expired (completed past its TTL, or an abandoned lease): take it over atomically
+    taken = IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).update(
+        fingerprint=fingerprint, status_code=None, response_body='', expires_at=lease,
+    )
+    if taken:
+        record.fingerprint, record.status_code, record.response_body, record.expires_at = fingerprint, None, '', lease
+        return record, True
+    return record, False
+
+
+def complete(record, response):
+    record.status_code = response.status_code
+    record.response_body = json.dumps(response.data, cls=JSONEncoder)
+    record.expires_at = timezone.now() + timedelta(seconds=idempotency_setting('TTL_SECONDS'))
+    record.save(update_fields=['status_code', 'response_body', 'expires_at'])
+
+
+def release(record):
+    record.delete()
+
+
+def wait_for(record):
+    """Poll until the in-flight request for ``record`` finishes; returns the fresh row, or None if it vanished."""
+    from .models import IdempotencyKey
+
+    deadline = time.monotonic() + idempotency_setting('WAIT_SECONDS')
+    while record is not None and record.status_code is None and time.monotonic() < deadline:
+        time.sleep(idempotency_setting('POLL_INTERVAL'))
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def prune_idempotency_keys():
+    """Delete completed responses past their TTL and abandoned leases. Returns the number deleted."""
+    from .models import IdempotencyKey
+
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+# --- View decorator ---
+
+def idempotent(handler):
+    """Make a view method (``create``, an ``@action``) honour the ``Idempotency-Key`` header."""
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return handler(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({'detail': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = claim(request.user, key, fingerprint)
+        if not claimed:
+            if record.fingerprint != fingerprint:
+                return Response({'detail': f'{HEADER} was already used for a different request.'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            record = wait_for(record)
+            if record is None or record.status_code is None:
+                # Still running (or it failed and released the key): let the client retry shortly
+                return Response(
+                    {'detail': 'A request with this Idempotency-Key is already in progress.'},
+                    status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+                )
+            return Response(json.loads(record.response_body), status=record.status_code, headers={REPLAYED_HEADER: 'true'})
+
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except Exception:
+            release(record)
+            raise
+        if response.status_code >= 500:
+            release(record)
+        else:
+            complete(record, response)
+        return response
+    return wrapper
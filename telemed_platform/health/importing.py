@@ -0,0 +1,252 @@
+# health/importing.py
+"""
+Bulk onboarding of patients and doctors (``manage.py import_users`` and
+``POST /api/admin/import/``).
+
+Input is CSV (header row) or NDJSON (one object per line) with the
+registration fields (see ``UserImportRowSerializer``), read as a stream and
+processed in chunks of ``chunk_size`` rows:
+
+1. every row is validated on its own, without database access;
+2. username, email (case-insensitive) and license number are checked for
+   uniqueness against earlier rows of the file and, with one query per field,
+   against the database;
+3. passwords are hashed, in a process pool when ``workers`` > 1. Rows without
+   a password get an unusable one and a set-password token (uid + token, as
+   used by Django's password reset) in their result. With ``passwords=False``
+   (the HTTP endpoint) rows with a password are rejected, so nothing is hashed;
+4. users, profiles and role profiles are inserted with bulk_create in one
+   transaction per chunk. If a concurrent registration takes a name between
+   the check and the insert, that chunk is retried row by row.
+
+``UserImporter.run()`` yields one result per input row, in order:
+``{"row", "username", "status": "created", "id"[, "uid", "token"]}`` or
+``{"row", "username", "status": "error", "errors": {...}}``.
+"""
+import codecs
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .hashing import hash_passwords
+from .models import UserProfile, DoctorProfile, PatientProfile, Role
+from .serializers import UserImportRowSerializer
+
+FORMATS = ('csv', 'ndjson')
+
+
+class ImportFormatError(ValueError):
+    """The input as a whole cannot be read (unknown format, bad header)."""
+
+
+def guess_format(name='', content_type=''):
+    """'csv' or 'ndjson' from a file name or content type, else None."""
+    name, content_type = name.lower(), content_type.lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    return None
+
+
+def read_rows(lines, fmt):
+    """Yield row dicts from an iterable of text lines; a row that cannot be parsed yields its error string."""
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unsupported format '{fmt}'; use one of: {', '.join(FORMATS)}.")
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        try:
+            if not reader.fieldnames or 'username' not in reader.fieldnames:
+                raise ImportFormatError("The CSV header must name the columns (username, email, ...).")
+            yield from reader
+        except csv.Error as exc: # Bare CR line ends (old Mac exports), oversized fields, ...
+            raise ImportFormatError(f"CSV line {reader.reader.line_num}: {exc}") from exc # DictReader's line_num lags a row
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield f"Invalid JSON: {exc}"
+            continue
+        yield row if isinstance(row, dict) else "Each line must be a JSON object."
+
+
+def decode_lines(binary):
+    """Text lines from a binary file or iterable of byte lines (UTF-8, optional BOM); ImportFormatError names a bad line."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    number = 0
+    try:
+        for number, line in enumerate(binary, 1):
+            yield decoder.decode(line)
+        tail = decoder.decode(b'', final=True) # Raises on a truncated last character
+        if tail:
+            yield tail
+    except UnicodeDecodeError as exc:
+        raise ImportFormatError(f"Line {number} is not valid UTF-8 (e.g. a Latin-1 export); save the file as UTF-8.") from exc
+
+
+class UserImporter:
+    def __init__(self, chunk_size=1000, workers=1, dry_run=False, passwords=True):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.passwords = passwords # False: reject rows with a password (no hashing at all)
+        self.created = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        # Keys taken by earlier rows of this import
+        self._usernames, self._emails, self._licenses = set(), set(), set()
+
+    def __str__(self):
+        verb = "validated" if self.dry_run else "created"
+        rate = self.created / self.elapsed if self.elapsed else 0.0
+        return f"{self.created} users {verb}, {self.failed} rows rejected in {self.elapsed:.1f}s ({rate:,.0f} users/s)"
+
+    def run(self, rows):
+        started = time.perf_counter()
+        pool = None
+        if self.workers > 1 and not self.dry_run:
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            rows = iter(rows)
+            number = 0
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                numbered = list(enumerate(chunk, number + 1))
+                number += len(chunk)
+                yield from self._import_chunk(numbered, pool)
+                self.elapsed = time.perf_counter() - started
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self.elapsed = time.perf_counter() - started
+
+    # --- One chunk ---
+
+    def _import_chunk(self, numbered, pool):
+        results = {}
+        valid = [] # (row number, validated data)
+        for number, raw in numbered:
+            if isinstance(raw, str):
+                results[number] = self._error(number, None, {'row': [raw]})
+                continue
+            serializer = UserImportRowSerializer(data=raw)
+            if not serializer.is_valid():
+                results[number] = self._error(number, raw.get('username'), serializer.errors)
+            elif serializer.validated_data.get('password') and not self.passwords:
+                results[number] = self._error(number, raw.get('username'), {'password': [
+                    "Passwords are not accepted here; leave the column empty to get a set-password token."]})
+            else:
+                valid.append((number, serializer.validated_data))
+
+        for number, data in self._check_unique(valid, results):
+            results[number] = {'row': number, 'username': data['username'], 'status': 'created'}
+        accepted = [(number, data) for number, data in valid if results[number]['status'] == 'created']
+
+        if accepted and not self.dry_run:
+            self._insert(accepted, results, pool)
+        self.created += sum(1 for number, _ in accepted if results[number]['status'] == 'created')
+        return [results[number] for number, _ in numbered]
+
+    def _error(self, number, username, errors):
+        self.failed += 1
+        return {'row': number, 'username': username, 'status': 'error', 'errors': errors}
+
+    def _check_unique(self, valid, results):
+        """Rows whose keys are free, in the database (one query per key) and in the file so far."""
+        usernames = [data['username'] for _, data in valid]
+        emails = [data['email'].lower() for _, data in valid]
+        licenses = [data['license_number'] for _, data in valid if data['role'] == Role.DOCTOR]
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        taken_emails = set(User.objects.annotate(email_lower=Lower('email'))
+                           .filter(email_lower__in=emails).values_list('email_lower', flat=True))
+        taken_licenses = set(DoctorProfile.objects.filter(license_number__in=licenses)
+                             .values_list('license_number', flat=True)) if licenses else set()
+
+        for number, data in valid:
+            email = data['email'].lower()
+            license_number = data.get('license_number') if data['role'] == Role.DOCTOR else None
+            errors = {}
+            if data['username'] in taken_usernames or data['username'] in self._usernames:
+                errors['username'] = ["A user with that username already exists."]
+            if email in taken_emails or email in self._emails:
+                errors['email'] = ["A user with this email already exists."]
+            if license_number and (license_number in taken_licenses or license_number in self._licenses):
+                errors['license_number'] = ["A doctor with this license number already exists."]
+            if errors:
+                results[number] = self._error(number, data['username'], errors)
+                continue
+            self._usernames.add(data['username'])
+            self._emails.add(email)
+            if license_number:
+                self._licenses.add(license_number)
+            yield number, data
+
+    def _insert(self, accepted, results, pool):
+        with_password = [data['password'] for _, data in accepted if data.get('password')]
+        hashes = iter(hash_passwords(with_password, pool))
+        users = []
+        for _, data in accepted:
+            encoded = next(hashes) if data.get('password') else make_password(None) # Unusable until set
+            users.append(User(username=data['username'], email=data['email'], first_name=data['first_name'],
+                              last_name=data['last_name'], password=encoded))
+        try:
+            with transaction.atomic():
+                self._bulk_insert(accepted, users)
+        except IntegrityError:
+            # Someone registered one of these names since the check: find out which, row by row
+            for (number, data), user in zip(accepted, users):
+                user.pk = None
+                user._state.adding = True
+                try:
+                    with transaction.atomic():
+                        self._bulk_insert([(number, data)], [user])
+                except IntegrityError:
+                    self.failed += 1
+                    results[number] = {'row': number, 'username': data['username'], 'status': 'error',
+                                       'errors': {'row': ["Conflicts with a user created during the import."]}}
+        for (number, data), user in zip(accepted, users):
+            if results[number]['status'] != 'created':
+                continue
+            results[number]['id'] = user.pk
+            if not data.get('password'):
+                results[number]['uid'] = urlsafe_base64_encode(force_bytes(user.pk))
+                results[number]['token'] = default_token_generator.make_token(user)
+
+    @staticmethod
+    def _bulk_insert(accepted, users):
+        User.objects.bulk_create(users)
+        # Re-read ids: not every backend returns them from bulk_create
+        ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+        for user in users:
+            user.pk = ids[user.username]
+        UserProfile.objects.bulk_create([
+            UserProfile(user_id=user.pk, role=data['role'], phone_number=data['phone_number'],
+                        address=data['address'], date_of_birth=data['date_of_birth'])
+            for (_, data), user in zip(accepted, users)
+        ])
+        profile_ids = dict(UserProfile.objects.filter(user_id__in=ids.values()).values_list('user_id', 'id'))
+        DoctorProfile.objects.bulk_create([
+            DoctorProfile(user_profile_id=profile_ids[user.pk], specialization=data['specialization'],
+                          license_number=data['license_number'], years_of_experience=data.get('years_of_experience', 0))
+            for (_, data), user in zip(accepted, users) if data['role'] == Role.DOCTOR
+        ])
+        PatientProfile.objects.bulk_create([
+            PatientProfile(user_profile_id=profile_ids[user.pk], emergency_contact_name=data.get('emergency_contact_name'),
+                           emergency_contact_phone=data.get('emergency_contact_phone'))
+            for (_, data), user in zip(accepted, users) if data['role'] == Role.PATIENT
+        ])
@@ -0,0 +1,81 @@
+# health/lifecycle.py
+"""
+Set-based appointment status sweeps, shared by ``manage.py sweep_appointments``
+and the Appointment admin actions.
+
+Rows are processed in primary-key order, in batches of ``batch_size``. Each
+batch locks its rows with ``SELECT ... FOR UPDATE SKIP LOCKED`` and updates
+them with one UPDATE in a short transaction, so bookings and the per-object
+complete/cancel actions keep running during a sweep. Rows locked by another
+transaction are skipped; the next run picks them up. With sharding on, each
+shard is swept in turn.
+"""
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .changefeed import record_changes
+from .models import Appointment
+from .sharding import shard_aliases
+
+Status = Appointment.StatusChoices
+
+
+@dataclass
+class SweepResult:
+    matched: int = 0
+    updated: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        """Updated rows per second."""
+        return self.updated / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.updated} of {self.matched} appointments updated in {self.batches} batches "
+                f"({self.elapsed:.2f}s, {self.rate:.0f} rows/s)")
+
+
+def stale_scheduled(grace=timedelta(0), now=None):
+    """SCHEDULED appointments whose time passed more than ``grace`` ago."""
+    now = now or timezone.now()
+    return Appointment.objects.filter(status=Status.SCHEDULED, appointment_time__lt=now - grace)
+
+
+def transition(queryset, to_status, from_statuses=(Status.SCHEDULED,), batch_size=500, max_batches=None, dry_run=False):
+    """
+    Move every appointment in ``queryset`` whose status is in ``from_statuses``
+    to ``to_status``, in bounded batches. Returns a SweepResult.
+    """
+    result = SweepResult()
+    started = time.perf_counter()
+    candidates = queryset.filter(status__in=from_statuses).order_by('pk')
+
+    for alias in shard_aliases(): # Every database holding appointments: just 'default' with sharding off
+        last_pk = 0
+        while max_batches is None or result.batches < max_batches:
+            with transaction.atomic(using=alias):
+                pks = list(
+                    candidates.using(alias).filter(pk__gt=last_pk)
+                    .select_for_update(skip_locked=True)
+                    .values_list('pk', flat=True)[:batch_size]
+                )
+                if not pks:
+                    break
+                last_pk = pks[-1]
+                result.matched += len(pks)
+                result.batches += 1
+                if not dry_run:
+                    # Re-check status inside the UPDATE in case a row changed since it was selected
+                    result.updated += Appointment.objects.using(alias).filter(pk__in=pks, status__in=from_statuses).update(
+                        status=to_status, updated_at=timezone.now()
+                    )
+                    record_changes(pks) # update() sends no signals; tell the reminder scheduler
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,37 @@
+# health/management/commands/archive_vitals.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from health.archive import archive_cutoff, archive_patient, pending_patient_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Move HealthRecords older than VITALS_ARCHIVE['HORIZON_DAYS'] into compressed patient-month chunks. "
+        "Each patient-month commits separately, so the command can be stopped and re-run at any time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-days', type=int, default=None, help="Override VITALS_ARCHIVE['HORIZON_DAYS'].")
+        parser.add_argument('--max-patients', type=int, default=None, help="Stop after this many patients (incremental runs).")
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(horizon_days=options['horizon_days'])
+
+        self.stdout.write(f"Archiving readings before {cutoff:%Y-%m-%d}")
+        started = time.perf_counter()
+        patients = months = rows = 0
+        # Materialize the id list: archiving deletes rows from the table being scanned
+        for patient_id in list(pending_patient_ids(cutoff)[:options['max_patients']]):
+            patient_months, patient_rows = archive_patient(patient_id, cutoff)
+            patients += 1
+            months += patient_months
+            rows += patient_rows
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  patient {patient_id}: {patient_rows} readings in {patient_months} chunks")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {rows} readings into {months} patient-month chunks for {patients} patients in {elapsed:.2f}s."
+        ))
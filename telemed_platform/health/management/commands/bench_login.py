@@ -0,0 +1,47 @@
+# health/management/commands/bench_login.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from health.hashing import hash_password, verify_password, shutdown_executor
+
+
+class Command(BaseCommand):
+    help = "Benchmark login throughput (password verification) under each hashing executor policy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=64, help="Logins per policy.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Simulated request threads.")
+        parser.add_argument('--iterations', type=int, default=None, help="PBKDF2 iterations (default: current setting).")
+        parser.add_argument('--workers', type=int, default=4, help="Pool size for thread/process policies.")
+
+    def handle(self, *args, **options):
+        password = 'bench-password-123'
+        # Unsaved user: verification never needs a rehash, so no DB writes are measured
+        user = User(username='bench')
+        self.stdout.write(f"{'policy':<10}{'logins/s':>12}{'p50 ms':>10}{'p95 ms':>10}")
+
+        for policy in ('inline', 'thread', 'process'):
+            overrides = {'EXECUTOR': policy, 'MAX_WORKERS': options['workers']}
+            if options['iterations']:
+                overrides['PBKDF2_ITERATIONS'] = options['iterations']
+            with override_settings(PASSWORD_HASHING=overrides):
+                user.password = hash_password(password)
+                rate, p50, p95 = self._run(user, password, options['logins'], options['concurrency'])
+                shutdown_executor()
+            self.stdout.write(f"{policy:<10}{rate:>12.1f}{p50:>10.1f}{p95:>10.1f}")
+
+    def _run(self, user, password, logins, concurrency):
+        def one_login(_):
+            started = time.perf_counter()
+            assert verify_password(user, password)
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as requests:
+            latencies = sorted(requests.map(one_login, range(logins)))
+        elapsed = time.perf_counter() - started
+        return logins / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1]
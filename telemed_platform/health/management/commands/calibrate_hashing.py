@@ -0,0 +1,37 @@
+# health/management/commands/calibrate_hashing.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from health.hashing import hashing_setting
+
+
+class Command(BaseCommand):
+    help = "Measure PBKDF2 on this machine and suggest PASSWORD_HASHING['PBKDF2_ITERATIONS'] for a latency budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250.0, help="Hashing time budget per password (ms).")
+        parser.add_argument('--min-iterations', type=int, default=100_000, help="Never suggest fewer iterations than this.")
+        parser.add_argument('--samples', type=int, default=5)
+
+    def handle(self, *args, **options):
+        hasher = PBKDF2PasswordHasher()
+        salt = hasher.salt()
+        probe = 50_000
+
+        # Best-of-N timing of a fixed probe, then scale linearly (PBKDF2 cost is linear in iterations)
+        best = min(self._time(hasher, salt, probe) for _ in range(options['samples']))
+        per_iteration_ms = best / probe
+        suggested = max(options['min_iterations'], int(options['target_ms'] / per_iteration_ms) // 1000 * 1000)
+        current = hashing_setting('PBKDF2_ITERATIONS')
+
+        self.stdout.write(f"PBKDF2-SHA256: {per_iteration_ms * 1e6:.1f} ns/iteration")
+        self.stdout.write(f"Current: {current} iterations ~ {current * per_iteration_ms:.0f} ms/hash")
+        self.stdout.write(f"Target {options['target_ms']:.0f} ms -> {suggested} iterations ~ {suggested * per_iteration_ms:.0f} ms/hash")
+        self.stdout.write(self.style.SUCCESS(f"PASSWORD_HASHING['PBKDF2_ITERATIONS'] = {suggested}"))
+
+    def _time(self, hasher, salt, iterations):
+        started = time.perf_counter()
+        hasher.encode('calibration-password', salt, iterations)
+        return (time.perf_counter() - started) * 1000
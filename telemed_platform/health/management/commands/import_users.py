@@ -0,0 +1,49 @@
+# health/management/commands/import_users.py
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from health.importing import FORMATS, ImportFormatError, UserImporter, decode_lines, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-register patients and doctors from a CSV (with header) or NDJSON file. "
+        "Rows without a password get a set-password token in the report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for stdin.")
+        parser.add_argument('--format', choices=FORMATS, help="Default: from the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows validated and inserted together.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Password hashing processes (1 = in-process).")
+        parser.add_argument('--report', help="Write one JSON result per input row to this file (NDJSON).")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and check uniqueness without inserting.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        importer = UserImporter(chunk_size=options['chunk_size'], workers=options['workers'], dry_run=options['dry_run'])
+        source = sys.stdin.buffer if options['path'] == '-' else open(options['path'], 'rb') # Decoded by decode_lines
+        report = open(options['report'], 'w') if options['report'] else None
+        try:
+            for result in importer.run(read_rows(decode_lines(source), fmt)):
+                if report:
+                    report.write(json.dumps(result) + '\n')
+                if result['status'] == 'error':
+                    self.stderr.write(f"Row {result['row']} ({result['username'] or '?'}): {json.dumps(result['errors'])}")
+        except ImportFormatError as exc:
+            raise CommandError(f"{exc} Stopped there: {importer}.")
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+            if report:
+                report.close()
+        prefix = "[dry run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{importer}"))
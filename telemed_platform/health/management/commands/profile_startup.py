@@ -0,0 +1,79 @@
+# health/management/commands/profile_startup.py
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported
+CHILD = """
+import json, time
+started = time.perf_counter()
+from health.startup import timed_setup
+result = timed_setup()
+if {resolve_urls}:
+    from django.urls import get_resolver
+    url_started = time.perf_counter()
+    get_resolver().url_patterns
+    result['urls'] = time.perf_counter() - url_started
+result['total'] = time.perf_counter() - started
+print(json.dumps(result))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile a cold worker start: per-module import time (python -X importtime) "
+        "and time spent in each AppConfig.ready()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help="Number of modules to list.")
+        parser.add_argument('--no-urls', action='store_true', help="Stop after django.setup() (skip importing the URLconf/views).")
+        parser.add_argument('--cumulative', action='store_true', help="Rank modules by cumulative instead of self time.")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'telemed_platform.settings'))
+        code = CHILD.format(resolve_urls=not options['no_urls'])
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Child interpreter failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(proc.stderr)
+
+        self.stdout.write(f"Cold start: {result['total'] * 1000:.1f} ms "
+                          f"(django.setup {result['setup'] * 1000:.1f} ms"
+                          + (f", URLconf {result['urls'] * 1000:.1f} ms)" if 'urls' in result else ")"))
+
+        self.stdout.write("\nAppConfig.ready()")
+        for label, seconds in sorted(result['ready'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {label:<30}{seconds * 1000:>10.2f} ms")
+
+        rank = 'cumulative' if options['cumulative'] else 'self'
+        self.stdout.write(f"\nImports by {rank} time (top {options['top']})")
+        for name, own, cumulative in sorted(modules, key=lambda m: -(m[2] if rank == 'cumulative' else m[1]))[:options['top']]:
+            self.stdout.write(f"  {name:<55}{own / 1000:>9.2f} ms self{cumulative / 1000:>10.2f} ms cumulative")
+
+        self.stdout.write("\nSelf import time by top-level package")
+        packages = defaultdict(int)
+        for name, own, _ in modules:
+            packages[name.split('.')[0]] += own
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:10]:
+            self.stdout.write(f"  {package:<30}{own / 1000:>10.2f} ms")
+
+
+def parse_importtime(stderr):
+    """``-X importtime`` output -> [(module, self us, cumulative us)]."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
@@ -0,0 +1,12 @@
+# health/management/commands/prune_idempotency_keys.py
+from django.core.management.base import BaseCommand
+
+from health.idempotency import prune_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses past their TTL and abandoned in-flight claims."
+
+    def handle(self, *args, **options):
+        deleted = prune_idempotency_keys()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} idempotency keys."))
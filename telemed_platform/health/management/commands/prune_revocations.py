@@ -0,0 +1,12 @@
+# health/management/commands/prune_revocations.py
+from django.core.management.base import BaseCommand
+
+from health.revocation import prune_revocations
+
+
+class Command(BaseCommand):
+    help = "Delete revocation rows that can no longer match an unexpired token."
+
+    def handle(self, *args, **options):
+        tokens, watermarks = prune_revocations()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {tokens} revoked tokens and {watermarks} watermarks."))
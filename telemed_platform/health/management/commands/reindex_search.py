@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from health.search import rebuild_search_index
+from health.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over appointment reasons/notes and vitals notes (on every shard)."
+
+    def handle(self, *args, **options):
+        for alias in dict.fromkeys(['default'] + shard_aliases()):
+            connection = connections[alias]
+            if connection.vendor not in ('sqlite', 'postgresql'):
+                self.stdout.write(self.style.WARNING(f"No full-text index on {connection.vendor} ({alias}); search uses icontains."))
+                continue
+            started = time.perf_counter()
+            with transaction.atomic(using=alias):
+                rebuild_search_index(connection)
+            self.stdout.write(self.style.SUCCESS(f"Search index on '{alias}' rebuilt in {time.perf_counter() - started:.2f}s."))
@@ -0,0 +1,48 @@
+# health/management/commands/reshard.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from health.sharding import ShardMoveConflict, misplaced_patients, move_patients, shard_aliases, sharding_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        "Move vitals and appointments to the shard SHARDING['SHARDS'] now assigns their patient: run it after "
+        "adding or removing a shard, or to spread an unsharded 'default' database. Rows keep their ids; "
+        "each batch commits separately, so the command can be stopped and re-run at any time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='sources', action='append', default=None, metavar='ALIAS',
+                            help="Only drain these aliases (repeatable), e.g. a shard being removed that is "
+                                 "still in DATABASES. Default: 'default' and every shard.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per transaction.")
+        parser.add_argument('--patients-per-move', type=int, default=100, help="Patients moved together.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many patients would move.")
+
+    def handle(self, *args, **options):
+        if not sharding_enabled():
+            raise CommandError("Sharding is off: list the shard aliases in SHARDING['SHARDS'] first.")
+        sources = options['sources'] or list(dict.fromkeys(['default'] + shard_aliases()))
+
+        started = time.perf_counter()
+        patients = rows = 0
+        step = options['patients_per_move']
+        for source in sources:
+            for target, patient_ids in misplaced_patients(source).items():
+                self.stdout.write(f"{source} -> {target}: {len(patient_ids)} patients")
+                patients += len(patient_ids)
+                if options['dry_run']:
+                    continue
+                for offset in range(0, len(patient_ids), step):
+                    try:
+                        rows += move_patients(patient_ids[offset:offset + step], source, target, options['batch_size'])
+                    except ShardMoveConflict as exc:
+                        raise CommandError(f"{exc} Moved {rows} rows before stopping.") from exc
+
+        elapsed = time.perf_counter() - started
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{patients} patients would move."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Moved {rows} rows of {patients} patients in {elapsed:.2f}s."))
@@ -0,0 +1,36 @@
+# health/management/commands/run_scheduler.py
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from health.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Send appointment reminders (REMINDERS['LEAD_HOURS'] before each scheduled appointment). "
+        "Run a single instance; it rebuilds its state from the database on start."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-hours', type=float, nargs='+', help="Override REMINDERS['LEAD_HOURS'].")
+        parser.add_argument('--once', action='store_true', help="Send what is due now (including missed reminders) and exit.")
+
+    def handle(self, *args, **options):
+        if options['lead_hours'] and min(options['lead_hours']) <= 0:
+            raise CommandError("--lead-hours must be positive.")
+        scheduler = ReminderScheduler(lead_hours=options['lead_hours'])
+
+        if options['once']:
+            loaded = scheduler.load()
+            sent = scheduler.step()
+            self.stdout.write(self.style.SUCCESS(f"{loaded} upcoming appointments, {sent} reminders sent."))
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        self.stdout.write(f"Reminder scheduler running (leads: {', '.join(f'{m} min' for m in scheduler.leads)}); Ctrl+C to stop.")
+        scheduler.run(stop)
+        self.stdout.write(self.style.SUCCESS(f"Stopped after sending {scheduler.sent} reminders."))
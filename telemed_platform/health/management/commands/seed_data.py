@@ -0,0 +1,166 @@
+# health/management/commands/seed_data.py
+import multiprocessing
+import os
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from health.hashing import hash_password
+from health.models import UserProfile, DoctorProfile, PatientProfile, Appointment, HealthRecord, Role
+from health.seeding import generate_patient, history_window, patient_rng
+from health.sharding import id_allocator, shard_for, sharding_enabled
+
+SPECIALIZATIONS = ['General Practice', 'Cardiology', 'Endocrinology', 'Dermatology', 'Pediatrics', 'Neurology']
+VITALS_FIELDS = [
+    'patient', 'record_time', 'blood_pressure_systolic', 'blood_pressure_diastolic',
+    'heart_rate', 'glucose_level', 'temperature', 'notes',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create synthetic doctors, patients, vitals time series and appointment histories. "
+        "Output is deterministic for a given --seed regardless of --workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=10)
+        parser.add_argument('--patients', type=int, default=100)
+        parser.add_argument('--vitals-per-patient', type=int, default=100)
+        parser.add_argument('--appointments-per-patient', type=int, default=5)
+        parser.add_argument('--days', type=int, default=365, help="Days of history to generate.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Generator processes (1 = in-process).")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per insert batch.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix; must not be in use yet.")
+        parser.add_argument('--password', default='seed-password-123', help="Password shared by every seeded user.")
+
+    def handle(self, *args, **options):
+        prefix, chunk_size = options['prefix'], options['chunk_size']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Users with prefix '{prefix}_' already exist; pass a different --prefix.")
+        started = time.perf_counter()
+
+        # One hash for everyone: per-user PBKDF2 would dominate the run
+        password = hash_password(options['password'])
+        doctor_ids = self._create_users(f'{prefix}_doctor', options['doctors'], Role.DOCTOR, password, options['seed'], chunk_size)
+        patient_ids = self._create_users(f'{prefix}_patient', options['patients'], Role.PATIENT, password, options['seed'], chunk_size)
+        self.stdout.write(f"Created {len(doctor_ids)} doctors and {len(patient_ids)} patients "
+                          f"in {time.perf_counter() - started:.1f}s")
+
+        start, end, now = history_window(options['days'])
+        tasks = (
+            (options['seed'], index, patient_id, doctor_ids, options['vitals_per_patient'],
+             options['appointments_per_patient'], start, end, now)
+            for index, patient_id in enumerate(patient_ids)
+        )
+        vitals, appointments = self._insert_generated(tasks, options['workers'], chunk_size, options['verbosity'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {vitals} vitals and {appointments} appointments in {elapsed:.1f}s "
+            f"({vitals / elapsed:,.0f} vitals/s). Password for all users: {options['password']}"
+        ))
+
+    def _create_users(self, stem, count, role, password, seed, chunk_size):
+        """Users + UserProfile + role profile, in chunks. Returns the new user ids in order."""
+        rng = patient_rng(seed, stem)
+        user_ids = []
+        for offset in range(0, count, chunk_size):
+            numbers = range(offset, min(offset + chunk_size, count))
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(username=f'{stem}_{n:07d}', email=f'{stem}_{n:07d}@example.com', password=password,
+                         first_name=stem.rsplit('_', 1)[-1].title(), last_name=f'{n:07d}')
+                    for n in numbers
+                ])
+                # Re-read ids: not every backend returns them from bulk_create
+                ids = list(User.objects.filter(username__in=[f'{stem}_{n:07d}' for n in numbers])
+                           .order_by('username').values_list('id', flat=True))
+                UserProfile.objects.bulk_create([
+                    UserProfile(user_id=user_id, role=role,
+                                date_of_birth=date(rng.randint(1940, 2005), rng.randint(1, 12), rng.randint(1, 28))
+                                if role == Role.PATIENT else None)
+                    for user_id in ids
+                ])
+                profile_ids = list(UserProfile.objects.filter(user_id__in=ids).order_by('user_id').values_list('id', flat=True))
+                if role == Role.DOCTOR:
+                    DoctorProfile.objects.bulk_create([
+                        DoctorProfile(user_profile_id=profile_id, specialization=rng.choice(SPECIALIZATIONS),
+                                      license_number=f'{stem.upper()}-{n:07d}', years_of_experience=rng.randint(0, 35))
+                        for n, profile_id in zip(numbers, profile_ids)
+                    ])
+                else:
+                    PatientProfile.objects.bulk_create([PatientProfile(user_profile_id=profile_id) for profile_id in profile_ids])
+            user_ids.extend(ids)
+        return user_ids
+
+    def _insert_generated(self, tasks, workers, chunk_size, verbosity):
+        """Generate per-patient data (in parallel) and bulk insert it as it arrives."""
+        vitals_buffers, appointments_buffer = {}, [] # Vitals per database: each patient's go to their shard
+        vitals_total = appointments_total = 0
+
+        def flush_vitals(alias):
+            rows = vitals_buffers.pop(alias, [])
+            if rows and sharding_enabled():
+                # Ids from ShardSequence like every other sharded row, not the shard's auto-increment
+                rows = [(pk,) + row for pk, row in zip(id_allocator.allocate(HealthRecord, len(rows)), rows)]
+                insert_rows(HealthRecord, ['id'] + VITALS_FIELDS, rows, using=alias)
+            else:
+                insert_rows(HealthRecord, VITALS_FIELDS, rows, using=alias)
+            return len(rows)
+
+        def flush_appointments():
+            with transaction.atomic():
+                Appointment.objects.bulk_create(appointments_buffer, batch_size=chunk_size)
+            count = len(appointments_buffer)
+            appointments_buffer.clear()
+            return count
+
+        pool = multiprocessing.Pool(workers) if workers > 1 else None
+        try:
+            results = pool.imap(generate_patient, tasks, chunksize=8) if pool else map(generate_patient, tasks)
+            for done, (patient_id, vitals, appointments) in enumerate(results, 1):
+                alias = shard_for(patient_id)
+                adapt_datetime = connections[alias].ops.adapt_datetimefield_value
+                vitals_buffer = vitals_buffers.setdefault(alias, [])
+                vitals_buffer.extend((patient_id, adapt_datetime(row[0])) + row[1:] for row in vitals)
+                appointments_buffer.extend(
+                    Appointment(patient_id=patient_id, doctor_id=doctor_id, appointment_time=t,
+                                reason=reason, status=status, consultation_notes=notes)
+                    for doctor_id, t, reason, status, notes in appointments
+                )
+                if len(vitals_buffer) >= chunk_size:
+                    vitals_total += flush_vitals(alias)
+                if len(appointments_buffer) >= chunk_size:
+                    appointments_total += flush_appointments()
+                if verbosity > 1 and done % 1000 == 0:
+                    self.stdout.write(f"  {done} patients, {vitals_total} vitals inserted")
+            for alias in list(vitals_buffers):
+                vitals_total += flush_vitals(alias)
+            appointments_total += flush_appointments()
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        return vitals_total, appointments_total
+
+
+def insert_rows(model, field_names, rows, using='default'):
+    """
+    Plain INSERT ... executemany of already-adapted value tuples. Used for vitals,
+    where building model instances and compiling bulk_create batches costs
+    several times more than generating the data.
+    """
+    if not rows:
+        return
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in field_names)
+    placeholders = ', '.join(['%s'] * len(field_names))
+    sql = f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
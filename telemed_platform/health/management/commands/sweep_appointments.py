@@ -0,0 +1,34 @@
+# health/management/commands/sweep_appointments.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from health.lifecycle import Status, stale_scheduled, transition
+
+
+class Command(BaseCommand):
+    help = "Transition SCHEDULED appointments whose time has passed (default: to EXPIRED), in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', default=Status.EXPIRED, help="Target status (EXPIRED, CANCELLED or COMPLETED).")
+        parser.add_argument('--grace-minutes', type=int, default=60, help="Only sweep appointments older than this.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument('--dry-run', action='store_true', help="Count matching rows without updating them.")
+
+    def handle(self, *args, **options):
+        to_status = options['status'].upper()
+        if to_status not in (Status.EXPIRED, Status.CANCELLED, Status.COMPLETED):
+            raise CommandError(f"Unsupported target status '{options['status']}'.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        result = transition(
+            stale_scheduled(grace=timedelta(minutes=options['grace_minutes'])),
+            to_status,
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            dry_run=options['dry_run'],
+        )
+        prefix = "[dry run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{result}"))
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.15 on 2026-10-19 17:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('health', '0004_appointment_expired_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedVitalsChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('record_count', models.PositiveIntegerField()),
+                ('first_time', models.DateTimeField()),
+                ('last_time', models.DateTimeField()),
+                ('min_record_id', models.BigIntegerField()),
+                ('max_record_id', models.BigIntegerField()),
+                ('data', models.BinaryField()),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_vitals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['patient', 'month'],
+                'indexes': [models.Index(fields=['patient', 'first_time', 'last_time'], name='vitals_chunk_range_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivedvitalschunk',
+            constraint=models.UniqueConstraint(fields=('patient', 'month'), name='unique_vitals_chunk_per_month'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Full-text search index (SQLite FTS5 table + triggers, or PostgreSQL GIN indexes).
+# See health/search.py; `python manage.py reindex_search` rebuilds it.
+
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from health.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from health.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0005_vitals_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
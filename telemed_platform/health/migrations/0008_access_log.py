@@ -0,0 +1,29 @@
+# Generated by Django 4.2.15 on 2026-10-19 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0007_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor_id', models.BigIntegerField()),
+                ('patient_id', models.BigIntegerField()),
+                ('resource', models.CharField(choices=[('VITALS', 'Health records'), ('APPOINTMENTS', 'Appointments'), ('PATIENT_LIST', 'Patient list')], max_length=16)),
+                ('object_id', models.BigIntegerField(blank=True, null=True)),
+                ('method', models.CharField(max_length=8)),
+                ('endpoint', models.CharField(max_length=255)),
+                ('accessed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient_id', 'accessed_at'], name='access_log_patient_time_idx')],
+            },
+        ),
+    ]
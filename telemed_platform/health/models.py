@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User # Use the default User model
 from django.utils import timezone
 
+from .sharding import PatientShardedQuerySet
+
 # Extending User with Roles using Profiles
 class Role(models.TextChoices):
     PATIENT = 'PATIENT', 'Patient'
@@ -46,10 +48,12 @@ class Appointment(models.Model):
         COMPLETED = 'COMPLETED', 'Completed'
         CANCELLED = 'CANCELLED', 'Cancelled'
         RESCHEDULED = 'RESCHEDULED', 'Rescheduled' # Maybe handle rescheduling logic separately
+        EXPIRED = 'EXPIRED', 'Expired' # Time passed while still scheduled (set by sweep_appointments)
 
-    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='patient_appointments', limit_choices_to={'profile__role': Role.PATIENT})
-    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='doctor_appointments', limit_choices_to={'profile__role': Role.DOCTOR})
-    appointment_time = models.DateTimeField()
+    # No database-level constraints: with sharding on, appointments and vitals live apart from the users (health/sharding.py)
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='patient_appointments', limit_choices_to={'profile__role': Role.PATIENT}, db_constraint=False)
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='doctor_appointments', limit_choices_to={'profile__role': Role.DOCTOR}, db_constraint=False)
+    appointment_time = models.DateTimeField(db_index=True) # Indexed for ordering and admin date drill-down
     reason = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=15, choices=StatusChoices.choices, default=StatusChoices.SCHEDULED)
     consultation_notes = models.TextField(blank=True, null=True) # Notes added by doctor after consultation
@@ -58,12 +62,21 @@ class Appointment(models.Model):
     # Optional: Add video call link if integrating WebRTC/Third-party service
     # video_call_link = models.URLField(max_length=500, blank=True, null=True)
 
+    objects = PatientShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Per-participant listings ordered by time (API lists, admin filters)
+            models.Index(fields=['patient', 'appointment_time'], name='appt_patient_time_idx'),
+            models.Index(fields=['doctor', 'appointment_time'], name='appt_doctor_time_idx'),
+        ]
+
     def __str__(self):
         return f"Appointment for {self.patient.username} with Dr. {self.doctor.username} on {self.appointment_time.strftime('%Y-%m-%d %H:%M')}"
 
 class HealthRecord(models.Model):
-    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='health_records', limit_choices_to={'profile__role': Role.PATIENT})
-    record_time = models.DateTimeField(default=timezone.now)
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='health_records', limit_choices_to={'profile__role': Role.PATIENT}, db_constraint=False)
+    record_time = models.DateTimeField(default=timezone.now, db_index=True) # Indexed for default ordering / date drill-down
     blood_pressure_systolic = models.PositiveIntegerField(blank=True, null=True)
     blood_pressure_diastolic = models.PositiveIntegerField(blank=True, null=True)
     heart_rate = models.PositiveIntegerField(blank=True, null=True) # Beats per minute
@@ -71,8 +84,155 @@ class HealthRecord(models.Model):
     temperature = models.DecimalField(max_digits=4, decimal_places=1, blank=True, null=True) # Celsius or Fahrenheit
     notes = models.TextField(blank=True, null=True) # Additional notes by patient or doctor
 
+    objects = PatientShardedQuerySet.as_manager()
+
     def __str__(self):
         return f"Health Record for {self.patient.username} at {self.record_time.strftime('%Y-%m-%d %H:%M')}"
 
     class Meta:
-        ordering = ['-record_time'] # Show newest records first
\ No newline at end of file
+        ordering = ['-record_time'] # Show newest records first
+        indexes = [
+            models.Index(fields=['patient', 'record_time'], name='vitals_patient_time_idx'),
+        ]
+
+# --- Token Revocation ---
+# Rows are append-only; each worker mirrors them in memory (see health/revocation.py)
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='revoked_tokens', blank=True, null=True)
+    expires_at = models.DateTimeField(db_index=True) # Row can be pruned once the token has expired anyway
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Revoked token {self.jti}"
+
+class TokenWatermark(models.Model):
+    # Tokens for this user issued before not_before are rejected (e.g. "log out everywhere")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='token_watermarks')
+    not_before = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Tokens for {self.user.username} issued before {self.not_before:%Y-%m-%d %H:%M}"
+
+
+# --- Idempotency Keys ---
+# Outcome of a POST sent with an Idempotency-Key header, replayed to retries of
+# the same request (see health/idempotency.py). status_code is NULL while the
+# first request is still in flight.
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64) # sha256 of method, path and payload
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.TextField(blank=True) # JSON
+    expires_at = models.DateTimeField(db_index=True) # In-flight lease, then TTL once completed
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} for {self.user.username}"
+
+
+# --- Appointment Change Feed & Reminders ---
+# One AppointmentChange row per appointment write (save/delete signals and bulk
+# sweeps, see health/changefeed.py). The reminder scheduler (health/reminders.py)
+# tails it by id instead of re-querying the appointments table.
+class AppointmentChange(models.Model):
+    appointment_id = models.BigIntegerField() # Plain id: the appointment may have been deleted
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Appointment {self.appointment_id} changed at {self.changed_at:%Y-%m-%d %H:%M:%S}"
+
+class SentReminder(models.Model):
+    # appointment_time is the time reminded about: a rescheduled appointment gets reminded again
+    # Unconstrained: the scheduler records reminders on 'default' for appointments on any shard
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='sent_reminders', db_constraint=False)
+    appointment_time = models.DateTimeField()
+    lead_minutes = models.PositiveIntegerField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'appointment_time', 'lead_minutes'], name='unique_reminder_per_lead'),
+        ]
+
+    def __str__(self):
+        return f"Reminder {self.lead_minutes} min before appointment {self.appointment_id}"
+
+
+# --- Access Audit Log ---
+# Append-only: one row per read of a patient's vitals, appointments or listing by
+# someone other than the patient (see health/audit.py, which buffers and batches
+# the inserts). Plain ids rather than foreign keys, so entries outlive the users.
+class AccessLog(models.Model):
+    class Resource(models.TextChoices):
+        VITALS = 'VITALS', 'Health records'
+        APPOINTMENTS = 'APPOINTMENTS', 'Appointments'
+        PATIENT_LIST = 'PATIENT_LIST', 'Patient list'
+
+    actor_id = models.BigIntegerField() # User who read the data
+    patient_id = models.BigIntegerField()
+    resource = models.CharField(max_length=16, choices=Resource.choices)
+    object_id = models.BigIntegerField(blank=True, null=True) # Set for single-object reads
+    method = models.CharField(max_length=8)
+    endpoint = models.CharField(max_length=255) # Request path
+    accessed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient_id', 'accessed_at'], name='access_log_patient_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Access log entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Access log entries are append-only.")
+
+    def __str__(self):
+        return f"User {self.actor_id} read {self.get_resource_display()} of patient {self.patient_id} at {self.accessed_at:%Y-%m-%d %H:%M}"
+
+
+# --- Vitals Archive ---
+# One compressed, column-oriented chunk per patient-month of HealthRecords older
+# than the archive horizon (see health/archive.py). Rows are moved, not copied.
+class ArchivedVitalsChunk(models.Model):
+    patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_vitals')
+    month = models.DateField() # First day of the month covered
+    record_count = models.PositiveIntegerField()
+    first_time = models.DateTimeField()
+    last_time = models.DateTimeField()
+    min_record_id = models.BigIntegerField() # Original HealthRecord ids, for retrieve by id
+    max_record_id = models.BigIntegerField()
+    data = models.BinaryField() # zlib-compressed JSON columns
+
+    class Meta:
+        ordering = ['patient', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'month'], name='unique_vitals_chunk_per_month'),
+        ]
+        indexes = [
+            models.Index(fields=['patient', 'first_time', 'last_time'], name='vitals_chunk_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived vitals for {self.patient.username} {self.month:%Y-%m} ({self.record_count} readings)"
+
+
+# --- Sharding ---
+# Ids for the sharded tables (vitals, appointments): each shard's own auto-increment
+# would collide with the others', so ids are handed out from here in blocks (see health/sharding.py)
+class ShardSequence(models.Model):
+    name = models.CharField(max_length=100, unique=True) # Model label
+    next_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name}: next id {self.next_id}"
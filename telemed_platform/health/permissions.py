@@ -43,7 +43,7 @@ class IsOwnerOrDoctorReadOnly(permissions.BasePermission):
             # Allow if user is a doctor and has an appointment with this patient
             if IsDoctor().has_permission(request, view): # Reuse IsDoctor check
                  # Check if this doctor has any appointment with this patient (obj is HealthRecord)
-                 return Appointment.objects.filter(doctor=request.user, patient=obj.patient).exists()
+                 return Appointment.objects.for_patient(obj.patient.pk).filter(doctor=request.user).exists() # On the patient's shard
             return False # Deny read access otherwise
 
         # Write permissions (POST, PUT, PATCH, DELETE) are only allowed to the patient owner.
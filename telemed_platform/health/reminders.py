@@ -0,0 +1,259 @@
+# health/reminders.py
+"""
+Appointment reminders, sent ``LEAD_HOURS`` before each SCHEDULED appointment
+by a single scheduler process (``manage.py run_scheduler``).
+
+Instead of polling the appointments table for reminders coming due, the
+scheduler loads the upcoming appointments once into a hierarchical timing
+wheel, then applies only what changed: it tails the appointment change feed
+(health/changefeed.py), so a cancel, a reschedule or a new booking replaces
+that appointment's timers. Due reminders go through the configured notifier
+and are recorded in ``SentReminder``.
+
+With sharding on, the wheel is loaded from every shard; the change feed and
+``SentReminder`` stay on ``default``.
+
+Recovery: on (re)start the wheel is rebuilt from the appointments table.
+Reminders that came due while the scheduler was down are sent right away,
+only the shortest lead that has passed per appointment, and those already
+in ``SentReminder`` are skipped. Delivery is at-least-once: a crash between
+sending and recording can repeat a reminder after the restart.
+"""
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .changefeed import ChangeFeedReader
+from .models import Appointment, SentReminder
+from .sharding import shard_aliases, shard_queryset
+
+logger = logging.getLogger(__name__)
+
+Status = Appointment.StatusChoices
+
+DEFAULTS = {
+    'LEAD_HOURS': [24, 1],                         # Send a reminder this long before each appointment
+    'NOTIFIER': 'health.reminders.LogNotifier',    # Class with send(appointment, lead_minutes)
+    'TICK_SECONDS': 1,                             # Timer resolution
+    'POLL_SECONDS': 1.0,                           # Change feed poll interval
+    'FEED_RETENTION_HOURS': 24,                    # Processed change feed rows older than this are deleted
+}
+
+
+def reminder_setting(name):
+    return getattr(settings, 'REMINDERS', {}).get(name, DEFAULTS[name])
+
+
+# --- Timing Wheel ---
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel over integer ticks (Varghese & Lauck). Level 0 has
+    one slot per tick, each level above has slots ``size`` times wider; timers
+    further out than the top level covers wait in a heap. Scheduling and
+    cancelling are O(1) (O(log n) in the heap); advancing costs O(1) per tick
+    plus O(1) per timer each time it cascades down a level.
+    """
+    def __init__(self, now, size=64, levels=3):
+        self.now = now # Current tick; timers at or before it have fired
+        self.size = size
+        self.widths = [size ** level for level in range(levels)]
+        self._slots = [[{} for _ in range(size)] for _ in range(levels)]
+        self._overflow = [] # (deadline, seq, key); stale entries are skipped when popped
+        self._seq = itertools.count()
+        self._timers = {} # key -> (deadline, payload)
+        self._where = {}  # key -> (level, slot) or (None, seq) for the heap
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def schedule(self, key, deadline, payload=None):
+        """(Re)schedule ``key``; a deadline at or before ``now`` fires on the next tick."""
+        self.cancel(key)
+        self._timers[key] = (deadline, payload)
+        self._place(key, max(deadline, self.now + 1))
+
+    def cancel(self, key):
+        location = self._where.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        if level is not None:
+            del self._slots[level][slot][key]
+        del self._timers[key]
+        return True
+
+    def _place(self, key, deadline):
+        for level, width in enumerate(self.widths):
+            if deadline // width - self.now // width < self.size:
+                slot = (deadline // width) % self.size
+                self._slots[level][slot][key] = deadline
+                self._where[key] = (level, slot)
+                return
+        seq = next(self._seq)
+        heapq.heappush(self._overflow, (deadline, seq, key))
+        self._where[key] = (None, seq)
+
+    def advance(self, to):
+        """Move the wheel to tick ``to``; returns [(key, payload)] of the timers that fired, in deadline order."""
+        fired = []
+        while self.now < to:
+            if not self._timers:
+                self.now = to # Nothing to fire or cascade on the way
+                break
+            self.now += 1
+            self._pull_overflow()
+            for level in range(len(self.widths) - 1, 0, -1): # Top down: a timer may cascade twice
+                width = self.widths[level]
+                if self.now % width == 0:
+                    slot = (self.now // width) % self.size
+                    cascading, self._slots[level][slot] = self._slots[level][slot], {}
+                    for key, deadline in cascading.items():
+                        self._place(key, deadline)
+            due, self._slots[0][self.now % self.size] = self._slots[0][self.now % self.size], {}
+            for key in due:
+                del self._where[key]
+                fired.append((key, self._timers.pop(key)[1]))
+        return fired
+
+    def _pull_overflow(self):
+        top = self.widths[-1]
+        while self._overflow and self._overflow[0][0] // top - self.now // top < self.size:
+            deadline, seq, key = heapq.heappop(self._overflow)
+            if self._where.get(key) == (None, seq):
+                self._place(key, deadline)
+
+
+# --- Notifiers ---
+
+class LogNotifier:
+    """Local stub: logs the reminder instead of delivering it. Swap via REMINDERS['NOTIFIER']."""
+    def send(self, appointment, lead_minutes):
+        logger.info(
+            "Reminder (%d min ahead): %s has an appointment with Dr. %s at %s",
+            lead_minutes, appointment.patient.username, appointment.doctor.username,
+            appointment.appointment_time.isoformat(),
+        )
+
+
+# --- Scheduler ---
+
+def reminder_times(appointment_time, leads, now):
+    """
+    (lead_minutes, remind_at) pairs to schedule for an appointment at
+    ``appointment_time`` (epoch seconds): every lead still ahead, plus the
+    shortest one already passed (sent now) if the appointment itself is ahead.
+    """
+    times = [(lead, appointment_time - lead * 60) for lead in leads]
+    pending = [(lead, remind_at) for lead, remind_at in times if remind_at > now]
+    passed = [(lead, remind_at) for lead, remind_at in times if remind_at <= now]
+    if passed and appointment_time > now:
+        pending.append(min(passed))
+    return pending
+
+
+class ReminderScheduler:
+    def __init__(self, notifier=None, lead_hours=None, clock=time.time):
+        self.notifier = notifier or import_string(reminder_setting('NOTIFIER'))()
+        self.leads = sorted({round(hours * 60) for hours in (lead_hours or reminder_setting('LEAD_HOURS'))})
+        self.tick = reminder_setting('TICK_SECONDS')
+        self.clock = clock
+        self.feed = ChangeFeedReader()
+        self.wheel = None
+        self.sent = 0
+
+    def _to_tick(self, epoch):
+        return int(epoch // self.tick)
+
+    def load(self):
+        """(Re)build the wheel from the appointments table. Returns the number of appointments loaded."""
+        self.feed.start() # First: changes made while loading are replayed by the next poll
+        now = self.clock()
+        self.wheel = TimingWheel(self._to_tick(now) - 1) # Reminders overdue at load fire on the first step
+        upcoming = Appointment.objects.filter(
+            status=Status.SCHEDULED, appointment_time__gt=datetime.fromtimestamp(now, tz=dt_timezone.utc)
+        ).values_list('id', 'appointment_time')
+        count = 0
+        for alias in shard_aliases():
+            for appointment_id, appointment_time in upcoming.using(alias).iterator(chunk_size=2000):
+                self._schedule(appointment_id, appointment_time, now)
+                count += 1
+        return count
+
+    def _schedule(self, appointment_id, appointment_time, now):
+        for lead in self.leads:
+            self.wheel.cancel((appointment_id, lead))
+        for lead, remind_at in reminder_times(appointment_time.timestamp(), self.leads, now):
+            self.wheel.schedule((appointment_id, lead), self._to_tick(remind_at), appointment_time)
+
+    def apply_changes(self, appointment_ids, now):
+        """Replace the timers of changed appointments with ones for their current state."""
+        for offset in range(0, len(appointment_ids), 500):
+            chunk = appointment_ids[offset:offset + 500]
+            current = {}
+            for alias in shard_aliases(): # The feed only has appointment ids: look on every shard
+                current.update(Appointment.objects.using(alias).filter(id__in=chunk, status=Status.SCHEDULED)
+                               .values_list('id', 'appointment_time'))
+            for appointment_id in chunk:
+                if appointment_id in current:
+                    self._schedule(appointment_id, current[appointment_id], now)
+                else: # Cancelled, completed, expired or deleted
+                    for lead in self.leads:
+                        self.wheel.cancel((appointment_id, lead))
+
+    def step(self, now=None):
+        """Apply pending changes, then fire everything due by ``now``. Returns the number of reminders sent."""
+        now = self.clock() if now is None else now
+        changed = self.feed.poll()
+        if changed:
+            self.apply_changes(changed, now)
+        due = self.wheel.advance(self._to_tick(now))
+        return self._fire(due) if due else 0
+
+    def _fire(self, due):
+        ids = {appointment_id for (appointment_id, _), _ in due}
+        appointments = {appointment.pk: appointment for appointment in
+                        shard_queryset(Appointment.objects.filter(id__in=ids).select_related('patient', 'doctor'))}
+        already_sent = set(SentReminder.objects.filter(appointment_id__in=ids)
+                           .values_list('appointment_id', 'appointment_time', 'lead_minutes'))
+        sent = []
+        for (appointment_id, lead), appointment_time in due:
+            appointment = appointments.get(appointment_id)
+            # Changed since it was scheduled: its change feed entry reschedules it
+            if appointment is None or appointment.status != Status.SCHEDULED or appointment.appointment_time != appointment_time:
+                continue
+            if (appointment_id, appointment_time, lead) in already_sent:
+                continue
+            try:
+                self.notifier.send(appointment, lead)
+            except Exception:
+                # Not recorded as sent, so the next restart retries it
+                logger.exception("Reminder for appointment %s failed", appointment_id)
+                continue
+            sent.append(SentReminder(appointment_id=appointment_id, appointment_time=appointment_time, lead_minutes=lead))
+        SentReminder.objects.bulk_create(sent, ignore_conflicts=True)
+        self.sent += len(sent)
+        return len(sent)
+
+    def run(self, stop):
+        """Load, then step until ``stop`` (a threading.Event) is set."""
+        loaded = self.load()
+        logger.info("Reminder scheduler started with %d upcoming appointments", loaded)
+        poll = min(reminder_setting('POLL_SECONDS'), self.tick)
+        retention = timedelta(hours=reminder_setting('FEED_RETENTION_HOURS'))
+        next_prune = 0.0
+        while not stop.is_set():
+            self.step()
+            now = self.clock()
+            if now >= next_prune:
+                self.feed.prune(datetime.fromtimestamp(now, tz=dt_timezone.utc) - retention)
+                next_prune = now + 3600
+            stop.wait(poll)
@@ -0,0 +1,232 @@
+# health/revocation.py
+"""
+In-memory JWT revocation state.
+
+Revoked token ids (``jti``) and per-user "not before" watermarks are stored in
+the database (``RevokedToken`` / ``TokenWatermark``) and mirrored into each
+worker process. Validation only consults the in-memory copy; the database is
+polled for new rows at most once per ``SYNC_INTERVAL`` seconds, so a revocation
+made by another process takes effect within that window.
+
+Watermarks have one-second granularity, like the tokens' ``iat`` claim: a
+watermark is stored truncated to the second and rejects tokens issued in
+earlier seconds. A login in the same second as "log out all devices" therefore
+works, and other tokens issued within that same second stay valid (logout also
+denies the caller's own tokens by ``jti``).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+DEFAULTS = {
+    'SYNC_INTERVAL': 2.0,          # Seconds between DB polls for new revocations
+    'BLOOM_BITS': 1 << 20,         # Size of the Bloom filter bit array (128 KiB)
+    'BLOOM_HASHES': 7,             # Number of hash functions per key
+    'CLAIMS_CACHE_SIZE': 4096,     # Max decoded tokens kept per process
+}
+
+SYNC_OVERLAP = 64
+
+
+def revocation_setting(name):
+    return getattr(settings, 'TOKEN_REVOCATION', {}).get(name, DEFAULTS[name])
+
+
+def _to_epoch(value):
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. A miss is definitive, a hit must be
+    confirmed against the exact set.
+    """
+    def __init__(self, num_bits, num_hashes):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._bits = bytearray((num_bits + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: derive k positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class ClaimsCache:
+    """
+    Small LRU of raw token string -> validated token, so repeated requests with
+    the same bearer token skip signature verification and claim parsing.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            entry = self._entries.get(raw_token)
+            if entry is None:
+                return None
+            token, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[raw_token]
+                return None
+            self._entries.move_to_end(raw_token)
+            return token
+
+    def put(self, raw_token, token):
+        expires_at = float(token.payload.get('exp', 0))
+        with self._lock:
+            self._entries[raw_token] = (token, expires_at)
+            self._entries.move_to_end(raw_token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RevocationRegistry:
+    """
+    Process-local mirror of the revocation tables. ``version`` is the highest
+    ``RevokedToken`` id applied, ``watermark_version`` the highest
+    ``TokenWatermark`` id applied; both only move forward.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all in-memory state; the next check reloads from the database."""
+        self.bloom = BloomFilter(revocation_setting('BLOOM_BITS'), revocation_setting('BLOOM_HASHES'))
+        self.denied = {}        # jti -> expiry (epoch seconds)
+        self.watermarks = {}    # user id -> not-before (epoch seconds)
+        self.version = 0
+        self.watermark_version = 0
+        self._loaded = False
+        self._next_sync = 0.0
+
+    # --- Hot path ---
+
+    def is_revoked(self, jti, user_id, issued_at):
+        """Return True if the token is denied by jti or by its user's watermark."""
+        self.maybe_sync()
+        if jti and jti in self.bloom and jti in self.denied:
+            return True
+        not_before = self.watermarks.get(user_id)
+        return not_before is not None and issued_at is not None and float(issued_at) < not_before
+
+    # --- Sync ---
+
+    def maybe_sync(self):
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        with self._lock:
+            if now < self._next_sync: # Another thread synced while we waited
+                return
+            self.sync()
+            self._next_sync = now + revocation_setting('SYNC_INTERVAL')
+
+    def sync(self):
+        """Pull revocation rows newer than the versions already applied."""
+        from .models import RevokedToken, TokenWatermark
+
+        now = timezone.now()
+        # Re-read a few ids below the high-water mark: ids are allocated at insert
+        # time, so a concurrent transaction may commit a lower id after a higher one.
+        overlap = SYNC_OVERLAP if self._loaded else 0
+        tokens = RevokedToken.objects.filter(id__gt=max(self.version - overlap, 0))
+        watermarks = TokenWatermark.objects.filter(id__gt=max(self.watermark_version - overlap, 0))
+        if not self._loaded:
+            # First load only needs entries that can still match a live token
+            self.version = RevokedToken.objects.aggregate(top=Max('id'))['top'] or 0
+            self.watermark_version = TokenWatermark.objects.aggregate(top=Max('id'))['top'] or 0
+            tokens = tokens.filter(id__lte=self.version, expires_at__gt=now)
+            watermarks = watermarks.filter(
+                id__lte=self.watermark_version,
+                created_at__gt=now - settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'],
+            )
+
+        for pk, jti, expires_at in tokens.order_by('id').values_list('id', 'jti', 'expires_at').iterator():
+            self._deny(jti, _to_epoch(expires_at))
+            self.version = max(self.version, pk)
+        for pk, user_id, not_before in watermarks.order_by('id').values_list('id', 'user_id', 'not_before').iterator():
+            self._raise_watermark(user_id, int(_to_epoch(not_before))) # Whole seconds, also for older rows
+            self.watermark_version = max(self.watermark_version, pk)
+
+        self._loaded = True
+        self._prune(now.timestamp())
+
+    def _deny(self, jti, expires_at):
+        self.denied[jti] = expires_at
+        self.bloom.add(jti)
+
+    def _raise_watermark(self, user_id, not_before):
+        if not_before > self.watermarks.get(user_id, 0.0):
+            self.watermarks[user_id] = not_before
+
+    def _prune(self, now):
+        expired = [jti for jti, expires_at in self.denied.items() if expires_at <= now]
+        if not expired:
+            return
+        for jti in expired:
+            del self.denied[jti]
+        # Bloom filters cannot delete, so rebuild from the surviving entries
+        self.bloom = BloomFilter(self.bloom.num_bits, self.bloom.num_hashes)
+        for jti in self.denied:
+            self.bloom.add(jti)
+
+    # --- Writes (local process sees them immediately, others within SYNC_INTERVAL) ---
+
+    def revoke_token(self, token):
+        """Deny a single token (AccessToken or RefreshToken instance) by its jti."""
+        from .models import RevokedToken
+
+        jti = token[settings.SIMPLE_JWT['JTI_CLAIM']]
+        expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+        user_id = token.payload.get(settings.SIMPLE_JWT['USER_ID_CLAIM'])
+        RevokedToken.objects.get_or_create(jti=jti, defaults={'user_id': user_id, 'expires_at': expires_at})
+        self._deny(jti, expires_at.timestamp())
+        claims_cache.clear()
+
+    def revoke_user_tokens(self, user, not_before=None):
+        """Invalidate every token issued to ``user`` before the second of ``not_before`` (default: now)."""
+        from .models import TokenWatermark
+
+        not_before = (not_before or timezone.now()).replace(microsecond=0) # iat is whole seconds
+        TokenWatermark.objects.create(user=user, not_before=not_before)
+        self._raise_watermark(user.pk, int(not_before.timestamp()))
+        claims_cache.clear()
+
+
+def prune_revocations():
+    """Delete rows that can no longer match an unexpired token. Returns (tokens, watermarks) deleted."""
+    from .models import RevokedToken, TokenWatermark
+
+    now = timezone.now()
+    tokens, _ = RevokedToken.objects.filter(expires_at__lte=now).delete()
+    watermarks, _ = TokenWatermark.objects.filter(
+        created_at__lte=now - settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME']
+    ).delete()
+    return tokens, watermarks
+
+
+revocations = RevocationRegistry()
+claims_cache = ClaimsCache(revocation_setting('CLAIMS_CACHE_SIZE'))
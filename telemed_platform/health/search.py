@@ -0,0 +1,290 @@
+# health/search.py
+"""
+Full-text search over ``Appointment.reason``, ``Appointment.consultation_notes``
+and ``HealthRecord.notes``.
+
+- SQLite: an FTS5 table ``health_search_index`` kept in sync by triggers on the
+  source tables (so QuerySet.update()/bulk_create()/deletes are covered too).
+  The FTS rowid encodes the source: ``id * 2 + kind``, so trigger updates and
+  deletes are primary-key lookups.
+- PostgreSQL: GIN indexes on ``to_tsvector`` expressions of the same columns;
+  queries repeat the exact expressions so the planner uses them.
+- Other backends: ``icontains`` fallback (unindexed).
+
+Results are always scoped to what the caller may read: patients see their own
+appointments and readings, doctors their own appointments and the readings
+of patients they have appointments with.
+
+With sharding on, every shard indexes its own rows: a patient's search runs on
+their shard, a doctor's on every shard in parallel, and the matches are merged
+by rank (each shard ranks against its own index statistics).
+
+Archiving deletes hot vitals rows (and, through the trigger, their index
+entries). On SQLite the archive re-indexes the notes of the readings it moves,
+under their original ids, and ``rebuild_search_index`` re-adds the notes of
+every archived chunk; hits resolve through the archive like any other reading.
+On PostgreSQL and the fallback only hot readings' notes are searchable.
+"""
+from django.db import connection, connections
+
+from .models import Appointment, HealthRecord, Role
+from .sharding import doctor_patient_ids, scatter, shard_aliases, shard_for
+
+KIND_APPOINTMENT = 0
+KIND_VITALS = 1
+
+FTS_TABLE = 'health_search_index'
+PG_CONFIG = 'english'
+PG_APPOINTMENT_VECTOR = f"to_tsvector('{PG_CONFIG}', coalesce(reason, '') || ' ' || coalesce(consultation_notes, ''))"
+PG_VITALS_VECTOR = f"to_tsvector('{PG_CONFIG}', coalesce(notes, ''))"
+
+# Rows without any text are not indexed (most vitals readings have no notes)
+_SQLITE_APPOINTMENT_ROW = (
+    "SELECT new.id * 2 + {kind}, coalesce(new.reason, '') || ' ' || coalesce(new.consultation_notes, ''), "
+    "{kind}, new.id, new.patient_id, new.doctor_id "
+    "WHERE coalesce(new.reason, '') <> '' OR coalesce(new.consultation_notes, '') <> ''"
+).format(kind=KIND_APPOINTMENT)
+_SQLITE_VITALS_ROW = (
+    "SELECT new.id * 2 + {kind}, new.notes, {kind}, new.id, new.patient_id, NULL "
+    "WHERE coalesce(new.notes, '') <> ''"
+).format(kind=KIND_VITALS)
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        body, kind UNINDEXED, object_id UNINDEXED, patient_id UNINDEXED, doctor_id UNINDEXED,
+        tokenize = 'porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS health_search_appointment_ai AFTER INSERT ON health_appointment BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, body, kind, object_id, patient_id, doctor_id) {_SQLITE_APPOINTMENT_ROW};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS health_search_appointment_au AFTER UPDATE OF reason, consultation_notes, patient_id, doctor_id ON health_appointment BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2 + {KIND_APPOINTMENT};
+        INSERT INTO {FTS_TABLE}(rowid, body, kind, object_id, patient_id, doctor_id) {_SQLITE_APPOINTMENT_ROW};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS health_search_appointment_ad AFTER DELETE ON health_appointment BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2 + {KIND_APPOINTMENT};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS health_search_vitals_ai AFTER INSERT ON health_healthrecord BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, body, kind, object_id, patient_id, doctor_id) {_SQLITE_VITALS_ROW};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS health_search_vitals_au AFTER UPDATE OF notes, patient_id ON health_healthrecord BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2 + {KIND_VITALS};
+        INSERT INTO {FTS_TABLE}(rowid, body, kind, object_id, patient_id, doctor_id) {_SQLITE_VITALS_ROW};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS health_search_vitals_ad AFTER DELETE ON health_healthrecord BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2 + {KIND_VITALS};
+    END""",
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS health_search_{name}" for name in (
+        'appointment_ai', 'appointment_au', 'appointment_ad', 'vitals_ai', 'vitals_au', 'vitals_ad',
+    )
+] + [f"DROP TABLE IF EXISTS {FTS_TABLE}"]
+SQLITE_REBUILD = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""INSERT INTO {FTS_TABLE}(rowid, body, kind, object_id, patient_id, doctor_id)
+        SELECT id * 2 + {KIND_APPOINTMENT}, coalesce(reason, '') || ' ' || coalesce(consultation_notes, ''),
+               {KIND_APPOINTMENT}, id, patient_id, doctor_id
+        FROM health_appointment
+        WHERE coalesce(reason, '') <> '' OR coalesce(consultation_notes, '') <> ''""",
+    f"""INSERT INTO {FTS_TABLE}(rowid, body, kind, object_id, patient_id, doctor_id)
+        SELECT id * 2 + {KIND_VITALS}, notes, {KIND_VITALS}, id, patient_id, NULL
+        FROM health_healthrecord
+        WHERE coalesce(notes, '') <> ''""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')",
+]
+
+PG_INSTALL = [
+    f"CREATE INDEX IF NOT EXISTS health_appointment_fts_idx ON health_appointment USING GIN ({PG_APPOINTMENT_VECTOR})",
+    f"CREATE INDEX IF NOT EXISTS health_healthrecord_fts_idx ON health_healthrecord USING GIN ({PG_VITALS_VECTOR})",
+]
+PG_DROP = [
+    "DROP INDEX IF EXISTS health_appointment_fts_idx",
+    "DROP INDEX IF EXISTS health_healthrecord_fts_idx",
+]
+PG_REBUILD = [
+    "REINDEX INDEX health_appointment_fts_idx",
+    "REINDEX INDEX health_healthrecord_fts_idx",
+]
+
+
+def _execute(conn, statements):
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def install_search_index(conn=connection):
+    if conn.vendor == 'sqlite':
+        _execute(conn, SQLITE_INSTALL + SQLITE_REBUILD)
+    elif conn.vendor == 'postgresql':
+        _execute(conn, PG_INSTALL)
+
+
+def drop_search_index(conn=connection):
+    if conn.vendor == 'sqlite':
+        _execute(conn, SQLITE_DROP)
+    elif conn.vendor == 'postgresql':
+        _execute(conn, PG_DROP)
+
+
+def rebuild_search_index(conn=connection):
+    if conn.vendor == 'sqlite':
+        from .archive import archived_notes # archive.py imports this module
+
+        _execute(conn, SQLITE_INSTALL + SQLITE_REBUILD)
+        for patient_id, notes in archived_notes(conn.alias):
+            index_archived_notes(conn, patient_id, notes)
+    elif conn.vendor == 'postgresql':
+        _execute(conn, PG_INSTALL + PG_REBUILD)
+
+
+def index_archived_notes(conn, patient_id, notes):
+    """Index the notes of archived readings, ``notes`` as [(id, notes), ...] (SQLite only)."""
+    rows = [(pk * 2 + KIND_VITALS, text, pk, patient_id) for pk, text in notes if text]
+    if conn.vendor != 'sqlite' or not rows:
+        return
+    with conn.cursor() as cursor:
+        # REPLACE: a reading still hot after an interrupted archive run is already indexed under the same rowid
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, body, kind, object_id, patient_id, doctor_id) "
+            f"VALUES (%s, %s, {KIND_VITALS}, %s, %s, NULL)",
+            rows,
+        )
+
+
+# --- Querying ---
+
+def _fts5_query(text):
+    """User text -> FTS5 query: every word must match, the last one as a prefix."""
+    terms = ['"%s"' % term.replace('"', '""') for term in text.split()]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _scope(user):
+    """(patient_id or None, doctor_id or None, vitals patient ids or None) visible to ``user``."""
+    role = getattr(getattr(user, 'profile', None), 'role', None)
+    if role == Role.PATIENT:
+        return user.id, None, [user.id]
+    if role == Role.DOCTOR:
+        patients = list(doctor_patient_ids(user))
+        return None, user.id, patients
+    return None, None, None
+
+
+def search(user, text, limit=20):
+    """
+    Ranked matches visible to ``user`` as dicts:
+    {'type': 'appointment'|'vitals', 'id', 'patient_id', 'snippet', 'rank'} (lower rank = better).
+    """
+    text = (text or '').strip()
+    patient_id, doctor_id, vitals_patients = _scope(user)
+    if not text or vitals_patients is None:
+        return []
+    aliases = [shard_for(patient_id)] if patient_id is not None else shard_aliases()
+    parts = scatter(lambda alias: _search_on(alias, text, patient_id, doctor_id, vitals_patients, limit), aliases)
+    if len(parts) == 1:
+        return parts[0]
+    return sorted((result for part in parts for result in part), key=lambda result: result['rank'])[:limit]
+
+
+def _search_on(alias, text, patient_id, doctor_id, vitals_patients, limit):
+    conn = connections[alias]
+    if conn.vendor == 'sqlite':
+        return _search_sqlite(conn, text, patient_id, doctor_id, vitals_patients, limit)
+    if conn.vendor == 'postgresql':
+        return _search_postgres(conn, text, patient_id, doctor_id, vitals_patients, limit)
+    return _search_fallback(alias, text, patient_id, doctor_id, vitals_patients, limit)
+
+
+def _search_sqlite(conn, text, patient_id, doctor_id, vitals_patients, limit):
+    vitals_in = ','.join(str(int(pk)) for pk in vitals_patients) or 'NULL'
+    if doctor_id is not None:
+        appointment_scope = 'doctor_id = %s'
+        params = [doctor_id]
+    else:
+        appointment_scope = 'patient_id = %s'
+        params = [patient_id]
+    sql = f"""
+        SELECT kind, object_id, patient_id, snippet({FTS_TABLE}, 0, '[', ']', '…', 12), bm25({FTS_TABLE})
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH %s
+          AND ((kind = {KIND_APPOINTMENT} AND {appointment_scope}) OR (kind = {KIND_VITALS} AND patient_id IN ({vitals_in})))
+        ORDER BY bm25({FTS_TABLE})
+        LIMIT %s
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql, [_fts5_query(text)] + params + [limit])
+        rows = cursor.fetchall()
+    return [_result(*row) for row in rows]
+
+
+def _search_postgres(conn, text, patient_id, doctor_id, vitals_patients, limit):
+    scope_column = 'doctor_id' if doctor_id is not None else 'patient_id'
+    sql = f"""
+        SELECT * FROM (
+            SELECT {KIND_APPOINTMENT} AS kind, id, patient_id,
+                   ts_headline('{PG_CONFIG}', coalesce(reason, '') || ' ' || coalesce(consultation_notes, ''), q) AS snippet,
+                   -ts_rank({PG_APPOINTMENT_VECTOR}, q) AS rank
+            FROM health_appointment, websearch_to_tsquery('{PG_CONFIG}', %s) q
+            WHERE {PG_APPOINTMENT_VECTOR} @@ q AND {scope_column} = %s
+            UNION ALL
+            SELECT {KIND_VITALS}, id, patient_id, ts_headline('{PG_CONFIG}', coalesce(notes, ''), q),
+                   -ts_rank({PG_VITALS_VECTOR}, q)
+            FROM health_healthrecord, websearch_to_tsquery('{PG_CONFIG}', %s) q
+            WHERE {PG_VITALS_VECTOR} @@ q AND patient_id = ANY(%s)
+        ) matches
+        ORDER BY rank
+        LIMIT %s
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql, [text, doctor_id or patient_id, text, list(vitals_patients), limit])
+        rows = cursor.fetchall()
+    return [_result(*row) for row in rows]
+
+
+def _search_fallback(alias, text, patient_id, doctor_id, vitals_patients, limit):
+    from django.db.models import Q
+
+    appointments = Appointment.objects.using(alias).filter(Q(reason__icontains=text) | Q(consultation_notes__icontains=text))
+    appointments = appointments.filter(doctor_id=doctor_id) if doctor_id is not None else appointments.filter(patient_id=patient_id)
+    records = HealthRecord.objects.using(alias).filter(notes__icontains=text, patient_id__in=vitals_patients)
+    results = [
+        _result(KIND_APPOINTMENT, a.pk, a.patient_id, f"{a.reason or ''} {a.consultation_notes or ''}".strip(), 0.0)
+        for a in appointments[:limit]
+    ] + [_result(KIND_VITALS, r.pk, r.patient_id, r.notes, 0.0) for r in records[:limit]]
+    return results[:limit]
+
+
+def _result(kind, object_id, patient_id, snippet, rank):
+    return {
+        'type': 'appointment' if int(kind) == KIND_APPOINTMENT else 'vitals',
+        'id': int(object_id),
+        'patient_id': int(patient_id) if patient_id is not None else None,
+        'snippet': snippet,
+        'rank': float(rank),
+    }
+
+
+def appointment_ids_matching(text, limit=1000):
+    """Unscoped appointment ids matching ``text`` (for the admin search box), or None if unindexed."""
+    text = (text or '').strip()
+    if not text:
+        return []
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT object_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND kind = {KIND_APPOINTMENT} LIMIT %s",
+                [_fts5_query(text), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM health_appointment WHERE {PG_APPOINTMENT_VECTOR} @@ websearch_to_tsquery('{PG_CONFIG}', %s) LIMIT %s",
+                [text, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    return None
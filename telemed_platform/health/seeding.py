@@ -0,0 +1,144 @@
+# health/seeding.py
+"""
+Synthetic patients, doctors, vitals and appointment histories for scale testing
+(``manage.py seed_data``).
+
+Generation is pure Python and runs in worker processes; only the parent talks
+to the database. Each patient's data comes from its own ``random.Random``
+seeded with (seed, patient index), so output is identical whatever the number
+of workers.
+
+Vitals follow a few simple physiological patterns: heart rate and temperature
+on a 24h cycle, blood pressure drifting as a slow random walk, and glucose
+spiking after meals (higher and longer for the diabetic minority).
+"""
+import math
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+HOUR = 3600
+DAY = 24 * HOUR
+MEAL_HOURS = (8, 13, 19)
+
+VITALS_NOTES = [
+    'Felt dizzy after standing up', 'Skipped breakfast', 'Measured after a run', 'Slight headache',
+    'Took medication late', 'Poor sleep last night', 'Feeling well', 'Stressful day at work',
+]
+REASONS = [
+    'Routine checkup', 'Follow-up on blood pressure', 'Recurring headaches', 'Medication review',
+    'Persistent cough', 'Glucose monitoring review', 'Chest tightness when exercising', 'Fatigue',
+]
+CONSULTATION_NOTES = [
+    'Vitals stable, continue current plan.', 'Adjusted dosage, review in four weeks.',
+    'Ordered blood work.', 'Advised lifestyle changes: diet and exercise.', 'Referred to specialist.',
+]
+
+
+def patient_rng(seed, index):
+    return random.Random(f'{seed}:{index}')
+
+
+def _circadian(epoch, peak_hour):
+    """+1 at ``peak_hour`` local (UTC here), -1 twelve hours later."""
+    return math.cos(2 * math.pi * ((epoch % DAY) / HOUR - peak_hour) / 24)
+
+
+def _after_meal(epoch):
+    """Hours since the most recent meal (0 <= h < 24)."""
+    hour = (epoch % DAY) / HOUR
+    return min((hour - meal) % 24 for meal in MEAL_HOURS)
+
+
+def vitals_rows(rng, count, start, end):
+    """
+    ``count`` readings between epoch seconds ``start`` and ``end`` in ascending
+    time order, as (record_time, systolic, diastolic, heart_rate, glucose,
+    temperature, notes) tuples.
+    """
+    resting_hr = rng.gauss(70, 7)
+    base_systolic = rng.gauss(122, 10)
+    base_diastolic = base_systolic * 0.65 + rng.gauss(0, 4)
+    diabetic = rng.random() < 0.12
+    fasting_glucose = rng.gauss(150, 20) if diabetic else rng.gauss(92, 8)
+    glucose_share = 0.9 if diabetic else 0.3 # Most people only sometimes measure glucose
+    drift = 0.0
+
+    step = (end - start) / max(count, 1)
+    rows = []
+    for i in range(count):
+        epoch = int(start + step * i + rng.random() * step) # One reading per slot, jittered
+        drift = max(-15.0, min(15.0, drift + rng.gauss(0, 0.4)))
+
+        heart_rate = resting_hr + 7 * _circadian(epoch, 16) + rng.gauss(0, 4)
+        systolic = base_systolic + drift + 5 * _circadian(epoch, 10) + rng.gauss(0, 5)
+        diastolic = base_diastolic + drift * 0.6 + 3 * _circadian(epoch, 10) + rng.gauss(0, 3)
+
+        glucose = None
+        if rng.random() < glucose_share:
+            since_meal = _after_meal(epoch)
+            spike = (70 if diabetic else 40) * math.exp(-since_meal / (2.0 if diabetic else 1.0))
+            glucose = round(fasting_glucose + spike + rng.gauss(0, 6), 2)
+
+        temperature = 36.6 + 0.3 * _circadian(epoch, 18) + rng.gauss(0, 0.15)
+        if rng.random() < 0.005:
+            temperature += rng.uniform(1.0, 2.5) # Occasional fever
+
+        rows.append((
+            datetime.fromtimestamp(epoch, tz=dt_timezone.utc),
+            round(systolic),
+            round(diastolic),
+            round(heart_rate),
+            glucose,
+            round(temperature, 1),
+            rng.choice(VITALS_NOTES) if rng.random() < 0.02 else '',
+        ))
+    return rows
+
+
+def appointment_rows(rng, count, doctor_ids, start, end, now):
+    """
+    ``count`` appointments spread over [start, end] as (doctor_id, time, reason,
+    status, consultation_notes). Past ones are mostly completed; ones from
+    ``now`` on are scheduled.
+    """
+    if not doctor_ids:
+        return []
+    regular_doctor = rng.choice(doctor_ids) # Patients mostly see the same doctor
+    rows = []
+    for _ in range(count):
+        epoch = int(rng.uniform(start, end))
+        epoch -= epoch % (15 * 60) # Quarter-hour slots
+        doctor_id = regular_doctor if rng.random() < 0.8 else rng.choice(doctor_ids)
+        if epoch >= now:
+            status, notes = 'SCHEDULED', None
+        else:
+            roll = rng.random()
+            if roll < 0.8:
+                status, notes = 'COMPLETED', rng.choice(CONSULTATION_NOTES)
+            elif roll < 0.95:
+                status, notes = 'CANCELLED', None
+            else:
+                status, notes = 'EXPIRED', None
+        rows.append((doctor_id, datetime.fromtimestamp(epoch, tz=dt_timezone.utc), rng.choice(REASONS), status, notes))
+    rows.sort(key=lambda row: row[1])
+    return rows
+
+
+def generate_patient(task):
+    """
+    Worker entry point. ``task`` is (seed, index, patient_id, doctor_ids,
+    vitals_count, appointment_count, start, end, now), times in epoch seconds.
+    Returns (patient_id, vitals rows, appointment rows).
+    """
+    seed, index, patient_id, doctor_ids, vitals_count, appointment_count, start, end, now = task
+    rng = patient_rng(seed, index)
+    vitals = vitals_rows(rng, vitals_count, start, now)
+    appointments = appointment_rows(rng, appointment_count, doctor_ids, start, end, now)
+    return patient_id, vitals, appointments
+
+
+def history_window(days, now=None):
+    """(start, end, now) epoch seconds: ``days`` of history up to today (00:00 UTC) plus two weeks ahead."""
+    now = now or datetime.now(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    today = int(now.timestamp())
+    return today - days * DAY, today + int(timedelta(days=14).total_seconds()), today
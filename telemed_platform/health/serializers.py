@@ -1,8 +1,88 @@
 # health/serializers.py
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, DoctorProfile, PatientProfile, Appointment, HealthRecord, Role
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from .models import UserProfile, DoctorProfile, PatientProfile, Appointment, HealthRecord, Role, AccessLog
 from django.db import transaction # For atomic operations
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .revocation import revocations
+from .hashing import hash_password
+from .dirty import assign_changes, save_changes
+
+# --- Sparse Fieldsets ---
+# ?fields=a,b on GET requests trims the serialized representation to those fields
+# ('id' is always kept). views.sparse_queryset() narrows the SQL columns to match.
+class SparseFieldsetMixin:
+    # Serializer field -> model column paths, for fields whose source is not a plain field path
+    sparse_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        requested = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if requested is None:
+            requested = self.requested_fields(self.context.get('request'))
+        if requested is None:
+            return
+        unknown = set(requested) - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': f"Unknown field(s): {', '.join(sorted(unknown))}. Available: {', '.join(self.fields)}."
+            })
+        for name in list(self.fields):
+            if name != 'id' and name not in requested:
+                self.fields.pop(name)
+
+    @staticmethod
+    def requested_fields(request):
+        """Field names from ?fields= on a GET request, or None for the full representation."""
+        if request is None or request.method != 'GET':
+            return None
+        value = request.query_params.get('fields')
+        if not value:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    @classmethod
+    def columns_for(cls, names):
+        """Model column paths needed to render ``names`` (plus 'id'), or None if they can't be narrowed."""
+        declared = cls().fields
+        model = cls.Meta.model
+        columns = []
+        for name in ['id'] + [n for n in names if n != 'id']:
+            if name in cls.sparse_columns:
+                columns.extend(cls.sparse_columns[name])
+                continue
+            field = declared.get(name)
+            if field is None or field.source == '*' or isinstance(field, serializers.BaseSerializer):
+                return None
+            path = _column_path(model, field.source.split('.'))
+            if path is None:
+                return None
+            columns.append(path)
+        return columns
+
+
+def _column_path(model, attrs):
+    """'patient.username' on HealthRecord -> 'patient__username'; None if an attribute is not a model field."""
+    from django.core.exceptions import FieldDoesNotExist
+
+    path = []
+    for attr in attrs:
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        path.append(attr)
+        model = field.related_model if field.is_relation else None
+    if model is not None and not field.concrete:
+        return None # Ends on a reverse relation: nothing on this row to select
+    return '__'.join(path) # A trailing forward FK selects just its id column
+
 
 # --- Base Serializers ---
 
@@ -115,59 +195,53 @@ class UserProfileSerializer(serializers.ModelSerializer):
                 return None
         return None # Or empty dict {}
 
-    @transaction.atomic
     def update(self, instance: UserProfile, validated_data):
         """
         Handle updates to UserProfile and potentially nested User and Patient/Doctor details.
+        Nested data is validated along with the profile fields; only the models with changed
+        fields are written, each with just those columns (see health/dirty.py). The view
+        select_related()s user and details, so the response renders from memory.
         """
         # Pop the write-only nested data dictionaries
         user_update_data = validated_data.pop('user_update', None)
         patient_details_update_data = validated_data.pop('patient_details_update', None)
         doctor_details_update_data = validated_data.pop('doctor_details_update', None)
 
-        # Update direct UserProfile fields using default ModelSerializer behavior
         # validated_data now only contains 'phone_number', 'address', 'date_of_birth' if they were sent
-        instance = super().update(instance, validated_data)
+        pending = [(instance, assign_changes(instance, validated_data))]
 
-        # --- Update Nested User ---
+        # --- Nested User ---
         if user_update_data:
-            user_instance = instance.user
-            user_serializer = UserUpdateSerializer(instance=user_instance, data=user_update_data, partial=self.partial)
-            if user_serializer.is_valid(): # Perform validation
-                user_serializer.save()
-            else:
-                # Raise validation error if nested user data is invalid
-                raise serializers.ValidationError(user_serializer.errors)
-
-        # --- Update Nested Patient Details ---
+            pending.append((instance.user, assign_changes(instance.user, user_update_data)))
+
+        # --- Nested Patient / Doctor Details (created on first update if missing) ---
         if patient_details_update_data and instance.role == Role.PATIENT:
-            # Get or Create the related PatientProfile instance
-            patient_profile_instance, created = PatientProfile.objects.get_or_create(user_profile=instance)
-            patient_serializer = PatientDetailSerializer(instance=patient_profile_instance, data=patient_details_update_data, partial=self.partial)
-            if patient_serializer.is_valid(): # Perform validation
-                patient_serializer.save()
-            else:
-                 # Raise validation error if nested patient data is invalid
-                raise serializers.ValidationError(patient_serializer.errors)
-
-        # --- Update Nested Doctor Details ---
+            pending.append(self._details_changes(instance, 'patient_details', PatientProfile, patient_details_update_data))
         if doctor_details_update_data and instance.role == Role.DOCTOR:
-             # Get or Create the related DoctorProfile instance
-            doctor_profile_instance, created = DoctorProfile.objects.get_or_create(user_profile=instance)
-            doctor_serializer = DoctorDetailSerializer(instance=doctor_profile_instance, data=doctor_details_update_data, partial=self.partial)
-            if doctor_serializer.is_valid(): # Perform validation
-                doctor_serializer.save()
-            else:
-                 # Raise validation error if nested doctor data is invalid
-                raise serializers.ValidationError(doctor_serializer.errors)
-
-        instance.refresh_from_db() # Refresh the instance from DB before returning
+            pending.append(self._details_changes(instance, 'doctor_details', DoctorProfile, doctor_details_update_data))
+
+        save_changes(pending)
         return instance
 
+    @staticmethod
+    def _details_changes(instance, accessor, model, data):
+        try:
+            details = getattr(instance, accessor)
+        except model.DoesNotExist:
+            details = model(user_profile=instance) # Also caches it as instance.<accessor> for the response
+        return details, assign_changes(details, data)
+
+
+# --- Access Log Serializer ---
+class AccessLogSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AccessLog
+        fields = ['id', 'actor_id', 'resource', 'object_id', 'method', 'endpoint', 'accessed_at']
+        read_only_fields = fields
+
 
 # --- Registration Serializer ---
 class RegisterSerializer(serializers.ModelSerializer):
-    # ... (Keep the RegisterSerializer code exactly as provided in the previous response)
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'}, min_length=8)
     password2 = serializers.CharField(write_only=True, required=True, label="Confirm password", style={'input_type': 'password'})
     role = serializers.ChoiceField(choices=Role.choices, write_only=True, required=True)
@@ -188,44 +262,186 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = [ 'username', 'email', 'first_name', 'last_name', 'password', 'password2', 'role', 'phone_number', 'address', 'date_of_birth', 'specialization', 'license_number', 'emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relationship' ]
         extra_kwargs = { 'username': {'min_length': 3} }
 
-    def validate(self, attrs): /* ... */
+    def validate(self, attrs):
+        if attrs['password'] != attrs['password2']:
+            raise serializers.ValidationError({"password": "Password fields didn't match."})
+
+        if User.objects.filter(email__iexact=attrs['email']).exists():
+            raise serializers.ValidationError({"email": "A user with this email already exists."})
+
+        # Doctors must supply their professional details
+        if attrs['role'] == Role.DOCTOR:
+            if not attrs.get('specialization'):
+                raise serializers.ValidationError({"specialization": "Specialization is required for doctors."})
+            if not attrs.get('license_number'):
+                raise serializers.ValidationError({"license_number": "License number is required for doctors."})
+            if DoctorProfile.objects.filter(license_number=attrs['license_number']).exists():
+                raise serializers.ValidationError({"license_number": "A doctor with this license number already exists."})
+        return attrs
+
     @transaction.atomic
-    def create(self, validated_data): /* ... */
+    def create(self, validated_data):
+        # Split the payload into User, UserProfile and role-specific parts
+        validated_data.pop('password2')
+        password = validated_data.pop('password')
+        role = validated_data.pop('role')
+        profile_data = {
+            'phone_number': validated_data.pop('phone_number'),
+            'address': validated_data.pop('address'),
+            'date_of_birth': validated_data.pop('date_of_birth'),
+        }
+        specialization = validated_data.pop('specialization', '')
+        license_number = validated_data.pop('license_number', '')
+        emergency_contact_name = validated_data.pop('emergency_contact_name', '')
+        emergency_contact_phone = validated_data.pop('emergency_contact_phone', '')
+        validated_data.pop('emergency_contact_relationship', None) # Not stored on PatientProfile yet
+
+        # Hash through the policy pool (health/hashing.py) rather than create_user's inline hashing
+        user = User(**validated_data)
+        # What create_user would do besides hashing
+        user.username = User.normalize_username(user.username)
+        user.email = User.objects.normalize_email(user.email)
+        user.password = hash_password(password)
+        user.save()
+        user_profile = UserProfile.objects.create(user=user, role=role, **profile_data)
+
+        if role == Role.DOCTOR:
+            DoctorProfile.objects.create(
+                user_profile=user_profile,
+                specialization=specialization,
+                license_number=license_number,
+            )
+        elif role == Role.PATIENT:
+            PatientProfile.objects.create(
+                user_profile=user_profile,
+                emergency_contact_name=emergency_contact_name or None,
+                emergency_contact_phone=emergency_contact_phone or None,
+            )
+        return user
+
+
+# --- Bulk Import Row Serializer ---
+# One row of `manage.py import_users` / POST /api/admin/import/ (see health/importing.py).
+# Same fields and rules as registration, minus the per-row database lookups: uniqueness
+# is checked for a whole chunk at once. Password is optional (users without one get a
+# set-password token).
+class UserImportRowSerializer(serializers.Serializer):
+    username = serializers.CharField(min_length=3, max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254)
+    first_name = serializers.CharField(max_length=150)
+    last_name = serializers.CharField(max_length=150)
+    password = serializers.CharField(required=False, min_length=8)
+    role = serializers.ChoiceField(choices=Role.choices)
+    phone_number = serializers.CharField(max_length=15)
+    address = serializers.CharField()
+    date_of_birth = serializers.DateField()
+    specialization = serializers.CharField(required=False, max_length=100)
+    license_number = serializers.CharField(required=False, max_length=50)
+    years_of_experience = serializers.IntegerField(required=False, min_value=0)
+    emergency_contact_name = serializers.CharField(required=False, max_length=100)
+    emergency_contact_phone = serializers.CharField(required=False, max_length=15)
+
+    def to_internal_value(self, data):
+        # CSV cells are strings: blank means absent; roles are matched case-insensitively
+        data = {key: value.strip() if isinstance(value, str) else value for key, value in data.items() if key}
+        data = {key: value for key, value in data.items() if value not in ('', None)}
+        if isinstance(data.get('role'), str):
+            data['role'] = data['role'].upper()
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if attrs['role'] == Role.DOCTOR:
+            if not attrs.get('specialization'):
+                raise serializers.ValidationError({"specialization": "Specialization is required for doctors."})
+            if not attrs.get('license_number'):
+                raise serializers.ValidationError({"license_number": "License number is required for doctors."})
+        # Normalized as create_user would, before the importer checks uniqueness
+        attrs['username'] = User.normalize_username(attrs['username'])
+        attrs['email'] = User.objects.normalize_email(attrs['email'])
+        return attrs
 
 
 # --- Health Record Serializer ---
-class HealthRecordSerializer(serializers.ModelSerializer):
-    # ... (Keep as before) ...
+class HealthRecordSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     patient_username = serializers.ReadOnlyField(source='patient.username')
-    class Meta: model = HealthRecord; fields = [ ... ]; read_only_fields = [...]
+
+    class Meta:
+        model = HealthRecord
+        fields = [
+            'id', 'patient', 'patient_username', 'record_time',
+            'blood_pressure_systolic', 'blood_pressure_diastolic',
+            'heart_rate', 'glucose_level', 'temperature', 'notes',
+        ]
+        read_only_fields = ['id', 'patient', 'patient_username']
 
 
 # --- Appointment Serializers ---
 # Appointment Serializer (Handles Create/Retrieve/Update logic)
 class AppointmentSerializer(serializers.ModelSerializer):
-    # ... (Keep as before, ensuring patient_id/doctor_id are write_only with source) ...
     patient = UserSerializer(read_only=True)
     doctor = UserSerializer(read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     patient_id = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(profile__role=Role.PATIENT), source='patient', write_only=True, required=True)
     doctor_id = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(profile__role=Role.DOCTOR), source='doctor', write_only=True, required=True)
 
-    class Meta: model = Appointment; fields = [ ... ]; read_only_fields = [...]; extra_kwargs = { ... }
-    def validate_appointment_time(self, value): /* ... */
+    class Meta:
+        model = Appointment
+        fields = [
+            'id', 'patient', 'doctor', 'patient_id', 'doctor_id',
+            'appointment_time', 'reason', 'status', 'status_display',
+            'consultation_notes', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'status', 'status_display', 'consultation_notes', 'created_at', 'updated_at']
+        extra_kwargs = { 'reason': {'required': False, 'allow_blank': True, 'allow_null': True} }
+
+    def validate_appointment_time(self, value):
+        # Appointments can only be booked in the future
+        if value <= timezone.now():
+            raise serializers.ValidationError("Appointment time must be in the future.")
+        return value
 
 
 # Appointment List Serializer (For read-only lists)
-class AppointmentListSerializer(serializers.ModelSerializer):
-    # ... (Keep as before) ...
+class AppointmentListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     patient_name = serializers.CharField(source='patient.get_full_name', read_only=True)
     doctor_name = serializers.CharField(source='doctor.get_full_name', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    sparse_columns = {
+        'patient_name': ['patient__first_name', 'patient__last_name'],
+        'doctor_name': ['doctor__first_name', 'doctor__last_name'],
+        'status_display': ['status'],
+    }
     class Meta: model = Appointment; fields = ['id', 'patient_name', 'doctor_name', 'appointment_time', 'status', 'status_display', 'reason']
 
 
 # --- Doctor/Patient List Serializers ---
 # Serializer for Doctors viewing their Patients list
-class DoctorPatientSerializer(serializers.ModelSerializer):
-    # ... (Keep as before) ...
-    email = serializers.CharField(source='user.email', read_only=True); first_name = serializers.CharField(source='user.first_name', read_only=True); last_name = serializers.CharField(source='user.last_name', read_only=True); phone_number = serializers.CharField(source='profile.phone_number', read_only=True); date_of_birth = serializers.DateField(source='profile.date_of_birth', read_only=True)
-    class Meta: model = User; fields = ['id', 'username', 'first_name', 'last_name', 'email', 'phone_number', 'date_of_birth']
\ No newline at end of file
+class DoctorPatientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    phone_number = serializers.CharField(source='profile.phone_number', read_only=True)
+    date_of_birth = serializers.DateField(source='profile.date_of_birth', read_only=True)
+    class Meta: model = User; fields = ['id', 'username', 'first_name', 'last_name', 'email', 'phone_number', 'date_of_birth']
+
+
+# --- Token Serializers ---
+# Refresh serializer that honours the in-memory revocation state (see health/revocation.py)
+class RevocationAwareTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if revocations.is_revoked(refresh.get('jti'), refresh.get('user_id'), refresh.get('iat')):
+            raise InvalidToken({'detail': 'Token has been revoked.', 'code': 'token_revoked'})
+        return super().validate(attrs)
+
+
+# Logout: revoke the given refresh token, optionally every token of the user
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=True)
+    all_devices = serializers.BooleanField(required=False, default=False)
+
+    def validate_refresh(self, value):
+        try:
+            token = RefreshToken(value)
+        except TokenError:
+            raise serializers.ValidationError("Invalid or expired refresh token.")
+        if str(token.get('user_id')) != str(self.context['request'].user.id):
+            raise serializers.ValidationError("Refresh token does not belong to the current user.")
+        return token
@@ -0,0 +1,177 @@
+# health/series.py
+"""
+Column-oriented, in-memory vitals series for analytical code paths.
+
+A ``VitalsSeries`` holds one patient's readings as parallel typed arrays:
+epoch seconds (int64) plus one float32 column and one presence mask per
+metric. That is 33 bytes per reading instead of a model instance with its
+``__dict__``, Decimals and datetime objects. Readings are kept in ascending
+time order so time-range slicing is a binary search.
+"""
+import heapq
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+
+METRICS = ['blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'glucose_level', 'temperature']
+
+_MAGIC = b'VSER'
+_VERSION = 1
+_HEADER = struct.Struct('<4sBxxxqI') # magic, version, padding, patient id, reading count
+
+
+def _epoch(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+class VitalsSeries:
+    def __init__(self, patient_id=None):
+        self.patient_id = patient_id
+        self.times = array('q')
+        self.values = {name: array('f') for name in METRICS}
+        self.masks = {name: bytearray() for name in METRICS} # 1 = value present
+
+    # --- Construction ---
+
+    @classmethod
+    def from_rows(cls, rows, patient_id=None):
+        """rows: iterable of (record_time, *METRICS) tuples in ascending time order."""
+        series = cls(patient_id)
+        times = series.times
+        columns = [(series.values[name], series.masks[name]) for name in METRICS]
+        for row in rows:
+            times.append(_epoch(row[0]))
+            for (values, mask), value in zip(columns, row[1:]):
+                if value is None:
+                    values.append(float('nan'))
+                    mask.append(0)
+                else:
+                    values.append(float(value))
+                    mask.append(1)
+        return series
+
+    @classmethod
+    def from_queryset(cls, queryset, patient_id=None):
+        """Build from a HealthRecord queryset without instantiating models."""
+        rows = queryset.order_by('record_time').values_list('record_time', *METRICS).iterator(chunk_size=5000)
+        return cls.from_rows(rows, patient_id)
+
+    @classmethod
+    def for_patient(cls, patient_id, start=None, end=None):
+        """A patient's readings in [start, end) from both the archive and the hot table."""
+        from .archive import COLUMNS, archived_chunks, decode_rows
+        from .models import HealthRecord
+
+        positions = [COLUMNS.index('record_time')] + [COLUMNS.index(name) for name in METRICS]
+        archived = (
+            tuple(row[i] for i in positions)
+            for chunk in archived_chunks([patient_id], start, end).order_by('month')
+            for row in decode_rows(chunk.data)
+        )
+        hot = HealthRecord.objects.for_patient(patient_id)
+        if start:
+            hot = hot.filter(record_time__gte=start)
+        if end:
+            hot = hot.filter(record_time__lt=end)
+        hot = hot.order_by('record_time').values_list('record_time', *METRICS).iterator(chunk_size=5000)
+
+        # Both tiers are time-ordered; late readings not yet archived can interleave with archived months
+        series = cls.from_rows(heapq.merge(archived, hot, key=lambda row: row[0]), patient_id)
+        return series.between(start, end) if (start or end) else series
+
+    def extend(self, other):
+        """Append ``other`` (which must start at or after this series' last reading)."""
+        self.times.extend(other.times)
+        for name in METRICS:
+            self.values[name].extend(other.values[name])
+            self.masks[name].extend(other.masks[name])
+
+    # --- Access ---
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def nbytes(self):
+        return (
+            self.times.itemsize * len(self.times)
+            + sum(col.itemsize * len(col) for col in self.values.values())
+            + sum(len(mask) for mask in self.masks.values())
+        )
+
+    def between(self, start=None, end=None):
+        """Readings with start <= time < end as a new series (bounds found by binary search)."""
+        lo = bisect_left(self.times, _epoch(start)) if start is not None else 0
+        hi = bisect_left(self.times, _epoch(end)) if end is not None else len(self.times)
+        series = VitalsSeries(self.patient_id)
+        series.times = self.times[lo:hi]
+        for name in METRICS:
+            series.values[name] = self.values[name][lo:hi]
+            series.masks[name] = self.masks[name][lo:hi]
+        return series
+
+    def column(self, name):
+        """Present values of one metric as a list of (epoch seconds, value)."""
+        values, mask = self.values[name], self.masks[name]
+        return [(t, values[i]) for i, t in enumerate(self.times) if mask[i]]
+
+    def datetimes(self):
+        return [datetime.fromtimestamp(t, tz=dt_timezone.utc) for t in self.times]
+
+    # --- Export ---
+
+    def to_numpy(self):
+        """
+        Zero-copy NumPy views: {'time': int64[], metric: float32[], metric + '_mask': bool[]}.
+        The views share memory with this series; copy them before mutating the series.
+        """
+        import numpy as np # Optional dependency, only needed for this export
+
+        result = {'time': np.frombuffer(self.times, dtype=np.int64)}
+        for name in METRICS:
+            result[name] = np.frombuffer(self.values[name], dtype=np.float32)
+            result[f'{name}_mask'] = np.frombuffer(self.masks[name], dtype=np.bool_)
+        return result
+
+    def to_bytes(self):
+        """Compact little-endian serialization (header + raw column buffers), e.g. for caching."""
+        parts = [_HEADER.pack(_MAGIC, _VERSION, self.patient_id or 0, len(self))]
+        parts.append(_little_endian(self.times).tobytes())
+        for name in METRICS:
+            parts.append(_little_endian(self.values[name]).tobytes())
+        for name in METRICS:
+            parts.append(bytes(self.masks[name]))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, patient_id, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not a serialized VitalsSeries (or unsupported version).")
+        series = cls(patient_id or None)
+        offset = _HEADER.size
+        series.times, offset = _read_array('q', data, offset, count)
+        for name in METRICS:
+            series.values[name], offset = _read_array('f', data, offset, count)
+        for name in METRICS:
+            series.masks[name] = bytearray(data[offset:offset + count])
+            offset += count
+        return series
+
+
+def _little_endian(values):
+    if struct.pack('=H', 1) == struct.pack('<H', 1):
+        return values
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped
+
+
+def _read_array(typecode, data, offset, count):
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    values.frombytes(data[offset:end])
+    return _little_endian(values), end
@@ -0,0 +1,580 @@
+# health/sharding.py
+"""
+Patient-sharded storage for vitals (``HealthRecord``) and appointments.
+
+``SHARDING['SHARDS']`` lists the database aliases holding these two tables.
+Each patient's rows live on exactly one of them, picked by consistent hashing
+of the patient id over a ring with ``VNODES`` points per alias: adding a shard
+moves only about 1/n of the patients, and ``manage.py reshard`` moves their
+rows. Users, profiles and every other table stay on ``default``.
+
+- Writes go to the patient's shard (``PatientShardRouter``; ``create()`` and
+  ``bulk_create()`` without ``using()`` route each row by ``patient_id``).
+- One patient's rows: ``Model.objects.for_patient(id)`` for queries that don't
+  join to users, or ``shard_queryset(queryset, [id])``.
+- Several patients' rows (a doctor's appointments, patients and their vitals):
+  ``shard_queryset(queryset, patient_ids)`` runs the query on every shard
+  involved, in parallel, and merges the results in the query's order. Shards
+  can't join to users, so ``select_related()`` and ordering on user fields
+  become a prefetch from ``default`` after the merge.
+
+Ids stay unique across shards: new rows get theirs from ``ShardSequence`` on
+``default``, each process reserving ``ID_BATCH`` at a time (a reservation that
+is rolled back with the caller's transaction is not reused), and resharded rows
+keep theirs. With ``SHARDS`` empty (the default) sharding is off: the router stands aside
+and ``shard_queryset`` returns the queryset unchanged.
+
+Search, the vitals archive, appointment sweeps and the reminder scheduler
+cover every shard. The admin changelists still list ``default`` only.
+"""
+import bisect
+import hashlib
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F, Max, prefetch_related_objects
+from django.db.models.functions import Greatest
+
+DEFAULTS = {
+    'SHARDS': [],           # Aliases holding vitals and appointments; empty = all on 'default'
+    'VNODES': 128,          # Ring points per shard (more = more even spread)
+    'ID_BATCH': 100,        # Ids a process reserves per ShardSequence update
+    'MAX_WORKERS': 8,       # Threads for scatter-gather reads (one per shard involved, up to this)
+}
+
+SHARDED_MODELS = ('health.HealthRecord', 'health.Appointment') # Split by their patient_id
+# Also created on the shards (empty), so deletes there find the tables they cascade to
+SHARD_TABLES = SHARDED_MODELS + ('health.SentReminder',)
+
+
+def shard_setting(name):
+    return getattr(settings, 'SHARDING', {}).get(name, DEFAULTS[name])
+
+
+def sharding_enabled():
+    return bool(shard_setting('SHARDS'))
+
+
+def shard_aliases():
+    return list(shard_setting('SHARDS')) or ['default']
+
+
+def is_sharded(model):
+    return model._meta.label in SHARDED_MODELS
+
+
+# --- Shard Map ---
+
+def _hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big')
+
+
+class ShardRing:
+    """Consistent hash ring: a key belongs to the alias of the first point at or after its hash."""
+    def __init__(self, aliases, vnodes):
+        points = sorted((_hash(f'{alias}#{i}'), alias) for alias in aliases for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._aliases = [alias for _, alias in points]
+
+    def shard_for(self, key):
+        index = bisect.bisect_left(self._hashes, _hash(str(key)))
+        return self._aliases[index % len(self._aliases)]
+
+
+@lru_cache(maxsize=8)
+def _ring(aliases, vnodes):
+    return ShardRing(aliases, vnodes)
+
+
+def shard_for(patient_id):
+    """Alias of the database holding ``patient_id``'s vitals and appointments."""
+    if not sharding_enabled():
+        return 'default'
+    return _ring(tuple(shard_setting('SHARDS')), shard_setting('VNODES')).shard_for(patient_id)
+
+
+# --- Router ---
+
+class PatientShardRouter:
+    """
+    With sharding on: vitals and appointments go to their patient's shard (rows
+    loaded from a shard stay on it), everything else to ``default``, including
+    users reached from a shard row. Unhinted reads of sharded models fall back
+    to ``default``; use ``shard_queryset`` or ``for_patient`` for those.
+    """
+    def db_for_read(self, model, **hints):
+        if not sharding_enabled():
+            return None
+        if not is_sharded(model):
+            return 'default'
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if is_sharded(type(instance)):
+            if instance._state.adding:
+                return shard_for(instance.patient_id) if instance.patient_id is not None else None
+            return instance._state.db
+        if instance._meta.label == settings.AUTH_USER_MODEL:
+            return shard_for(instance.pk) # Reverse relations of a patient (user.health_records, ...)
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if sharding_enabled() and (is_sharded(type(obj1)) or is_sharded(type(obj2))):
+            return True # Shard rows point at users on 'default'
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == 'default' or db not in shard_setting('SHARDS'):
+            return None
+        if model_name is None:
+            return None # RunPython/RunSQL: the search index triggers work per database
+        return f'{app_label}.{model_name}' in {label.lower() for label in SHARD_TABLES}
+
+
+class PatientShardedQuerySet(models.QuerySet):
+    """Queryset (and manager) of the sharded models."""
+
+    def for_patient(self, patient_id):
+        """This patient's rows, on their shard. The shard has no users table: don't join to it."""
+        return self.using(shard_for(patient_id)).filter(patient_id=patient_id)
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db) # No using(): the router picks the patient's shard (and pre_save the id)
+        return obj
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if self._db is not None or not sharding_enabled():
+            return super().bulk_create(objs, *args, **kwargs)
+        objs = list(objs)
+        new = [obj for obj in objs if obj.pk is None]
+        for obj, pk in zip(new, id_allocator.allocate(self.model, len(new)) if new else ()):
+            obj.pk = pk
+        by_shard = {}
+        for obj in objs:
+            by_shard.setdefault(shard_for(obj.patient_id), []).append(obj)
+        for alias, shard_objs in by_shard.items():
+            self.using(alias).bulk_create(shard_objs, *args, **kwargs)
+        return objs
+
+
+# --- Scatter-Gather ---
+
+def scatter(function, aliases):
+    """
+    ``function(alias)`` for each alias, in parallel threads when there are
+    several; results in alias order. Aliases with a transaction open in this
+    thread are queried from it, so the reads see that transaction's writes.
+    """
+    inline = {alias for alias in aliases if connections[alias].in_atomic_block}
+    if len(aliases) - len(inline) <= 1:
+        return [function(alias) for alias in aliases]
+    threaded = [alias for alias in aliases if alias not in inline]
+    with ThreadPoolExecutor(max_workers=min(shard_setting('MAX_WORKERS'), len(threaded))) as pool:
+        futures = {alias: pool.submit(_in_thread, function, alias) for alias in threaded}
+        return [futures[alias].result() if alias in futures else function(alias) for alias in aliases]
+
+
+def _in_thread(function, alias):
+    try:
+        return function(alias)
+    finally:
+        connections.close_all() # Pool threads get their own DB connections; don't leak them
+
+
+def shard_queryset(queryset, patient_ids=None):
+    """
+    ``queryset`` over the shards holding ``patient_ids`` (all shards if None), as
+    a ShardQuerySet; returned unchanged when sharding is off.
+    """
+    if not sharding_enabled():
+        return queryset
+    if patient_ids is None:
+        return ShardQuerySet(queryset, shard_aliases())
+    involved = {shard_for(patient_id) for patient_id in patient_ids}
+    return ShardQuerySet(queryset, [alias for alias in shard_aliases() if alias in involved])
+
+
+def doctor_patient_ids(doctor):
+    """Ids of the patients ``doctor`` has appointments with: a subquery, or with sharding on, a list from every shard."""
+    from .models import Appointment
+
+    patient_ids = Appointment.objects.filter(doctor=doctor).values_list('patient_id', flat=True).distinct()
+    if not sharding_enabled():
+        return patient_ids
+    return sorted(set(shard_queryset(patient_ids)))
+
+
+def _relation_paths(tree, prefix=''):
+    """Query.select_related ({'patient': {'profile': {}}}) -> ['patient__profile']."""
+    for name, subtree in tree.items():
+        if subtree:
+            yield from _relation_paths(subtree, f'{prefix}{name}__')
+        else:
+            yield prefix + name
+
+
+def _sort_value(row, path):
+    if isinstance(row, dict):
+        value = row.get(path)
+    else:
+        value = row
+        for name in path.split('__'):
+            value = getattr(value, name)
+    return (value is not None, value) # NULLs first ascending, like SQLite
+
+
+class _Descending:
+    """Sort value of a descending field within a key that mixes directions."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def _merge_key(ordering):
+    fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+    return lambda row: [_Descending(_sort_value(row, name)) if descending else _sort_value(row, name)
+                        for name, descending in fields]
+
+
+class ShardQuerySet:
+    """
+    A read-only queryset spread over several shards. Chained calls (filter,
+    order_by, slicing, ...) build the query; evaluating it runs it on each shard
+    in parallel and merges the per-shard results, which each shard returns
+    already ordered, into the query's order. When the order involves user
+    fields, rows are sorted after the prefetch instead. Results are cached like
+    a QuerySet's; values()/values_list() rows that can't be keyed are simply
+    concatenated.
+    """
+    def __init__(self, queryset, aliases):
+        self.queryset = queryset
+        self.aliases = list(aliases)
+        self._result_cache = None
+
+    def __repr__(self):
+        return f'<ShardQuerySet {self.aliases} {self.queryset.query}>'
+
+    @property
+    def model(self):
+        return self.queryset.model
+
+    @property
+    def ordered(self):
+        return self.queryset.ordered
+
+    def _chain(self, method, *args, **kwargs):
+        return ShardQuerySet(getattr(self.queryset, method)(*args, **kwargs), self.aliases)
+
+    def all(self):
+        return self._chain('all')
+
+    def filter(self, *args, **kwargs):
+        return self._chain('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._chain('exclude', *args, **kwargs)
+
+    def order_by(self, *fields):
+        return self._chain('order_by', *fields)
+
+    def select_related(self, *fields):
+        return self._chain('select_related', *fields)
+
+    def prefetch_related(self, *lookups):
+        return self._chain('prefetch_related', *lookups)
+
+    def only(self, *fields):
+        return self._chain('only', *fields)
+
+    def defer(self, *fields):
+        return self._chain('defer', *fields)
+
+    def distinct(self, *fields):
+        return self._chain('distinct', *fields)
+
+    def annotate(self, *args, **kwargs):
+        return self._chain('annotate', *args, **kwargs)
+
+    def values(self, *fields, **expressions):
+        return self._chain('values', *fields, **expressions)
+
+    def values_list(self, *fields, **kwargs):
+        return self._chain('values_list', *fields, **kwargs)
+
+    def none(self):
+        return ShardQuerySet(self.queryset.none(), [])
+
+    # --- Evaluation ---
+
+    def __iter__(self):
+        return iter(self._fetch())
+
+    def iterator(self, chunk_size=None):
+        return iter(self._fetch())
+
+    def __len__(self):
+        return len(self._fetch())
+
+    def __bool__(self):
+        return bool(self._fetch())
+
+    def __getitem__(self, k):
+        if self._result_cache is not None:
+            return self._result_cache[k]
+        if isinstance(k, slice):
+            return self._chain('__getitem__', k)
+        return self._chain('__getitem__', slice(k, k + 1))._fetch()[0]
+
+    def count(self):
+        if self._result_cache is not None or self.queryset.query.is_sliced:
+            return len(self._fetch())
+        return sum(scatter(lambda alias: self.queryset.using(alias).count(), self.aliases))
+
+    def exists(self):
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+        return any(scatter(lambda alias: self.queryset.using(alias).exists(), self.aliases))
+
+    def get(self, *args, **kwargs):
+        rows = self.filter(*args, **kwargs)._fetch()
+        if len(rows) == 1:
+            return rows[0]
+        name = self.model._meta.object_name
+        if not rows:
+            raise self.model.DoesNotExist(f"{name} matching query does not exist.")
+        raise self.model.MultipleObjectsReturned(f"get() returned more than one {name} -- it returned {len(rows)}!")
+
+    def _fetch(self):
+        if self._result_cache is None:
+            self._result_cache = self._gather()
+        return self._result_cache
+
+    def _gather(self):
+        queryset = self.queryset.all()
+        query = queryset.query
+        low, high = query.low_mark, query.high_mark
+        query.clear_limits()
+
+        ordering = list(query.order_by or (self.model._meta.ordering if query.default_ordering else ()))
+        if not all(isinstance(field, str) for field in ordering):
+            raise TypeError("Cross-shard queries can only be ordered by field names.")
+        local = [field for field in ordering if '__' not in field]
+        joined = [field for field in ordering if '__' in field]
+
+        related = set()
+        if query.select_related is True:
+            related = {field.name for field in self.model._meta.concrete_fields if field.is_relation}
+        elif query.select_related:
+            related = set(_relation_paths(query.select_related))
+        related |= {field.lstrip('-').rsplit('__', 1)[0] for field in joined}
+        if query.select_related:
+            queryset = queryset.select_related(None)
+        names, defer = query.deferred_loading
+        if any('__' in name for name in names):
+            local_names = {name for name in names if '__' not in name}
+            if not defer:
+                local_names |= {path.split('__')[0] for path in related} # The columns the prefetch follows
+            queryset = queryset.defer(None)
+            queryset = queryset.defer(*local_names) if defer else queryset.only(*local_names)
+        if ordering:
+            queryset = queryset.order_by(*local)
+
+        # Each shard's top ``high`` rows hold the merged top ``high``, unless the order needs user fields
+        mergeable = not joined
+        limit = high if mergeable else None
+        parts = scatter(lambda alias: list(queryset.using(alias)[:limit]), self.aliases)
+
+        rows = [row for part in parts for row in part]
+        keyed = bool(rows) and isinstance(rows[0], (models.Model, dict))
+        if mergeable and ordering and keyed and len(parts) > 1:
+            rows = list(heapq.merge(*parts, key=_merge_key(ordering)))
+        if mergeable:
+            rows = rows[low:high] # Prefetch only what is returned
+        if related and rows and isinstance(rows[0], models.Model):
+            prefetch_related_objects(rows, *sorted(related))
+        if not mergeable:
+            if keyed:
+                for field in reversed(ordering): # Stable sorts, least significant field first
+                    rows.sort(key=lambda row: _sort_value(row, field.lstrip('-')), reverse=field.startswith('-'))
+            rows = rows[low:high]
+        return rows
+
+
+# --- Ids ---
+
+class IdRange:
+    """
+    Reserved ids [next, end). Reserved inside a transaction on 'default', the
+    range only holds once that transaction commits: until then it is pending,
+    and usable only while the reservation's on_commit callback is still queued
+    on this thread's connection (a rollback, or a savepoint rollback, drops it).
+    """
+    def __init__(self, start, end):
+        self.next, self.end = start, end
+        self.pending = transaction.get_connection('default').in_atomic_block
+        if self.pending:
+            transaction.on_commit(self._committed, using='default')
+
+    def _committed(self):
+        self.pending = False
+
+    def usable(self):
+        if not self.pending:
+            return True
+        return any(callback == self._committed for _, callback, _ in transaction.get_connection('default').run_on_commit)
+
+
+class IdAllocator:
+    """Hi/lo ids from ShardSequence: one UPDATE on 'default' per ``ID_BATCH`` ids, per model and process."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget the reserved ids (in a forked child; in tests after the database is reset)."""
+        self._lock = threading.Lock()
+        self._ranges = {} # label -> IdRange
+
+    def allocate(self, model, count=1):
+        """``count`` fresh ids for ``model``, ascending (one reservation covers them all)."""
+        label = model._meta.label
+        with self._lock:
+            current = self._ranges.get(label)
+            floor = 0
+            if current is not None and not current.usable():
+                # Rolled back (or another thread's open transaction): the ids it handed out may be in
+                # use on the shards, so the next reservation starts above them
+                floor, current = current.next, None
+            if current is None or current.end - current.next < count:
+                batch = max(count, shard_setting('ID_BATCH'))
+                start = _reserve(model, batch, floor)
+                current = self._ranges[label] = IdRange(start, start + batch)
+            ids = list(range(current.next, current.next + count))
+            current.next += count
+            return ids
+
+
+def _reserve(model, count, floor=0):
+    """First of ``count`` ids reserved in ShardSequence (started above every id on any shard, and at least ``floor``)."""
+    from .models import ShardSequence
+
+    label = model._meta.label
+    next_id = Greatest(F('next_id'), floor) if floor else F('next_id')
+    for _ in range(2): # Lost a race to create the row: it exists now
+        with transaction.atomic(using='default'):
+            if ShardSequence.objects.using('default').filter(name=label).update(next_id=next_id + count):
+                return ShardSequence.objects.using('default').get(name=label).next_id - count
+            highest = max((model._base_manager.using(alias).aggregate(top=Max('pk'))['top'] or 0
+                           for alias in dict.fromkeys(['default'] + shard_aliases())), default=0)
+            start = max(highest + 1, floor)
+            try:
+                with transaction.atomic(using='default'):
+                    ShardSequence.objects.using('default').create(name=label, next_id=start + count)
+                return start
+            except IntegrityError:
+                continue
+    raise RuntimeError(f"Could not reserve ids for {label}")
+
+
+id_allocator = IdAllocator()
+# A forked worker must not hand out the ids its parent had reserved
+os.register_at_fork(after_in_child=id_allocator.reset)
+
+
+def assign_id(sender, instance, raw=False, **kwargs):
+    """pre_save of a sharded model: give a new row its id."""
+    if instance.pk is None and not raw and sharding_enabled():
+        instance.pk = id_allocator.allocate(sender)[0]
+
+
+# --- Maintenance ---
+
+def misplaced_patients(alias):
+    """{target alias: [patient ids]} for the patients with rows on ``alias`` that the ring now assigns elsewhere."""
+    found = set()
+    for label in SHARDED_MODELS:
+        found.update(apps.get_model(label)._base_manager.using(alias).values_list('patient_id', flat=True).distinct())
+    moves = {}
+    for patient_id in sorted(found):
+        target = shard_for(patient_id)
+        if target != alias:
+            moves.setdefault(target, []).append(patient_id)
+    return moves
+
+
+class ShardMoveConflict(RuntimeError):
+    """A row being moved has an id that another patient's row already holds on the target."""
+
+
+def move_patients(patient_ids, source, target, batch_size=1000):
+    """
+    Move these patients' vitals and appointments from ``source`` to ``target``,
+    ``batch_size`` rows per transaction pair, keeping their ids. The target
+    commits first: if the source commit then fails, the rows exist on both and
+    a re-run finishes the move (the copies already on the target are skipped).
+    A row is deleted from the source only once the target holds it; an id held
+    there by another patient's row raises ShardMoveConflict and rolls the batch
+    back. Deletes bypass cascades and signals: the rows still exist, elsewhere.
+    Returns the number of rows moved.
+    """
+    moved = 0
+    for label in SHARDED_MODELS:
+        model = apps.get_model(label)
+        rows = model._base_manager.using(source).filter(patient_id__in=patient_ids).order_by('pk')
+        while True:
+            with transaction.atomic(using=source), transaction.atomic(using=target):
+                batch = list(rows[:batch_size])
+                if not batch:
+                    break
+                pks = [row.pk for row in batch]
+                model._base_manager.using(target).bulk_create(batch, ignore_conflicts=True)
+                landed = dict(model._base_manager.using(target).filter(pk__in=pks).values_list('pk', 'patient_id'))
+                clashes = [row.pk for row in batch if landed.get(row.pk) != row.patient_id]
+                if clashes:
+                    raise ShardMoveConflict(
+                        f"{label} ids {clashes[:10]} on '{source}' are taken on '{target}' by other "
+                        f"patients' rows ({len(clashes)} in this batch); nothing in it was moved.")
+                model._base_manager.using(source).filter(pk__in=pks)._raw_delete(source)
+            moved += len(batch)
+    return moved
+
+
+def delete_user_rows(sender, instance, using, **kwargs):
+    """post_delete of a user: deletes cascade on 'default' only, so clear their rows from the shards too."""
+    from .models import Appointment, HealthRecord
+
+    if not sharding_enabled():
+        return
+    patient_shard = shard_for(instance.pk)
+    for alias in shard_aliases():
+        if alias == using:
+            continue # Already cascaded
+        if alias == patient_shard:
+            HealthRecord.objects.using(alias).filter(patient_id=instance.pk).delete()
+            Appointment.objects.using(alias).filter(patient_id=instance.pk).delete()
+        Appointment.objects.using(alias).filter(doctor_id=instance.pk).delete()
+
+
+def connect_signals():
+    from django.contrib.auth import get_user_model
+    from django.db.models.signals import post_delete, pre_save
+
+    for label in SHARDED_MODELS:
+        pre_save.connect(assign_id, sender=apps.get_model(label), dispatch_uid=f'shard_assign_id_{label}')
+    post_delete.connect(delete_user_rows, sender=get_user_model(), dispatch_uid='shard_delete_user_rows')
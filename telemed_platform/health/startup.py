@@ -0,0 +1,63 @@
+# health/startup.py
+"""
+Worker boot: measuring it and sharing it.
+
+- ``timed_setup()`` runs ``django.setup()`` and records how long each
+  ``AppConfig.ready()`` took. ``manage.py profile_startup`` runs it in a fresh
+  interpreter under ``-X importtime`` to get per-module import costs too.
+- ``preload()`` is for a preforking server's master process (see
+  ``gunicorn.conf.py``): it imports everything the first request would
+  otherwise pay for, builds the URL resolver, then moves all of it into the
+  GC's permanent generation so forked workers keep sharing those pages
+  copy-on-write instead of touching them on their first collection.
+"""
+import gc
+import importlib
+import time
+
+# Imported lazily by the views and the admin; preload() pulls them into the master
+PRELOAD_MODULES = ['health.archive', 'health.timeline', 'health.search', 'health.lifecycle']
+
+
+def timed_setup():
+    """django.setup() with timing. Returns {'setup': seconds, 'ready': {app label: seconds}}."""
+    import django
+    from django.apps.config import AppConfig
+
+    ready_times = {}
+    original_create = AppConfig.create.__func__
+
+    def create(cls, entry):
+        app_config = original_create(cls, entry)
+        ready = app_config.ready
+
+        def timed_ready():
+            started = time.perf_counter()
+            try:
+                ready()
+            finally:
+                ready_times[app_config.label] = time.perf_counter() - started
+        app_config.ready = timed_ready
+        return app_config
+
+    AppConfig.create = classmethod(create)
+    started = time.perf_counter()
+    try:
+        django.setup()
+    finally:
+        AppConfig.create = classmethod(original_create)
+    return {'setup': time.perf_counter() - started, 'ready': ready_times}
+
+
+def preload():
+    """Import request-path modules and build the URL resolver, then freeze the heap (call before forking)."""
+    from django.db import connections
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    resolver.url_patterns # Imports the URLconf: views, serializers, permissions
+    resolver.reverse_dict # Compiles every route pattern
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    connections.close_all() # Never share a database connection with the children
+    gc.freeze()
@@ -0,0 +1,17 @@
+// Reload the changelist with the chosen object when an autocomplete filter changes
+'use strict';
+{
+    const $ = django.jQuery;
+    $(function() {
+        $('.health-autocomplete-filter').on('change', function() {
+            const url = new URL(window.location.href);
+            url.searchParams.delete('p'); // Back to the first page
+            if (this.value) {
+                url.searchParams.set(this.dataset.filterParam, this.value);
+            } else {
+                url.searchParams.delete(this.dataset.filterParam);
+            }
+            window.location.href = url.toString();
+        });
+    });
+}
@@ -0,0 +1,123 @@
+# health/templatetags/health_admin.py
+import calendar
+import datetime
+
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.contrib.admin.utils import get_fields_from_path
+from django.db import models
+from django.template import Library
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = Library()
+
+
+def _local_range(queryset, field_name, is_datetime):
+    """(first, last) of the field over ``queryset`` as dates; MIN/MAX use the column index."""
+    date_range = queryset.aggregate(first=models.Min(field_name), last=models.Max(field_name))
+    if not (date_range['first'] and date_range['last']):
+        return None, None
+    if is_datetime:
+        date_range = {k: timezone.localtime(v) if timezone.is_aware(v) else v for k, v in date_range.items()}
+        return date_range['first'].date(), date_range['last'].date()
+    return date_range['first'], date_range['last']
+
+
+def range_date_hierarchy(cl):
+    """
+    Same drill-down as the admin's ``date_hierarchy`` tag, but the choices are
+    the calendar years/months/days between MIN and MAX of the filtered
+    changelist rather than a SELECT DISTINCT over every row. Periods without
+    rows may be listed; following one simply shows an empty page.
+    """
+    if not cl.date_hierarchy:
+        return None
+    field_name = cl.date_hierarchy
+    field = get_fields_from_path(cl.model, field_name)[-1]
+    is_datetime = isinstance(field, models.DateTimeField)
+    year_field = '%s__year' % field_name
+    month_field = '%s__month' % field_name
+    day_field = '%s__day' % field_name
+    field_generic = '%s__' % field_name
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [field_generic])
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            'show': True,
+            'back': {
+                'link': link({year_field: year_lookup, month_field: month_lookup}),
+                'title': capfirst(formats.date_format(day, 'YEAR_MONTH_FORMAT')),
+            },
+            'choices': [{'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT'))}],
+        }
+
+    # The changelist queryset already has any year/month lookups applied
+    first, last = _local_range(cl.queryset, field_name, is_datetime)
+    if first is None:
+        return {'show': True, 'back': None, 'choices': []}
+
+    if not (year_lookup or month_lookup):
+        # Select the appropriate start level, as the admin does
+        if first.year == last.year:
+            year_lookup = first.year
+            if first.month == last.month:
+                month_lookup = first.month
+
+    if year_lookup and month_lookup:
+        year, month = int(year_lookup), int(month_lookup)
+        first_day = first.day if (first.year, first.month) == (year, month) else 1
+        last_day = last.day if (last.year, last.month) == (year, month) else calendar.monthrange(year, month)[1]
+        days = [datetime.date(year, month, d) for d in range(first_day, last_day + 1)]
+        return {
+            'show': True,
+            'back': {'link': link({year_field: year_lookup}), 'title': str(year_lookup)},
+            'choices': [
+                {
+                    'link': link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                    'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT')),
+                }
+                for day in days
+            ],
+        }
+    elif year_lookup:
+        year = int(year_lookup)
+        first_month = first.month if first.year == year else 1
+        last_month = last.month if last.year == year else 12
+        months = [datetime.date(year, m, 1) for m in range(first_month, last_month + 1)]
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [
+                {
+                    'link': link({year_field: year_lookup, month_field: month.month}),
+                    'title': capfirst(formats.date_format(month, 'YEAR_MONTH_FORMAT')),
+                }
+                for month in months
+            ],
+        }
+    return {
+        'show': True,
+        'back': None,
+        'choices': [
+            {'link': link({year_field: str(year)}), 'title': str(year)}
+            for year in range(first.year, last.year + 1)
+        ],
+    }
+
+
+@register.tag(name='range_date_hierarchy')
+def range_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=range_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
@@ -1,5 +1,50 @@
 # telemed_platform/health/tests.py
-from django.test import TestCase
+import asyncio
+import json
+import os
+import time
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import UserProfile, DoctorProfile, PatientProfile, Appointment, HealthRecord, Role, RevokedToken
+from .revocation import revocations, claims_cache, BloomFilter
+from .throttling import local_store, limiter, LocalBucketStore
+from .serializers import RegisterSerializer, UserImportRowSerializer
+from .hashing import hash_password, verify_password, averify_password, shutdown_executor
+from .admin import EstimatedCountPaginator, estimate_row_count
+from .lifecycle import stale_scheduled, transition
+from .models import ArchivedVitalsChunk
+from . import archive
+from .archive import archive_cutoff
+from .series import VitalsSeries
+from .search import search
+from .models import IdempotencyKey
+from .seeding import generate_patient, history_window
+from .startup import PRELOAD_MODULES
+from .compression import negotiate, compress_stream
+from .models import AccessLog
+from .audit import AuditBuffer, audit_log, access_history
+from .models import SentReminder, ShardSequence
+from .reminders import ReminderScheduler, TimingWheel
+from .views import UserImportView
+from .sharding import ShardMoveConflict, ShardQuerySet, ShardRing, id_allocator, move_patients, shard_for, shard_queryset
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # Create your tests here.
 # Example basic test:
@@ -7,4 +52,1321 @@ class BasicTestCase(TestCase):
     def test_example(self):
         self.assertEqual(1 + 1, 2)
 
-# TODO: Add more meaningful tests for models, views, serializers, permissions etc.
\ No newline at end of file
+
+# --- Helpers ---
+
+def make_patient(username='patient', **kwargs):
+    user = User.objects.create_user(username=username, password='pass12345', email=f'{username}@example.com', **kwargs)
+    profile = UserProfile.objects.create(user=user, role=Role.PATIENT, date_of_birth=date(1990, 1, 1))
+    PatientProfile.objects.create(user_profile=profile)
+    return user
+
+def make_doctor(username='doctor', license_number=None, **kwargs):
+    user = User.objects.create_user(username=username, password='pass12345', email=f'{username}@example.com', **kwargs)
+    profile = UserProfile.objects.create(user=user, role=Role.DOCTOR)
+    DoctorProfile.objects.create(user_profile=profile, specialization='GP', license_number=license_number or f'LIC-{username}')
+    return user
+
+
+# --- Token Revocation ---
+
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        revocations.reset()
+        claims_cache.clear()
+        self.patient = make_patient()
+        self.refresh = RefreshToken.for_user(self.patient)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1 << 12, 5)
+        keys = [f'jti-{i}' for i in range(200)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_valid_token_hot_path_skips_revocation_tables(self):
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200) # Warm up sync + claims cache
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('revokedtoken', sql)
+        self.assertNotIn('tokenwatermark', sql)
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        response = self.client.post('/api/logout/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+        self.client.credentials()
+        response = self.client.post('/api/login/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_watermark_revokes_earlier_seconds_but_not_a_same_second_login(self):
+        second = timezone.now().replace(microsecond=0)
+        with mock.patch('rest_framework_simplejwt.tokens.aware_utcnow', return_value=second - timedelta(seconds=1)):
+            earlier = RefreshToken.for_user(self.patient).access_token
+        with mock.patch('rest_framework_simplejwt.tokens.aware_utcnow', return_value=second + timedelta(milliseconds=900)):
+            relogin = RefreshToken.for_user(self.patient).access_token # iat is whole seconds: equals the watermark
+        revocations.revoke_user_tokens(self.patient, not_before=second + timedelta(milliseconds=500))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {earlier}')
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {relogin}')
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        revocations.reset() # Reloaded from the database: same answer
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+
+    def test_logout_everywhere_denies_the_callers_own_tokens(self):
+        response = self.client.post('/api/logout/', {'refresh': str(self.refresh), 'all_devices': True})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401) # Even if issued within the watermark's second
+
+    def test_revocation_from_another_process_is_picked_up_on_sync(self):
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        access = self.refresh.access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        # Simulate another worker writing the row directly
+        RevokedToken.objects.create(jti=access['jti'], user=self.patient, expires_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200) # Not yet synced
+        revocations._next_sync = 0.0
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+
+# --- Throttling & Load Shedding ---
+
+THROTTLE_TEST_RATES = {'login': '2/min', 'register': '2/min', 'vitals_user': '3/min', 'vitals_device': '2/min'}
+
+@override_settings(REST_FRAMEWORK={
+    'DEFAULT_AUTHENTICATION_CLASSES': ('health.authentication.RevocationAwareJWTAuthentication',),
+    'DEFAULT_THROTTLE_RATES': THROTTLE_TEST_RATES,
+})
+class ThrottlingTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        local_store.clear()
+        limiter.reset()
+        self.patient = make_patient()
+
+    def tearDown(self):
+        local_store.clear()
+        limiter.reset()
+
+    def test_bucket_refills_over_time(self):
+        store = LocalBucketStore()
+        self.assertEqual(store.consume('k', 1, 1.0, now=0.0), (True, 0.0))
+        allowed, wait = store.consume('k', 1, 1.0, now=0.5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 0.5)
+        self.assertTrue(store.consume('k', 1, 1.0, now=1.5)[0])
+
+    def test_login_is_throttled_per_ip_with_retry_after(self):
+        payload = {'username': 'patient', 'password': 'wrong-password'}
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/login/', payload).status_code, 401)
+        response = self.client.post('/api/login/', payload)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_vitals_ingest_is_throttled_per_device(self):
+        self.client.force_authenticate(self.patient)
+        for _ in range(2):
+            response = self.client.post('/api/vitals/', {'heart_rate': 70}, HTTP_X_DEVICE_ID='watch-1')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post('/api/vitals/', {'heart_rate': 70}, HTTP_X_DEVICE_ID='watch-1').status_code, 429)
+        # Reads are not throttled
+        self.assertEqual(self.client.get('/api/vitals/').status_code, 200)
+
+    def test_load_shedding_returns_503_when_limit_reached(self):
+        self.client.force_authenticate(self.patient)
+        limiter.in_flight = limiter.limit
+        response = self.client.get('/api/vitals/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(THROTTLING={'MAX_IN_FLIGHT': 20, 'MIN_IN_FLIGHT': 2, 'P95_LATENCY_MS': 100})
+    def test_limit_shrinks_when_p95_over_budget(self):
+        limiter.reset()
+        for _ in range(10):
+            self.assertTrue(limiter.try_acquire())
+            limiter.release(500)
+        self.assertEqual(limiter.limit, 18)
+
+
+# --- Password Hashing Policy ---
+
+@override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000, 'EXECUTOR': 'thread', 'MAX_WORKERS': 2})
+class HashingPolicyTests(APITestCase):
+    def setUp(self):
+        local_store.clear()
+        self.patient = make_patient()
+
+    def tearDown(self):
+        shutdown_executor()
+
+    def test_hash_uses_configured_iterations(self):
+        self.assertTrue(hash_password('secret-pass').startswith('pbkdf2_sha256$1000$'))
+
+    def test_login_upgrades_stale_hash(self):
+        with override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 2000}):
+            self.patient.password = hash_password('pass12345')
+            self.patient.save()
+        response = self.client.post('/api/login/', {'username': 'patient', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        self.patient.refresh_from_db()
+        self.assertTrue(self.patient.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_registration_normalizes_like_create_user(self):
+        serializer = RegisterSerializer(data={
+            'username': 'ﬁona', 'email': 'Fiona@Clinic.EXAMPLE', 'first_name': 'Fi', 'last_name': 'Ona',
+            'password': 'pass-12345-x', 'password2': 'pass-12345-x', 'role': Role.PATIENT,
+            'phone_number': '555', 'address': 'X', 'date_of_birth': '1990-02-03',
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        user = serializer.save()
+        self.assertEqual(user.email, 'Fiona@clinic.example')
+        self.assertEqual(user.username, 'fiona') # NFKC folds the ligature
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_async_verify_does_not_accept_wrong_password(self):
+        self.patient.password = hash_password('pass12345')
+        self.assertFalse(asyncio.run(averify_password(self.patient, 'nope')))
+        self.assertTrue(verify_password(self.patient, 'pass12345'))
+
+
+# --- Admin Changelists ---
+
+@override_settings(SHARDING={'SHARDS': []}) # The admin lists 'default' only
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(self.admin)
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        now = timezone.now()
+        HealthRecord.objects.bulk_create([
+            HealthRecord(patient=self.patient, record_time=now - timedelta(days=40 * i), heart_rate=60 + i)
+            for i in range(12)
+        ])
+
+    def test_unfiltered_count_uses_statistics_above_threshold(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimate_row_count(HealthRecord), 12)
+        HealthRecord.objects.create(patient=self.patient, heart_rate=80) # Not yet in the statistics
+        with self.settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=10):
+            self.assertEqual(EstimatedCountPaginator(HealthRecord.objects.all(), 10).count, 12)
+            self.assertEqual(EstimatedCountPaginator(HealthRecord.objects.filter(heart_rate__gte=0), 10).count, 13)
+        self.assertEqual(EstimatedCountPaginator(HealthRecord.objects.all(), 10).count, 13)
+
+    def test_changelist_avoids_distinct_dates_and_user_lists(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/admin/health/healthrecord/')
+        self.assertEqual(response.status_code, 200)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries).upper()
+        self.assertNotIn('DISTINCT', sql)
+        self.assertContains(response, 'health-autocomplete-filter')
+        self.assertContains(response, '?record_time__year=%d' % timezone.now().year)
+        self.assertEqual(self.client.get('/admin/health/appointment/').status_code, 200)
+
+    def test_autocomplete_filter_restricts_results(self):
+        other = make_patient('other')
+        HealthRecord.objects.create(patient=other, heart_rate=99)
+        response = self.client.get(f'/admin/health/healthrecord/?patient__id__exact={other.pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, f'<option value="{other.pk}" selected>')
+
+
+# --- Appointment Lifecycle Sweeps ---
+
+class AppointmentSweepTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        now = timezone.now()
+        Appointment.objects.bulk_create(
+            [Appointment(patient=self.patient, doctor=self.doctor, appointment_time=now - timedelta(days=i + 1)) for i in range(7)]
+            + [Appointment(patient=self.patient, doctor=self.doctor, appointment_time=now + timedelta(days=1))]
+            + [Appointment(patient=self.patient, doctor=self.doctor, appointment_time=now - timedelta(days=1),
+                           status=Appointment.StatusChoices.COMPLETED)]
+        )
+
+    def test_transition_runs_in_bounded_batches(self):
+        result = transition(stale_scheduled(), Appointment.StatusChoices.EXPIRED, batch_size=3)
+        self.assertEqual((result.matched, result.updated, result.batches), (7, 7, 3))
+        appointments = Appointment.objects.for_patient(self.patient.pk)
+        self.assertEqual(appointments.filter(status=Appointment.StatusChoices.EXPIRED).count(), 7)
+        self.assertEqual(appointments.filter(status=Appointment.StatusChoices.SCHEDULED).count(), 1)
+
+    def test_command_dry_run_and_report(self):
+        out = StringIO()
+        call_command('sweep_appointments', '--dry-run', '--grace-minutes=0', stdout=out)
+        self.assertIn('0 of 7 appointments updated', out.getvalue())
+        call_command('sweep_appointments', '--grace-minutes=0', '--batch-size=2', stdout=out)
+        self.assertIn('7 of 7 appointments updated in 4 batches', out.getvalue())
+        self.assertFalse(shard_queryset(stale_scheduled()).exists())
+
+    def test_admin_bulk_action(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(admin_user)
+        appointments = Appointment.objects.for_patient(self.patient.pk)
+        pks = list(appointments.values_list('pk', flat=True))
+        response = self.client.post('/admin/health/appointment/', {'action': 'mark_cancelled', '_selected_action': pks}, follow=True)
+        self.assertEqual(response.status_code, 200)
+        # Only the 8 scheduled ones change; the completed one is left alone
+        self.assertEqual(appointments.filter(status=Appointment.StatusChoices.CANCELLED).count(), 8)
+
+
+# --- Vitals Archive Tier ---
+
+class VitalsArchiveTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_time=timezone.now())
+        now = timezone.now()
+        # 24 monthly readings: roughly half fall before the one-year horizon
+        HealthRecord.objects.bulk_create([
+            HealthRecord(patient=self.patient, record_time=now - timedelta(days=30 * i), heart_rate=60 + i,
+                         glucose_level='5.25', notes=f'reading {i}')
+            for i in range(24)
+        ])
+        self.records = HealthRecord.objects.for_patient(self.patient.pk)
+        self.ids_newest_first = list(self.records.order_by('-record_time').values_list('id', flat=True))
+
+    def archive(self):
+        call_command('archive_vitals', stdout=StringIO())
+
+    def test_archive_moves_old_rows_and_is_rerunnable(self):
+        cutoff = archive_cutoff()
+        old = self.records.filter(record_time__lt=cutoff).count()
+        self.archive()
+        self.assertFalse(self.records.filter(record_time__lt=cutoff).exists())
+        self.assertEqual(sum(ArchivedVitalsChunk.objects.values_list('record_count', flat=True)), old)
+        # A late reading for an archived month merges into the existing chunk
+        HealthRecord.objects.create(patient=self.patient, record_time=cutoff - timedelta(days=400), heart_rate=1)
+        chunks = ArchivedVitalsChunk.objects.count()
+        self.archive()
+        self.assertEqual(sum(ArchivedVitalsChunk.objects.values_list('record_count', flat=True)), old + 1)
+        self.assertLessEqual(ArchivedVitalsChunk.objects.count(), chunks + 1)
+
+    def test_edit_after_scan_is_archived_not_lost(self):
+        archive_month = archive._archive_month
+
+        def edit_then_archive(patient_id, month, cutoff):
+            # Another request edits the old readings between the scan and the month's transaction
+            HealthRecord.objects.for_patient(patient_id).filter(record_time__lt=cutoff).update(notes='edited')
+            return archive_month(patient_id, month, cutoff)
+
+        with mock.patch.object(archive, '_archive_month', edit_then_archive):
+            self.archive()
+        notes = {row[7] for chunk in ArchivedVitalsChunk.objects.all() for row in archive.decode_rows(chunk.data)}
+        self.assertEqual(notes, {'edited'})
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'Archived notes are indexed on SQLite only')
+    def test_archived_notes_stay_searchable(self):
+        oldest = self.ids_newest_first[-1]
+        self.archive()
+        self.assertFalse(self.records.filter(pk=oldest).exists())
+        self.assertEqual([r['id'] for r in search(self.patient, 'reading 23')], [oldest])
+        call_command('reindex_search', stdout=StringIO())
+        self.assertEqual([r['id'] for r in search(self.patient, 'reading 23')], [oldest])
+
+    def test_list_and_retrieve_read_across_tiers(self):
+        self.archive()
+        self.client.force_authenticate(self.patient)
+        response = self.client.get('/api/vitals/')
+        self.assertEqual([r['id'] for r in response.data], self.ids_newest_first)
+        oldest = response.data[-1]
+        self.assertEqual((oldest['glucose_level'], oldest['notes'], oldest['patient_username']), ('5.25', 'reading 23', 'patient'))
+        self.assertEqual(self.client.get(f"/api/vitals/{oldest['id']}/").data['heart_rate'], 83)
+
+        self.client.force_authenticate(self.doctor)
+        self.assertEqual(len(self.client.get('/api/vitals/').data), 24)
+
+        self.client.force_authenticate(make_patient('other'))
+        self.assertEqual(self.client.get(f"/api/vitals/{oldest['id']}/").status_code, 404)
+
+    def test_pages_merge_tiers_and_decode_only_reached_chunks(self):
+        self.archive()
+        self.client.force_authenticate(self.doctor)
+        ids, url = [], '/api/vitals/?page_size=5'
+        while url:
+            page = self.client.get(url).data
+            ids += [r['id'] for r in page['results']]
+            url = page['next']
+        self.assertEqual(ids, self.ids_newest_first)
+
+        with CaptureQueriesContext(connections[shard_for(self.patient.pk)]) as hot, CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/vitals/?page_size=3')
+        self.assertEqual(len(response.data['results']), 3)
+        hot_sql = [q['sql'] for q in hot.captured_queries if 'FROM "health_healthrecord"' in q['sql']]
+        self.assertEqual(len(hot_sql), 1)
+        self.assertIn('LIMIT 4', hot_sql[0])
+        # The merge looks one chunk ahead; the other months stay compressed and unread
+        chunk_reads = [q for q in ctx.captured_queries if '"health_archivedvitalschunk"."data"' in q['sql']]
+        self.assertEqual(len(chunk_reads), 1)
+        self.assertEqual(self.client.get('/api/vitals/?page_size=3&cursor=bogus').status_code, 400)
+
+    def test_range_filter_prunes_tiers(self):
+        self.archive()
+        self.client.force_authenticate(self.patient)
+        start = (timezone.now() - timedelta(days=30 * 20 + 1)).isoformat()
+        end = (timezone.now() - timedelta(days=30 * 18 - 1)).isoformat()
+        response = self.client.get('/api/vitals/', {'start': start, 'end': end})
+        self.assertEqual([r['heart_rate'] for r in response.data], [78, 79, 80])
+
+
+# --- Columnar Vitals Series ---
+
+class VitalsSeriesTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.patient = make_patient()
+        self.base = timezone.now().replace(microsecond=0) - timedelta(days=800)
+        HealthRecord.objects.bulk_create([
+            HealthRecord(patient=self.patient, record_time=self.base + timedelta(days=10 * i),
+                         heart_rate=60 + i, glucose_level='5.50' if i % 2 else None)
+            for i in range(80)
+        ])
+
+    def test_built_from_values_list_and_sliced_by_time(self):
+        series = VitalsSeries.from_queryset(HealthRecord.objects.for_patient(self.patient.id), self.patient.id)
+        self.assertEqual(len(series), 80)
+        self.assertEqual(series.nbytes, 80 * 33)
+        window = series.between(self.base + timedelta(days=100), self.base + timedelta(days=150))
+        self.assertEqual([v for _, v in window.column('heart_rate')], [70, 71, 72, 73, 74])
+        self.assertEqual(len(window.column('glucose_level')), 2) # Nulls masked out
+
+    def test_reads_across_archive_and_hot_tiers(self):
+        call_command('archive_vitals', stdout=StringIO())
+        series = VitalsSeries.for_patient(self.patient.id)
+        self.assertEqual(len(series), 80)
+        self.assertEqual(list(series.times), sorted(series.times))
+
+    def test_bytes_round_trip(self):
+        series = VitalsSeries.from_queryset(HealthRecord.objects.all(), self.patient.id)
+        restored = VitalsSeries.from_bytes(series.to_bytes())
+        self.assertEqual(restored.patient_id, self.patient.id)
+        self.assertEqual(restored.times, series.times)
+        self.assertEqual(restored.masks, series.masks)
+        self.assertEqual(restored.column('glucose_level'), series.column('glucose_level'))
+
+    @unittest.skipUnless(numpy, 'NumPy not installed')
+    def test_numpy_export_shares_memory(self):
+        series = VitalsSeries.from_queryset(HealthRecord.objects.all())
+        arrays = series.to_numpy()
+        self.assertEqual(arrays['heart_rate'][0], 60)
+        self.assertEqual(int(arrays['glucose_level_mask'].sum()), 40)
+        series.values['heart_rate'][0] = 1.0
+        self.assertEqual(arrays['heart_rate'][0], 1.0)
+
+
+# --- Patient Timeline ---
+
+class PatientTimelineTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        now = timezone.now()
+        self.appointments = [
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_time=now - timedelta(days=d),
+                                       status=Appointment.StatusChoices.COMPLETED, consultation_notes=f'notes {d}')
+            for d in (5, 400)
+        ]
+        HealthRecord.objects.bulk_create([
+            HealthRecord(patient=self.patient, record_time=now - timedelta(days=d), heart_rate=d) for d in range(0, 600, 50)
+        ])
+        # Archive the oldest readings so the feed spans both tiers
+        call_command('archive_vitals', stdout=StringIO())
+
+    def fetch_all(self, page_size):
+        entries, url = [], f'/api/patients/{self.patient.id}/timeline/?page_size={page_size}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            entries.extend(response.data['results'])
+            url = response.data['next']
+        return entries
+
+    def test_pages_merge_sources_in_order(self):
+        self.client.force_authenticate(self.patient)
+        entries = self.fetch_all(page_size=3)
+        self.assertEqual(len(entries), 14)
+        times = [e['time'] for e in entries]
+        self.assertEqual(times, sorted(times, reverse=True))
+        self.assertEqual([e['type'] for e in entries].count('appointment'), 2)
+        self.assertEqual(entries[1]['event'], 'completed')
+        self.assertEqual(entries[1]['data']['consultation_notes'], 'notes 5')
+
+    def test_each_source_query_is_bounded(self):
+        self.client.force_authenticate(self.patient)
+        with CaptureQueriesContext(connections[shard_for(self.patient.id)]) as ctx:
+            self.client.get(f'/api/patients/{self.patient.id}/timeline/?page_size=2')
+        source_queries = [q['sql'] for q in ctx.captured_queries if '"health_healthrecord"' in q['sql'] or '"health_appointment"' in q['sql']]
+        self.assertEqual(len(source_queries), 2)
+        self.assertTrue(all('LIMIT 3' in sql for sql in source_queries))
+
+    def test_access_rules(self):
+        self.client.force_authenticate(self.doctor)
+        self.assertEqual(self.client.get(f'/api/patients/{self.patient.id}/timeline/').status_code, 200)
+        self.client.force_authenticate(make_doctor('stranger'))
+        self.assertEqual(self.client.get(f'/api/patients/{self.patient.id}/timeline/').status_code, 403)
+        self.client.force_authenticate(make_patient('other'))
+        self.assertEqual(self.client.get(f'/api/patients/{self.patient.id}/timeline/').status_code, 403)
+        self.client.force_authenticate(self.patient)
+        self.assertEqual(self.client.get(f'/api/patients/{self.patient.id}/timeline/?cursor=garbage').status_code, 400)
+
+
+# --- Full-Text Search ---
+
+class SearchTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        soon = timezone.now() + timedelta(days=3)
+        self.appointment = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, appointment_time=soon, reason='Recurring migraine headaches',
+        )
+        self.record = HealthRecord.objects.create(patient=self.patient, heart_rate=80, notes='Dizzy after migraine medication')
+        other = make_patient('other')
+        Appointment.objects.create(patient=other, doctor=make_doctor('other_doc'), appointment_time=soon, reason='Migraine follow-up')
+
+    def test_index_follows_writes(self):
+        self.assertEqual({(r['type'], r['id']) for r in search(self.patient, 'migr')},
+                         {('appointment', self.appointment.id), ('vitals', self.record.id)})
+        self.appointment.reason = 'Back pain'
+        self.appointment.save()
+        self.record.delete()
+        self.assertEqual(search(self.patient, 'migraine'), [])
+        self.assertEqual([r['id'] for r in search(self.patient, 'back pain')], [self.appointment.id])
+
+    def test_results_are_scoped(self):
+        self.client.force_authenticate(self.doctor)
+        response = self.client.get('/api/search/', {'q': 'migraine'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({r['patient_id'] for r in response.data['results']}, {self.patient.id})
+        self.assertIn('[', response.data['results'][0]['snippet'])
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+
+    def test_reindex_command(self):
+        with connections[shard_for(self.patient.id)].cursor() as cursor:
+            cursor.execute('DELETE FROM health_search_index')
+        self.assertEqual(search(self.patient, 'migraine'), [])
+        call_command('reindex_search', stdout=StringIO())
+        self.assertEqual(len(search(self.patient, 'migraine')), 2)
+
+
+# --- Idempotency Keys ---
+
+@override_settings(IDEMPOTENCY={'WAIT_SECONDS': 0})
+class IdempotencyTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        local_store.clear()
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        self.client.force_authenticate(self.patient)
+        self.booking = {
+            'patient_id': self.patient.id, 'doctor_id': self.doctor.id,
+            'appointment_time': (timezone.now() + timedelta(days=2)).isoformat(), 'reason': 'Checkup',
+        }
+
+    def post(self, url, data, key):
+        return self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_instead_of_booking_twice(self):
+        first = self.post('/api/appointments/', self.booking, 'k1')
+        retry = self.post('/api/appointments/', self.booking, 'k1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Appointment.objects.for_patient(self.patient.id).count(), 1)
+        # Same key, different payload
+        self.assertEqual(self.post('/api/appointments/', dict(self.booking, reason='Other'), 'k1').status_code, 422)
+
+    def test_vitals_and_cancel_retries(self):
+        self.post('/api/vitals/', {'heart_rate': 70}, 'v1')
+        self.post('/api/vitals/', {'heart_rate': 70}, 'v1')
+        self.assertEqual(HealthRecord.objects.for_patient(self.patient.id).count(), 1)
+        appointment_id = self.post('/api/appointments/', self.booking, 'k2').data['id']
+        first = self.post(f'/api/appointments/{appointment_id}/cancel/', {}, 'c1')
+        retry = self.post(f'/api/appointments/{appointment_id}/cancel/', {}, 'c1')
+        self.assertEqual((first.status_code, retry.status_code), (200, 200)) # Not "cannot cancel a cancelled appointment"
+
+    def test_in_flight_duplicate_and_expiry(self):
+        self.post('/api/vitals/', {'heart_rate': 70}, 'k3')
+        # Pretend the first request is still running
+        IdempotencyKey.objects.filter(key='k3').update(status_code=None, expires_at=timezone.now() + timedelta(seconds=30))
+        response = self.post('/api/vitals/', {'heart_rate': 70}, 'k3')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        # An abandoned lease can be taken over
+        IdempotencyKey.objects.filter(key='k3').update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.post('/api/vitals/', {'heart_rate': 70}, 'k3').status_code, 201)
+        self.assertEqual(HealthRecord.objects.for_patient(self.patient.id).count(), 2)
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('prune_idempotency_keys', stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+# --- Synthetic Data ---
+
+class SeedDataTests(TestCase):
+    databases = '__all__'
+
+    def test_command_populates_schema(self):
+        call_command('seed_data', doctors=3, patients=5, vitals_per_patient=40, appointments_per_patient=4,
+                     workers=2, chunk_size=50, stdout=StringIO())
+        self.assertEqual(UserProfile.objects.filter(role=Role.DOCTOR).count(), 3)
+        self.assertEqual(PatientProfile.objects.count(), 5)
+        for patient_id in PatientProfile.objects.values_list('user_profile__user_id', flat=True):
+            self.assertEqual(HealthRecord.objects.for_patient(patient_id).count(), 40) # On the patient's shard
+        self.assertEqual(shard_queryset(HealthRecord.objects.all()).count(), 200)
+        self.assertEqual(shard_queryset(Appointment.objects.all()).count(), 20)
+        self.assertTrue(User.objects.get(username='seed_patient_0000000').check_password('seed-password-123'))
+        record = HealthRecord.objects.first()
+        self.assertTrue(40 < record.heart_rate < 120)
+        self.assertLessEqual(record.record_time, timezone.now())
+        with self.assertRaises(CommandError):
+            call_command('seed_data', patients=1, stdout=StringIO()) # Prefix already used
+
+    def test_generation_is_deterministic_per_patient(self):
+        start, end, now = history_window(30)
+        task = (7, 3, 99, [1, 2], 50, 5, start, end, now)
+        self.assertEqual(generate_patient(task), generate_patient(task))
+        self.assertNotEqual(generate_patient(task)[1], generate_patient((8,) + task[1:])[1])
+        times = [row[0] for row in generate_patient(task)[1]]
+        self.assertEqual(times, sorted(times))
+
+
+# --- Worker Boot ---
+
+class ColdStartTests(TestCase):
+    def test_boot_stays_lean(self):
+        """A fresh interpreter's django.setup() must not pull in lazily loaded modules, and stay fast."""
+        import subprocess
+        import sys
+        from django.conf import settings
+
+        lazy = PRELOAD_MODULES + ['health.seeding', 'health.series', 'concurrent.futures.process']
+        code = (
+            "import json, sys, time; started = time.perf_counter(); import django; django.setup(); "
+            "print(json.dumps({'seconds': time.perf_counter() - started, "
+            f"'loaded': [m for m in {lazy!r} if m in sys.modules]}}))"
+        )
+        proc = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                              env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'telemed_platform.settings'})
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        self.assertEqual(result['loaded'], [])
+        self.assertLess(result['seconds'], 3.0) # Generous: catches pathological regressions, not noise
+
+    def test_profile_startup_command(self):
+        out = StringIO()
+        call_command('profile_startup', top=5, stdout=out)
+        self.assertIn('AppConfig.ready()', out.getvalue())
+        self.assertIn('health', out.getvalue())
+
+
+# --- Sparse Fieldsets & Compression ---
+
+class PayloadTrimmingTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        local_store.clear()
+        self.patient = make_patient(first_name='Pat', last_name='Ient')
+        self.doctor = make_doctor(first_name='Doc', last_name='Tor')
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_time=timezone.now() + timedelta(days=1), reason='Checkup')
+        HealthRecord.objects.bulk_create([
+            HealthRecord(patient=self.patient, heart_rate=60 + i, notes='Evening reading after dinner and a walk' * 3)
+            for i in range(40)
+        ])
+
+    def test_fields_trim_payload_and_columns(self):
+        self.client.force_authenticate(self.patient)
+        shard = connections[shard_for(self.patient.id)]
+        with CaptureQueriesContext(shard) as ctx:
+            response = self.client.get('/api/vitals/', {'fields': 'heart_rate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data[0]), {'id', 'heart_rate'})
+        selects = [q['sql'] for q in ctx.captured_queries if 'FROM "health_healthrecord"' in q['sql']]
+        self.assertEqual(len(selects), 1) # record_time is kept for the merge, not loaded per row
+        self.assertNotIn('"notes"', selects[0])
+
+        with CaptureQueriesContext(shard) as ctx:
+            response = self.client.get('/api/appointments/', {'fields': 'doctor_name,status_display'})
+        self.assertEqual(response.data[0], {'id': response.data[0]['id'], 'doctor_name': 'Doc Tor', 'status_display': 'Scheduled'})
+        select = next(q['sql'] for q in ctx.captured_queries if 'FROM "health_appointment"' in q['sql'])
+        self.assertNotIn('"reason"', select)
+
+        self.assertEqual(self.client.get('/api/vitals/', {'fields': 'heart_rate,bogus'}).status_code, 400)
+        self.client.force_authenticate(self.doctor)
+        response = self.client.get('/api/doctor/patients/', {'fields': 'username,date_of_birth'})
+        self.assertEqual(response.data[0], {'id': self.patient.id, 'username': 'patient', 'date_of_birth': '1990-01-01'})
+
+    def test_compression_negotiation(self):
+        import gzip
+        self.client.force_authenticate(self.patient)
+        response = self.client.get('/api/vitals/', HTTP_ACCEPT_ENCODING='br;q=0.5, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip' if negotiate('br;q=0.5, gzip') == 'gzip' else 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(int(response['Content-Length']), len(self.client.get('/api/vitals/').content))
+        if response['Content-Encoding'] == 'gzip':
+            self.assertEqual(json.loads(gzip.decompress(response.content))[0]['heart_rate'], 99)
+        # Below MIN_SIZE, or refused by the client: sent as is
+        self.assertFalse(self.client.get('/api/profile/', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+        self.assertFalse(self.client.get('/api/vitals/', HTTP_ACCEPT_ENCODING='gzip;q=0').has_header('Content-Encoding'))
+
+        self.assertEqual(negotiate('gzip;q=0.2, br', ['br', 'gzip']), 'br')
+        self.assertEqual(negotiate('*', ['br', 'gzip']), 'br')
+        self.assertIsNone(negotiate('identity', ['gzip']))
+        streamed = b''.join(compress_stream('gzip', [b'{"a":', b' 1}']))
+        self.assertEqual(gzip.decompress(streamed), b'{"a": 1}')
+
+
+# --- Batch Endpoint ---
+
+class BatchConcurrentReadTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_page_load_in_one_round_trip(self):
+        local_store.clear()
+        patient = make_patient()
+        make_doctor()
+        HealthRecord.objects.create(patient=patient, heart_rate=72)
+        client = APIClient()
+        client.force_authenticate(patient)
+        response = client.post('/api/batch/', {'requests': [
+            {'id': 'profile', 'path': '/api/profile/'},
+            {'id': 'appointments', 'path': '/api/appointments/'},
+            {'id': 'vitals', 'path': '/api/vitals/?fields=heart_rate'},
+            {'id': 'doctors', 'path': '/api/doctors/'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        items = response.data['responses']
+        self.assertEqual([i['id'] for i in items], ['profile', 'appointments', 'vitals', 'doctors'])
+        self.assertEqual([i['status'] for i in items], [200] * 4)
+        self.assertEqual(items[2]['body'][0]['heart_rate'], 72)
+        self.assertEqual(len(items[3]['body']), 1)
+
+
+@override_settings(API_BATCH={'MAX_WORKERS': 1})
+class BatchTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        local_store.clear()
+        self.patient = make_patient()
+        self.client.force_authenticate(self.patient)
+
+    def test_writes_run_in_order_with_per_item_status(self):
+        response = self.client.post('/api/batch/', {'requests': [
+            {'method': 'POST', 'path': '/api/vitals/', 'body': {'heart_rate': 64}, 'headers': {'Idempotency-Key': 'b1'}},
+            {'path': '/api/vitals/'},
+            {'path': '/api/nowhere/'},
+            {'method': 'POST', 'path': '/api/logout/', 'body': {}},
+            {'method': 'POST', 'path': '/api/appointments/', 'body': {}},
+        ]}, format='json')
+        statuses = [item['status'] for item in response.data['responses']]
+        self.assertEqual(statuses, [201, 200, 404, 400, 400])
+        self.assertEqual(response.data['responses'][1]['body'][0]['heart_rate'], 64)
+        self.assertEqual(response.data['responses'][0]['id'], 0)
+
+    def test_items_run_as_the_token_holder(self):
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.patient).access_token}')
+        response = self.client.post('/api/batch/', {'requests': [{'path': '/api/profile/'}]}, format='json')
+        self.assertEqual(response.data['responses'][0]['status'], 200)
+        self.assertEqual(response.data['responses'][0]['body']['user']['username'], 'patient')
+
+    def test_rejects_malformed_batches(self):
+        self.assertEqual(self.client.post('/api/batch/', {'requests': []}, format='json').status_code, 400)
+        bad_header = {'requests': [{'path': '/api/profile/', 'headers': {'Authorization': 'Bearer x'}}]}
+        self.assertEqual(self.client.post('/api/batch/', bad_header, format='json').status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post('/api/batch/', {'requests': [{'path': '/api/profile/'}]}, format='json').status_code, 401)
+
+
+# --- Bootstrap (dashboard initial state) ---
+
+class BootstrapTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        local_store.clear()
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_time=timezone.now() + timedelta(days=1), reason='Checkup')
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_time=timezone.now() - timedelta(days=1), reason='Past')
+        HealthRecord.objects.create(patient=self.patient, heart_rate=70)
+
+    def test_role_specific_state_with_private_cache_headers(self):
+        self.client.force_authenticate(self.patient)
+        response = self.client.get('/api/bootstrap/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['profile']['role'], Role.PATIENT)
+        self.assertEqual([a['reason'] for a in response.data['upcoming_appointments']], ['Checkup'])
+        self.assertEqual(response.data['recent_vitals'][0]['heart_rate'], 70)
+        self.assertEqual([d['username'] for d in response.data['doctors']], ['doctor'])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+
+        self.client.force_authenticate(self.doctor)
+        response = self.client.get('/api/bootstrap/')
+        self.assertEqual([p['username'] for p in response.data['patients']], ['patient'])
+        self.assertNotIn('recent_vitals', response.data)
+
+    def test_revalidation_with_etag(self):
+        self.client.force_authenticate(self.patient)
+        etag = self.client.get('/api/bootstrap/')['ETag']
+        response = self.client.get('/api/bootstrap/', HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        HealthRecord.objects.create(patient=self.patient, heart_rate=80)
+        response = self.client.get('/api/bootstrap/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+# --- Profile Update (dirty tracking) ---
+
+class ProfileUpdateQueryTests(APITestCase):
+    def setUp(self):
+        self.patient = make_patient(first_name='Pat')
+        self.client.force_authenticate(self.patient)
+
+    def test_only_changed_columns_are_written(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch('/api/profile/', {'phone_number': '555-0101'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['phone_number'], '555-0101')
+        self.assertEqual(response.data['user']['first_name'], 'Pat')
+        self.assertEqual(len(ctx.captured_queries), 2) # Load the profile, one UPDATE
+        update = ctx.captured_queries[1]['sql']
+        self.assertIn('"phone_number"', update)
+        self.assertNotIn('"address"', update)
+
+        # Same value again: nothing to write
+        with self.assertNumQueries(1):
+            self.client.patch('/api/profile/', {'phone_number': '555-0101', 'user_update': {'first_name': 'Pat'}}, format='json')
+
+    def test_nested_updates_render_from_memory(self):
+        payload = {'user_update': {'last_name': 'Ient'}, 'patient_details_update': {'emergency_contact_name': 'Sam'}}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch('/api/profile/', payload, format='json')
+        self.assertEqual(response.data['user']['last_name'], 'Ient')
+        self.assertEqual(response.data['details']['emergency_contact_name'], 'Sam')
+        statements = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(sum(sql.startswith('UPDATE') for sql in statements), 2)
+        self.assertFalse(any(sql.startswith('SELECT') for sql in statements[1:])) # No refresh_from_db
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.last_name, 'Ient')
+        self.assertEqual(PatientProfile.objects.get(user_profile__user=self.patient).emergency_contact_name, 'Sam')
+
+        # Missing details row: created with an INSERT
+        PatientProfile.objects.filter(user_profile__user=self.patient).delete()
+        response = self.client.patch('/api/profile/', {'patient_details_update': {'emergency_contact_phone': '555'}}, format='json')
+        self.assertEqual(response.data['details']['emergency_contact_phone'], '555')
+        self.assertTrue(PatientProfile.objects.filter(user_profile__user=self.patient).exists())
+
+
+# --- Access Audit Log ---
+
+class AuditLogTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        audit_log.clear()
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        self.appointment = Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_time=timezone.now() + timedelta(days=1))
+        self.record = HealthRecord.objects.create(patient=self.patient, heart_rate=70)
+
+    def test_doctor_reads_are_logged_without_a_write_per_request(self):
+        self.client.force_authenticate(self.doctor)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/vitals/', {'fields': 'heart_rate'})
+            self.client.get(f'/api/vitals/{self.record.id}/')
+            self.client.get('/api/appointments/')
+            self.client.get('/api/doctor/patients/')
+        self.assertFalse(any('health_accesslog' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(audit_log.flush(), 4)
+
+        entries = list(access_history(self.patient.id).order_by('id'))
+        self.assertEqual([e.resource for e in entries], ['VITALS', 'VITALS', 'APPOINTMENTS', 'PATIENT_LIST'])
+        self.assertEqual({e.actor_id for e in entries}, {self.doctor.id})
+        self.assertEqual(entries[1].object_id, self.record.id)
+        self.assertEqual(entries[1].endpoint, f'/api/vitals/{self.record.id}/')
+        with self.assertRaises(ValueError):
+            entries[0].save()
+
+        # The patient reading their own data is not logged
+        self.client.force_authenticate(self.patient)
+        self.client.get('/api/vitals/')
+        self.assertEqual(len(audit_log), 0)
+
+    def test_timeline_and_search_reads_are_logged(self):
+        Appointment.objects.for_patient(self.patient.id).filter(pk=self.appointment.pk).update(reason='Persistent cough')
+        HealthRecord.objects.for_patient(self.patient.id).filter(pk=self.record.pk).update(notes='Cough at night')
+        self.client.force_authenticate(self.doctor)
+        self.assertEqual(self.client.get(f'/api/patients/{self.patient.id}/timeline/').status_code, 200)
+        self.assertEqual(len(self.client.get('/api/search/', {'q': 'cough'}).data['results']), 2)
+        audit_log.flush()
+        entries = list(access_history(self.patient.id).order_by('id'))
+        self.assertEqual([(e.resource, e.endpoint) for e in entries], [
+            ('VITALS', f'/api/patients/{self.patient.id}/timeline/'),
+            ('APPOINTMENTS', f'/api/patients/{self.patient.id}/timeline/'),
+            ('VITALS', '/api/search/'),
+            ('APPOINTMENTS', '/api/search/'),
+        ])
+
+        # The patient reading their own data through the same endpoints is not logged
+        self.client.force_authenticate(self.patient)
+        self.client.get(f'/api/patients/{self.patient.id}/timeline/')
+        self.client.get('/api/search/', {'q': 'cough'})
+        self.assertEqual(len(audit_log), 0)
+
+    def test_bootstrap_logs_appointments_like_the_list_endpoint(self):
+        self.client.force_authenticate(self.doctor)
+        self.assertEqual(self.client.get('/api/bootstrap/').status_code, 200)
+        audit_log.flush()
+        self.assertEqual([e.resource for e in access_history(self.patient.id).order_by('id')], ['APPOINTMENTS', 'PATIENT_LIST'])
+        self.client.force_authenticate(self.patient)
+        self.client.get('/api/bootstrap/')
+        self.assertEqual(len(audit_log), 0)
+
+    def test_patient_reads_own_access_log(self):
+        self.client.force_authenticate(self.doctor)
+        self.client.get('/api/vitals/')
+        audit_log.flush()
+        self.client.force_authenticate(self.patient)
+        response = self.client.get(f'/api/patients/{self.patient.id}/access-log/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['actor_id'], self.doctor.id)
+        later = (timezone.now() + timedelta(minutes=1)).isoformat()
+        self.assertEqual(self.client.get(f'/api/patients/{self.patient.id}/access-log/', {'start': later}).data, [])
+        self.client.force_authenticate(self.doctor)
+        self.assertEqual(self.client.get(f'/api/patients/{self.patient.id}/access-log/').status_code, 403)
+
+    @override_settings(AUDIT_LOG={'BATCH_SIZE': 2})
+    def test_full_batch_is_written_by_the_request_without_a_flusher(self):
+        self.client.force_authenticate(self.doctor)
+        self.client.get('/api/vitals/')
+        self.assertEqual(AccessLog.objects.count(), 0)
+        self.client.get('/api/appointments/')
+        self.assertEqual(AccessLog.objects.count(), 2)
+        self.assertEqual(len(audit_log), 0)
+
+
+class AuditFlusherTests(TransactionTestCase):
+    def test_background_flush_and_backpressure(self):
+        with override_settings(AUDIT_LOG={'FLUSH_INTERVAL': 0.05}):
+            buffer = AuditBuffer()
+            buffer._background = True # Without the exit hook enable_background() registers
+            buffer.record(1, [2], AccessLog.Resource.VITALS, 'GET', '/api/vitals/')
+            deadline = time.monotonic() + 5
+            while not AccessLog.objects.exists() and time.monotonic() < deadline:
+                time.sleep(0.02)
+            self.assertEqual(AccessLog.objects.count(), 1)
+
+        # Flusher far from due: a full buffer is written by the producer before record() returns
+        with override_settings(AUDIT_LOG={'FLUSH_INTERVAL': 60, 'MAX_BUFFER': 3}):
+            buffer = AuditBuffer()
+            buffer._background = True
+            buffer.record(1, [2, 3], AccessLog.Resource.VITALS, 'GET', '/api/vitals/')
+            self.assertEqual(AccessLog.objects.count(), 1)
+            buffer.record(1, [4], AccessLog.Resource.VITALS, 'GET', '/api/vitals/')
+            self.assertEqual(AccessLog.objects.count(), 4)
+
+
+# --- Appointment Reminders ---
+
+class RecordingNotifier:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, appointment, lead_minutes):
+        self.sent.append((appointment.id, lead_minutes))
+
+
+class TimingWheelTests(TestCase):
+    def test_fires_each_timer_once_at_its_tick_across_levels(self):
+        import random
+        rng = random.Random(7)
+        wheel = TimingWheel(now=1000, size=4, levels=3) # Spans 64 ticks; later timers overflow to the heap
+        deadlines = {key: 1000 + rng.randint(1, 300) for key in range(200)}
+        for key, deadline in deadlines.items():
+            wheel.schedule(key, deadline, payload=deadline)
+        for key in range(0, 200, 10):
+            wheel.cancel(key)
+        wheel.schedule(5, 1003, payload=1003) # Reschedule
+        deadlines[5] = 1003
+
+        fired = {}
+        for tick in range(1001, 1301):
+            for key, payload in wheel.advance(tick):
+                self.assertNotIn(key, fired)
+                fired[key] = tick
+                self.assertEqual(payload, tick)
+        expected = {key: deadline for key, deadline in deadlines.items() if key % 10}
+        self.assertEqual(fired, expected)
+        self.assertEqual(len(wheel), 0)
+
+        # Jumping several ticks at once fires everything passed, in order
+        wheel.schedule('a', 1310)
+        wheel.schedule('b', 1305)
+        wheel.schedule('late', 1200) # Already passed: next tick
+        self.assertEqual([key for key, _ in wheel.advance(1320)], ['late', 'b', 'a'])
+
+
+class ReminderSchedulerTests(APITestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.patient = make_patient()
+        self.doctor = make_doctor()
+        self.now = timezone.now().timestamp()
+        self.appointment = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, appointment_time=timezone.now() + timedelta(hours=2), reason='Checkup'
+        )
+        self.notifier = RecordingNotifier()
+
+    def scheduler(self):
+        scheduler = ReminderScheduler(notifier=self.notifier, lead_hours=[24, 1], clock=lambda: self.now)
+        scheduler.load()
+        return scheduler
+
+    def test_reminders_follow_changes_and_survive_restart(self):
+        scheduler = self.scheduler()
+        # 24h lead already passed: sent right away; the 1h one waits
+        self.assertEqual(scheduler.step(self.now), 1)
+        self.assertEqual(self.notifier.sent, [(self.appointment.id, 24 * 60)])
+        with self.assertNumQueries(1): # Idle steps only read the change feed
+            self.assertEqual(scheduler.step(self.now + 60), 0)
+
+        # Rescheduled: reminded of the new time right away, and the 1h reminder moves with it
+        self.appointment.appointment_time += timedelta(hours=3)
+        self.appointment.save()
+        self.assertEqual(scheduler.step(self.now + 3601), 1)
+        self.assertEqual(self.notifier.sent[-1], (self.appointment.id, 24 * 60))
+        self.assertEqual(scheduler.step(self.now + 4 * 3600 + 1), 1)
+        self.assertEqual(self.notifier.sent[-1], (self.appointment.id, 60))
+
+        # A restart rebuilds the wheel and does not repeat what was sent
+        self.assertEqual(self.scheduler().step(self.now + 4 * 3600 + 2), 0)
+        self.assertEqual(SentReminder.objects.filter(appointment=self.appointment).count(), 3)
+
+    def test_cancelled_appointments_are_not_reminded(self):
+        scheduler = self.scheduler()
+        scheduler.step(self.now)
+        self.client.force_authenticate(self.patient)
+        self.client.post(f'/api/appointments/{self.appointment.id}/cancel/')
+        other = Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_time=timezone.now() + timedelta(hours=3))
+        transition(Appointment.objects.filter(pk=other.pk), Appointment.StatusChoices.CANCELLED) # Bulk update, no signals
+        self.assertEqual(scheduler.step(self.now + 3 * 3600), 0)
+        self.assertEqual(self.notifier.sent, [(self.appointment.id, 24 * 60)])
+        self.assertEqual(len(scheduler.wheel), 0)
+
+
+# --- Bulk User Import ---
+
+class UserImportTests(APITestCase):
+    HEADER = 'username,email,first_name,last_name,password,role,phone_number,address,date_of_birth,specialization,license_number\n'
+
+    def patient_line(self, n):
+        return f'clinic_p{n},p{n}@clinic.example,Pat,{n},,patient,555-{n:04d},1 Main St,1980-01-01,,\n'
+
+    def test_command_validates_streams_and_reports_per_row(self):
+        import tempfile
+        from django.contrib.auth.tokens import default_token_generator
+        make_patient('existing')
+        lines = [
+            self.patient_line(1),
+            'clinic_d1,d1@clinic.example,Doc,One,s3cret-pass,DOCTOR,555-0100,2 Main St,1970-05-05,Cardiology,LIC-9\n',
+            self.patient_line(1).replace('p1@', 'other@'),                     # Username repeated in the file
+            self.patient_line(2).replace('p2@clinic.example', 'EXISTING@example.com'), # Email taken (case-insensitive)
+            'clinic_d2,d2@clinic.example,Doc,Two,,doctor,555-0101,2 Main St,1970-05-05,Cardiology,\n', # No license
+            self.patient_line(3).replace('1980-01-01', 'someday'),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            source, report = os.path.join(tmp, 'clinic.csv'), os.path.join(tmp, 'report.ndjson')
+            with open(source, 'w') as f:
+                f.write(self.HEADER + ''.join(lines))
+            out = StringIO()
+            call_command('import_users', source, '--workers', '1', '--chunk-size', '4', '--report', report, stdout=out, stderr=StringIO())
+            with open(report) as f:
+                results = [json.loads(line) for line in f]
+
+        self.assertIn('2 users created, 4 rows rejected', out.getvalue())
+        self.assertEqual([r['status'] for r in results], ['created', 'created', 'error', 'error', 'error', 'error'])
+        self.assertIn('username', results[2]['errors'])
+        self.assertIn('email', results[3]['errors'])
+        self.assertIn('license_number', results[4]['errors'])
+        self.assertIn('date_of_birth', results[5]['errors'])
+
+        patient = User.objects.get(username='clinic_p1')
+        self.assertFalse(patient.has_usable_password())
+        self.assertTrue(default_token_generator.check_token(patient, results[0]['token']))
+        self.assertTrue(PatientProfile.objects.filter(user_profile__user=patient).exists())
+        doctor = User.objects.get(username='clinic_d1')
+        self.assertTrue(doctor.check_password('s3cret-pass'))
+        self.assertEqual(doctor.profile.doctor_details.license_number, 'LIC-9')
+        self.assertNotIn('token', results[1])
+
+    def test_queries_per_chunk_not_per_row(self):
+        from .importing import UserImporter, read_rows
+        rows = read_rows([self.HEADER] + [self.patient_line(n) for n in range(60)], 'csv')
+        importer = UserImporter(chunk_size=30)
+        with CaptureQueriesContext(connection) as ctx:
+            results = list(importer.run(rows))
+        self.assertEqual(importer.created, 60)
+        self.assertEqual(len(results), 60)
+        self.assertLessEqual(len(ctx.captured_queries), 2 * 12) # Checks, inserts and id reads, per chunk
+
+    def test_rows_are_normalized_like_create_user(self):
+        row = UserImportRowSerializer(data={'username': 'ﬁona', 'email': 'Fiona@Clinic.EXAMPLE', 'first_name': 'Fi', 'last_name': 'Ona',
+                                            'role': 'patient', 'phone_number': '555', 'address': 'X', 'date_of_birth': '1990-02-03'})
+        self.assertTrue(row.is_valid(), row.errors)
+        self.assertEqual((row.validated_data['username'], row.validated_data['email']), ('fiona', 'Fiona@clinic.example'))
+
+    def test_unreadable_input_is_a_400_or_command_error_naming_the_line(self):
+        import tempfile
+        latin1 = (self.HEADER + self.patient_line(1) + self.patient_line(2).replace('Pat', 'Jos\u00e9')).encode('latin-1')
+        self.client.force_authenticate(User.objects.create_user('staff', is_staff=True))
+        response = self.client.post('/api/admin/import/', latin1, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Line 3 is not valid UTF-8', response.data['detail'])
+        classic_mac = self.HEADER + self.patient_line(1).replace('\n', '\r') + self.patient_line(2) # Bare CR line ends
+        response = self.client.post('/api/admin/import/', classic_mac, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('CSV line 2', response.data['detail'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'clinic.csv')
+            with open(source, 'wb') as f:
+                f.write(latin1)
+            with self.assertRaisesMessage(CommandError, 'Line 3 is not valid UTF-8'):
+                call_command('import_users', source, '--workers', '1', stdout=StringIO(), stderr=StringIO())
+
+    def test_staff_endpoint(self):
+        body = '\n'.join(json.dumps(row) for row in [
+            {'username': 'nd_p1', 'email': 'nd1@clinic.example', 'first_name': 'A', 'last_name': 'B', 'role': 'PATIENT',
+             'phone_number': '555', 'address': 'X', 'date_of_birth': '1990-02-03'},
+            [1, 2],
+        ])
+        self.client.force_authenticate(make_patient())
+        self.assertEqual(self.client.post('/api/admin/import/', body, content_type='application/x-ndjson').status_code, 403)
+        self.client.force_authenticate(User.objects.create_user('staff', is_staff=True))
+        response = self.client.post('/api/admin/import/?dry_run=1', body, content_type='application/x-ndjson')
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 1))
+        self.assertFalse(User.objects.filter(username='nd_p1').exists())
+        response = self.client.post('/api/admin/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['results'][0]['status'], 'created')
+        self.assertIn('token', response.data['results'][0])
+        self.assertTrue(User.objects.filter(username='nd_p1', profile__role=Role.PATIENT).exists())
+        # No hashing in the web worker: rows with a password are rejected
+        with_password = json.dumps({'username': 'nd_p2', 'email': 'nd2@clinic.example', 'first_name': 'A', 'last_name': 'B',
+                                    'role': 'PATIENT', 'phone_number': '555', 'address': 'X', 'date_of_birth': '1990-02-03',
+                                    'password': 'pass-12345-x'})
+        response = self.client.post('/api/admin/import/', with_password, content_type='application/x-ndjson')
+        self.assertEqual(list(response.data['results'][0]['errors']), ['password'])
+        self.assertFalse(User.objects.filter(username='nd_p2').exists())
+        self.assertEqual(self.client.post('/api/admin/import/', body, content_type='text/plain').status_code, 400)
+        with mock.patch.object(UserImportView, 'max_rows', 1):
+            self.assertEqual(self.client.post('/api/admin/import/', body, content_type='application/x-ndjson').status_code, 413)
+        with mock.patch.object(UserImportView, 'max_upload_bytes', len(body) - 1):
+            self.assertEqual(self.client.post('/api/admin/import/', body, content_type='application/x-ndjson').status_code, 413)
+
+
+# --- Patient Sharding ---
+
+class ShardRingTests(TestCase):
+    def test_adding_a_shard_moves_only_keys_to_it(self):
+        before, after = ShardRing(['a', 'b', 'c'], 128), ShardRing(['a', 'b', 'c', 'd'], 128)
+        owners = {key: before.shard_for(key) for key in range(1, 6001)}
+        for alias in 'abc':
+            self.assertGreater(list(owners.values()).count(alias), 6000 * 0.25)
+        moved = [key for key, alias in owners.items() if after.shard_for(key) != alias]
+        self.assertTrue(all(after.shard_for(key) == 'd' for key in moved))
+        self.assertTrue(6000 * 0.15 < len(moved) < 6000 * 0.35)
+
+
+@override_settings(SHARDING={'SHARDS': []})
+class ShardedQueryTests(APITestCase):
+    """One shard: the scatter-gather path runs inline and must answer exactly like plain querysets."""
+
+    def setUp(self):
+        id_allocator.reset()
+        self.doctor = make_doctor()
+        other = make_doctor('other')
+        self.patients = [make_patient(name, first_name=name.title()) for name in ('zed', 'amy', 'bob')]
+        now = timezone.now()
+        for i, patient in enumerate(self.patients):
+            Appointment.objects.create(patient=patient, doctor=self.doctor, appointment_time=now + timedelta(days=i + 1))
+            Appointment.objects.create(patient=patient, doctor=other, appointment_time=now + timedelta(days=i, hours=3))
+            for hours in (i, i + 5):
+                HealthRecord.objects.create(patient=patient, heart_rate=60 + hours, record_time=now - timedelta(hours=hours))
+        self.client.force_authenticate(self.doctor)
+
+    def tearDown(self):
+        audit_log.clear()
+
+    def test_doctor_reads_match_unsharded(self):
+        paths = ['/api/appointments/', '/api/appointments/?fields=id,patient_name', '/api/vitals/', '/api/vitals/?page_size=4',
+                 '/api/doctor/patients/', '/api/bootstrap/', f'/api/patients/{self.patients[0].pk}/timeline/']
+        unsharded = [self.client.get(path).data for path in paths]
+        with override_settings(SHARDING={'SHARDS': ['default']}), CaptureQueriesContext(connection) as ctx:
+            sharded = [self.client.get(path).data for path in paths]
+        self.assertEqual(sharded, unsharded)
+        # Shards hold no users: nothing sent to them joins one
+        shard_sql = [q['sql'] for q in ctx.captured_queries if 'FROM "health_appointment"' in q['sql'] or 'FROM "health_healthrecord"' in q['sql']]
+        self.assertTrue(shard_sql)
+        self.assertFalse([sql for sql in shard_sql if 'auth_user' in sql])
+
+    def test_shard_queryset(self):
+        queryset = Appointment.objects.filter(doctor=self.doctor).order_by('-appointment_time')
+        self.assertIs(shard_queryset(queryset), queryset) # Sharding off
+        with override_settings(SHARDING={'SHARDS': ['default']}):
+            sharded = shard_queryset(queryset)
+            self.assertIsInstance(sharded, ShardQuerySet)
+            self.assertEqual(sharded.count(), 3)
+            self.assertEqual([a.patient.username for a in sharded[:2]], ['bob', 'amy'])
+            self.assertEqual(sharded.get(patient=self.patients[0]).patient, self.patients[0])
+            with self.assertRaises(Appointment.DoesNotExist):
+                sharded.get(patient=self.doctor)
+            self.assertEqual(shard_for(self.patients[0].pk), 'default')
+
+    def test_rolled_back_id_reservation_is_not_reused(self):
+        with override_settings(SHARDING={'SHARDS': ['default'], 'ID_BATCH': 10}):
+            id_allocator.reset()
+            with self.assertRaises(ValueError), transaction.atomic():
+                handed_out = id_allocator.allocate(HealthRecord, 3)
+                raise ValueError
+            self.assertFalse(ShardSequence.objects.filter(name='health.HealthRecord').exists())
+            fresh = id_allocator.allocate(HealthRecord)[0]
+            self.assertGreater(fresh, max(handed_out))
+            self.assertEqual(ShardSequence.objects.get(name='health.HealthRecord').next_id, fresh + 10)
+
+
+@unittest.skipUnless(len(settings.SHARDING['SHARDS']) > 1, 'Run with TELEMED_SHARDS=2 (or more) for several shard databases')
+class MultiShardTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        id_allocator.reset()
+        self.doctor = make_doctor()
+        self.patients = [make_patient(f'p{i:02d}') for i in range(12)]
+        self.assertGreater(len({shard_for(patient.pk) for patient in self.patients}), 1)
+        self.client = APIClient()
+
+    def tearDown(self):
+        audit_log.clear()
+
+    def book(self, hours_ahead):
+        now = timezone.now()
+        for i, patient in enumerate(self.patients):
+            self.client.force_authenticate(patient)
+            response = self.client.post('/api/appointments/', {
+                'patient_id': patient.pk, 'doctor_id': self.doctor.pk,
+                'appointment_time': (now + timedelta(hours=hours_ahead + i)).isoformat(),
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+            HealthRecord.objects.create(patient=patient, heart_rate=60 + i)
+
+    def counts(self):
+        return {alias: (Appointment.objects.using(alias).count(), HealthRecord.objects.using(alias).count())
+                for alias in settings.SHARDING['SHARDS']}
+
+    def test_rows_on_patient_shard_and_doctor_reads_gathered(self):
+        self.book(1)
+        for patient in self.patients:
+            self.assertEqual(Appointment.objects.for_patient(patient.pk).count(), 1)
+            self.assertEqual(HealthRecord.objects.for_patient(patient.pk).count(), 1)
+        ids = [pk for alias in settings.SHARDING['SHARDS'] for pk in Appointment.objects.using(alias).values_list('pk', flat=True)]
+        self.assertEqual(len(set(ids)), 12) # Ids come from one allocator, not per-shard auto-increment
+
+        self.client.force_authenticate(self.doctor)
+        appointments = self.client.get('/api/appointments/').data
+        self.assertEqual([a['patient_name'] for a in appointments], [p.get_full_name() for p in reversed(self.patients)])
+        vitals = self.client.get('/api/vitals/').data
+        self.assertEqual([v['heart_rate'] for v in vitals], list(range(60, 72)))
+        self.assertEqual(len(self.client.get('/api/doctor/patients/').data), 12)
+        far = next(p for p in self.patients if shard_for(p.pk) != 'default')
+        appointment = Appointment.objects.for_patient(far.pk).get()
+        response = self.client.post(f'/api/appointments/{appointment.pk}/complete/', {'consultation_notes': 'ok'}, format='json')
+        self.assertEqual(response.data['status'], 'COMPLETED')
+
+        self.client.force_authenticate(far)
+        self.assertEqual(len(self.client.get('/api/vitals/').data), 1)
+        self.assertEqual(self.client.get(f'/api/patients/{far.pk}/timeline/').status_code, 200)
+
+    def test_reshard_drains_and_refills_shards(self):
+        self.book(1)
+        spread = self.counts()
+        sharding = settings.SHARDING
+        with override_settings(SHARDING={**sharding, 'SHARDS': ['default']}):
+            call_command('reshard', *[f'--from={alias}' for alias in sharding['SHARDS'][1:]], stdout=StringIO())
+        self.assertEqual(self.counts()['default'], (12, 12))
+        call_command('reshard', stdout=StringIO())
+        self.assertEqual(self.counts(), spread)
+        self.client.force_authenticate(self.doctor)
+        self.assertEqual(len(self.client.get('/api/appointments/').data), 12)
+
+    def test_background_jobs_cover_every_shard(self):
+        self.book(1)
+        far = next(p for p in self.patients[1:] if shard_for(p.pk) != 'default')
+        now = timezone.now()
+
+        notifier = RecordingNotifier()
+        scheduler = ReminderScheduler(notifier=notifier, lead_hours=[1])
+        self.assertEqual(scheduler.load(), 12)
+        moved = Appointment.objects.for_patient(far.pk).get()
+        moved.appointment_time = now + timedelta(minutes=30)
+        moved.save() # A change feed entry for a row on another shard: rescheduled, not dropped
+        self.assertEqual(scheduler.step(), 2)
+        self.assertIn((moved.pk, 60), notifier.sent)
+
+        Appointment.objects.bulk_create([Appointment(patient=p, doctor=self.doctor, appointment_time=now - timedelta(days=1))
+                                         for p in self.patients])
+        self.assertEqual(transition(stale_scheduled(), Appointment.StatusChoices.EXPIRED).updated, 12)
+
+        HealthRecord.objects.bulk_create([HealthRecord(patient=p, heart_rate=70, record_time=now - timedelta(days=500))
+                                          for p in self.patients])
+        call_command('archive_vitals', stdout=StringIO())
+        self.assertEqual(ArchivedVitalsChunk.objects.count(), 12)
+        self.assertEqual(sum(hot for _, hot in self.counts().values()), 12)
+
+        record = HealthRecord.objects.create(patient=far, heart_rate=90, notes='Migraine since noon')
+        self.assertEqual([r['id'] for r in search(far, 'migraine')], [record.pk])
+        self.assertEqual([r['id'] for r in search(self.doctor, 'migraine')], [record.pk])
+
+    def test_move_keeps_rows_whose_id_is_taken_on_target(self):
+        far = next(p for p in self.patients if shard_for(p.pk) != 'default')
+        other = next(p for p in self.patients if p != far)
+        target = shard_for(far.pk)
+        record = HealthRecord.objects.using('default').create(patient=far, heart_rate=70)
+        HealthRecord.objects.using(target).create(pk=record.pk, patient=other, heart_rate=99)
+        with self.assertRaises(ShardMoveConflict):
+            move_patients([far.pk], 'default', target)
+        self.assertTrue(HealthRecord.objects.using('default').filter(pk=record.pk).exists())
+        with self.assertRaises(CommandError):
+            call_command('reshard', stdout=StringIO())
+
+        # A copy left by an interrupted move is the same patient's row: the source one goes
+        HealthRecord.objects.using(target).filter(pk=record.pk).update(patient=far)
+        self.assertEqual(move_patients([far.pk], 'default', target), 1)
+        self.assertFalse(HealthRecord.objects.using('default').filter(pk=record.pk).exists())
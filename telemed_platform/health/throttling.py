@@ -0,0 +1,248 @@
+# health/throttling.py
+"""
+Token-bucket throttles for the expensive auth endpoints and vitals ingest, plus
+an adaptive concurrency limiter that sheds load before workers saturate.
+
+Rates use DRF's ``DEFAULT_THROTTLE_RATES`` ("capacity/period"): the bucket holds
+``capacity`` tokens and refills at ``capacity / period`` tokens per second.
+Bucket state lives in-process by default; set ``THROTTLING['STORE'] = 'cache'``
+to share it across workers through Django's cache.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DEFAULTS = {
+    'STORE': 'local',            # 'local' (per process) or 'cache' (Django cache, shared)
+    'CACHE_ALIAS': 'default',
+    'LOCAL_MAX_KEYS': 100_000,   # Buckets kept in memory before idle ones are evicted
+    'DEVICE_HEADER': 'HTTP_X_DEVICE_ID',
+    # Adaptive concurrency limiter
+    'SHED_PATH_PREFIXES': ('/api/',),
+    'MAX_IN_FLIGHT': 64,         # Hard ceiling on concurrent requests per process
+    'MIN_IN_FLIGHT': 4,          # Limit never adapts below this
+    'P95_LATENCY_MS': 1500,      # Shrink the limit while p95 is above this
+    'LATENCY_WINDOW': 200,       # Number of recent requests used for p95
+    'SHED_RETRY_AFTER': 1,       # Seconds suggested to shed clients
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def throttling_setting(name):
+    return getattr(settings, 'THROTTLING', {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60). Same format as DRF's SimpleRateThrottle."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+# --- Bucket Stores ---
+
+class LocalBucketStore:
+    """
+    In-process buckets. When the store grows past LOCAL_MAX_KEYS, buckets that
+    have been idle long enough to refill completely are dropped; a fresh bucket
+    is full, so eviction never changes a decision.
+    """
+    def __init__(self):
+        self._buckets = {}  # key -> [tokens, last_refill, full_after]
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_per_sec, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= throttling_setting('LOCAL_MAX_KEYS'):
+                    self._evict_idle(now)
+                bucket = self._buckets[key] = [float(capacity), now, now]
+            allowed, wait = _take(bucket, capacity, refill_per_sec, now)
+            bucket[2] = now + (capacity - bucket[0]) / refill_per_sec
+            return allowed, wait
+
+    def _evict_idle(self, now):
+        idle = [key for key, bucket in self._buckets.items() if bucket[2] <= now]
+        for key in idle:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in a Django cache shared by all workers. Read-modify-write is not
+    atomic, so concurrent bursts may slightly exceed the rate.
+    """
+    def consume(self, key, capacity, refill_per_sec, now=None):
+        now = time.time() if now is None else now
+        cache = caches[throttling_setting('CACHE_ALIAS')]
+        cache_key = f'throttle:{key}'
+        tokens, last = cache.get(cache_key, (float(capacity), now))
+        bucket = [tokens, last]
+        allowed, wait = _take(bucket, capacity, refill_per_sec, now)
+        # Expire once the bucket would be full again
+        cache.set(cache_key, (bucket[0], bucket[1]), timeout=int(capacity / refill_per_sec) + 1)
+        return allowed, wait
+
+    def clear(self):
+        pass
+
+
+def _take(bucket, capacity, refill_per_sec, now):
+    """Refill ``bucket`` up to ``now`` and try to take one token. Returns (allowed, wait seconds)."""
+    tokens = min(float(capacity), bucket[0] + (now - bucket[1]) * refill_per_sec)
+    bucket[1] = now
+    if tokens >= 1:
+        bucket[0] = tokens - 1
+        return True, 0.0
+    bucket[0] = tokens
+    return False, (1 - tokens) / refill_per_sec
+
+
+local_store = LocalBucketStore()
+cache_store = CacheBucketStore()
+
+
+def get_store():
+    return cache_store if throttling_setting('STORE') == 'cache' else local_store
+
+
+# --- Throttles ---
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base token-bucket throttle. Subclasses set ``scope`` and implement
+    ``get_ident_key``; returning None means the throttle does not apply.
+    DRF turns a refusal into 429 with a ``Retry-After`` header from ``wait()``.
+    """
+    scope = None
+
+    def __init__(self):
+        self._wait = None
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        ident = self.get_ident_key(request, view)
+        if rate is None or ident is None:
+            return True
+        capacity, period = parse_rate(rate)
+        allowed, self._wait = get_store().consume(f'{self.scope}:{ident}', capacity, capacity / period)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserThrottle(TokenBucketThrottle):
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class DeviceThrottle(TokenBucketThrottle):
+    """Keyed by the ``X-Device-Id`` header sent by monitoring devices."""
+    def get_ident_key(self, request, view):
+        return request.META.get(throttling_setting('DEVICE_HEADER')) or None
+
+
+class LoginRateThrottle(IPThrottle):
+    scope = 'login'
+
+class RegisterRateThrottle(IPThrottle):
+    scope = 'register'
+
+class VitalsUserRateThrottle(UserThrottle):
+    scope = 'vitals_user'
+
+class VitalsDeviceRateThrottle(DeviceThrottle):
+    scope = 'vitals_device'
+
+
+# --- Adaptive Concurrency Limiter ---
+
+class ConcurrencyLimiter:
+    """
+    AIMD limit on in-flight requests: the limit shrinks by 10% whenever the p95
+    of recent latencies is over budget and grows by one while it is under.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.in_flight = 0
+        self.limit = throttling_setting('MAX_IN_FLIGHT')
+        self.latencies = deque(maxlen=throttling_setting('LATENCY_WINDOW'))
+        self._completed = 0
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency_ms):
+        with self._lock:
+            self.in_flight -= 1
+            self.latencies.append(latency_ms)
+            self._completed += 1
+            # Re-evaluate every few requests rather than sorting the window each time
+            if self._completed % 10 == 0:
+                self._adapt()
+
+    def p95(self):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _adapt(self):
+        if self.p95() > throttling_setting('P95_LATENCY_MS'):
+            self.limit = max(throttling_setting('MIN_IN_FLIGHT'), int(self.limit * 0.9))
+        else:
+            self.limit = min(throttling_setting('MAX_IN_FLIGHT'), self.limit + 1)
+
+
+limiter = ConcurrencyLimiter()
+
+
+class LoadSheddingMiddleware:
+    """Reject API requests with 503 once the adaptive in-flight limit is reached."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(tuple(throttling_setting('SHED_PATH_PREFIXES'))):
+            return self.get_response(request)
+
+        if not limiter.try_acquire():
+            response = JsonResponse({'detail': 'Server is busy, please retry shortly.'}, status=503)
+            response['Retry-After'] = str(throttling_setting('SHED_RETRY_AFTER'))
+            return response
+
+        started = time.monotonic()
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release((time.monotonic() - started) * 1000)
@@ -0,0 +1,121 @@
+# health/timeline.py
+"""
+Patient timeline: appointments and vitals readings in one newest-first feed.
+
+Each source is an index-ordered query limited to ``page_size + 1`` rows past
+the cursor (appointments on (patient, appointment_time), hot vitals on
+(patient, record_time), archived vitals one chunk at a time), and the page is
+produced by a lazy k-way ``heapq.merge`` over them. A page therefore never
+reads more than ``page_size + 1`` rows per source, however long the history.
+
+Entries are ordered by (time, kind, id) descending; the cursor is that key of
+the last entry returned.
+"""
+import base64
+import heapq
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+from .archive import archived_chunks, chunk_records
+from .models import Appointment, HealthRecord
+from .sharding import shard_queryset
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+KIND_VITALS = 0
+KIND_APPOINTMENT = 1
+
+APPOINTMENT_EVENTS = {
+    Appointment.StatusChoices.SCHEDULED: 'booked',
+    Appointment.StatusChoices.COMPLETED: 'completed',
+    Appointment.StatusChoices.CANCELLED: 'cancelled',
+    Appointment.StatusChoices.RESCHEDULED: 'rescheduled',
+    Appointment.StatusChoices.EXPIRED: 'expired',
+}
+
+
+# --- Cursor ---
+
+def encode_cursor(key):
+    when, kind, pk = key
+    raw = json.dumps([(when - EPOCH) // MICROSECOND, kind, pk]).encode() # Exact, unlike float timestamps
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(value):
+    """Cursor string -> (datetime, kind, id); raises ValueError if malformed."""
+    try:
+        micros, kind, pk = json.loads(base64.urlsafe_b64decode(value.encode()))
+        return EPOCH + int(micros) * MICROSECOND, int(kind), int(pk)
+    except (TypeError, ValueError, OverflowError) as exc: # JSONDecodeError and binascii.Error are ValueErrors
+        raise ValueError('Invalid cursor.') from exc
+
+
+def _before_cursor(time_field, kind, cursor):
+    """Q for rows of ``kind`` that sort strictly after ``cursor`` in (time, kind, id) descending order."""
+    when, cursor_kind, cursor_pk = cursor
+    q = Q(**{f'{time_field}__lt': when})
+    if kind < cursor_kind:
+        q |= Q(**{time_field: when})
+    elif kind == cursor_kind:
+        q |= Q(**{time_field: when, 'pk__lt': cursor_pk})
+    return q
+
+
+# --- Sources (each yields (key, object) newest first) ---
+
+def _appointments(patient, cursor, limit):
+    queryset = shard_queryset(Appointment.objects.filter(patient=patient).select_related('doctor'), [patient.pk])
+    if cursor:
+        queryset = queryset.filter(_before_cursor('appointment_time', KIND_APPOINTMENT, cursor))
+    for appointment in queryset.order_by('-appointment_time', '-pk')[:limit].iterator():
+        appointment.patient = patient
+        yield (appointment.appointment_time, KIND_APPOINTMENT, appointment.pk), appointment
+
+
+def _vitals(patient, cursor, limit):
+    queryset = HealthRecord.objects.for_patient(patient.pk)
+    if cursor:
+        queryset = queryset.filter(_before_cursor('record_time', KIND_VITALS, cursor))
+    for record in queryset.order_by('-record_time', '-pk')[:limit].iterator():
+        record.patient = patient
+        yield (record.record_time, KIND_VITALS, record.pk), record
+
+
+def _archived_vitals(patient, cursor, limit):
+    chunks = archived_chunks([patient.pk], end=None)
+    if cursor:
+        chunks = chunks.filter(first_time__lte=cursor[0])
+    yielded = 0
+    # Chunks are decoded one at a time, only as far as the merge consumes them
+    for chunk in chunks.order_by('-first_time').iterator():
+        records = chunk_records(chunk, {patient.pk: patient})
+        records.sort(key=lambda r: (r.record_time, r.pk), reverse=True)
+        for record in records:
+            key = (record.record_time, KIND_VITALS, record.pk)
+            if cursor and not key < cursor:
+                continue
+            yield key, record
+            yielded += 1
+            if yielded >= limit:
+                return
+
+
+def timeline_page(patient, cursor=None, page_size=50):
+    """Return (entries, next_cursor); entries are ((time, kind, id), object) newest first."""
+    merged = heapq.merge(
+        _appointments(patient, cursor, page_size + 1),
+        _vitals(patient, cursor, page_size + 1),
+        _archived_vitals(patient, cursor, page_size + 1),
+        key=lambda item: item[0],
+        reverse=True,
+    )
+    page = []
+    for key, obj in merged:
+        if len(page) == page_size:
+            return page, encode_cursor(page[-1][0])
+        page.append((key, obj))
+    return page, None
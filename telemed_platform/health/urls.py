@@ -2,16 +2,21 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     RegisterView,
+    LoginView,
+    LogoutView,
     UserProfileView,
     HealthRecordViewSet,
     AppointmentViewSet,
     DoctorPatientListView,
     DoctorListView,
+    PatientTimelineView,
+    PatientAccessLogView,
+    SearchView,
+    BatchView,
+    BootstrapView,
+    UserImportView,
 )
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -22,16 +27,31 @@ router.register(r'appointments', AppointmentViewSet, basename='appointment')
 urlpatterns = [
     # Auth
     path('register/', RegisterView.as_view(), name='auth_register'),
-    path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'), # JWT Login
-    path('login/refresh/', TokenRefreshView.as_view(), name='token_refresh'), # JWT Refresh
+    path('login/', LoginView.as_view(), name='token_obtain_pair'), # JWT Login (throttled)
+    path('login/refresh/', TokenRefreshView.as_view(), name='token_refresh'), # JWT Refresh (serializer set in SIMPLE_JWT)
+    path('logout/', LogoutView.as_view(), name='auth_logout'), # Revoke tokens
 
     # Profile
     path('profile/', UserProfileView.as_view(), name='user_profile'),
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'), # Dashboard initial state in one request
 
     # Doctors
     path('doctors/', DoctorListView.as_view(), name='doctor_list'), # List available doctors
     path('doctor/patients/', DoctorPatientListView.as_view(), name='doctor_patient_list'), # Doctor's patient list
 
+    # Patients
+    path('patients/<int:patient_id>/timeline/', PatientTimelineView.as_view(), name='patient_timeline'), # Merged appointments + vitals
+    path('patients/<int:patient_id>/access-log/', PatientAccessLogView.as_view(), name='patient_access_log'), # Who read this patient's data
+
+    # Search
+    path('search/', SearchView.as_view(), name='search'), # Full-text search over notes and reasons
+
+    # Staff
+    path('admin/import/', UserImportView.as_view(), name='user_import'), # Bulk onboarding (CSV/NDJSON)
+
+    # Batch
+    path('batch/', BatchView.as_view(), name='batch'), # Several API calls in one round trip
+
     # ViewSet routes
     path('', include(router.urls)), # Includes /vitals/ and /appointments/
 
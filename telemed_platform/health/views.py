@@ -1,32 +1,94 @@
 # health/views.py
+import hashlib
+import json
+from types import SimpleNamespace
+
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
-from django.db.models import Q # For complex lookups (optional here)
+from django.http import Http404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
 
 from rest_framework import generics, permissions, status, viewsets, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied # Import PermissionDenied
+from rest_framework.utils.encoders import JSONEncoder
 
-from .models import UserProfile, Appointment, HealthRecord, Role, DoctorProfile, PatientProfile
+from .models import UserProfile, Appointment, HealthRecord, Role, DoctorProfile, PatientProfile, AccessLog
 from .serializers import (
     RegisterSerializer, UserSerializer, UserProfileSerializer,
     AppointmentSerializer, HealthRecordSerializer, AppointmentListSerializer,
-    DoctorPatientSerializer
+    DoctorPatientSerializer, LogoutSerializer, SparseFieldsetMixin, AccessLogSerializer
 )
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .permissions import IsDoctor, IsPatient, IsOwnerOrDoctorReadOnly, IsPatientOwner, IsAppointmentParticipantOrReadOnly # Import custom permissions
+from .revocation import revocations
+from .idempotency import idempotent
+from .audit import AuditedReadMixin, access_history, record_reads
+from .sharding import doctor_patient_ids, shard_queryset
+from .throttling import LoginRateThrottle, RegisterRateThrottle, VitalsUserRateThrottle, VitalsDeviceRateThrottle
+# health.archive, health.timeline and health.search are imported inside the views that use them,
+# keeping worker boot light (health.startup.preload() loads them up front in a preforking master)
 
 # --- API Views ---
 
+def sparse_queryset(queryset, serializer_class, request, always=()):
+    """
+    Restrict SELECTed columns to what ?fields= asks the serializer to render (see SparseFieldsetMixin),
+    plus the ``always`` columns the view itself needs.
+    """
+    requested = SparseFieldsetMixin.requested_fields(request)
+    if requested is None:
+        return queryset
+    columns = serializer_class.columns_for(requested)
+    if columns is None: # Unknown field (the serializer reports it) or one we can't map to columns
+        return queryset
+    columns += always
+    relations = {path.rsplit('__', 1)[0] for path in columns if '__' in path}
+    return queryset.select_related(None).select_related(*relations).only(*columns)
+
+
+def parse_range_param(request, name):
+    """Optional ISO 8601 datetime query parameter (naive values are taken as local time)."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise serializers.ValidationError({name: 'Expected an ISO 8601 datetime.'})
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
 # Registration View
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,) # Anyone can register
     serializer_class = RegisterSerializer
+    throttle_classes = [RegisterRateThrottle] # Password hashing is expensive, limit per IP
+
+# Login View (SimpleJWT's view, throttled per IP)
+class LoginView(TokenObtainPairView):
+    throttle_classes = [LoginRateThrottle]
+
+# Logout View (Revoke refresh + current access token, or every token of the user)
+class LogoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = LogoutSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
 
-# Login View (Using SimpleJWT's default view via urls.py)
+        revocations.revoke_token(serializer.validated_data['refresh'])
+        if request.auth is not None:
+            revocations.revoke_token(request.auth)
+        if serializer.validated_data['all_devices']:
+            # Watermark covers every token issued before this second (see health/revocation.py)
+            revocations.revoke_user_tokens(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 # User Profile View (Get/Update current user's profile)
 class UserProfileView(generics.RetrieveUpdateAPIView):
@@ -60,13 +122,22 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 
 # Health Record ViewSet
-class HealthRecordViewSet(viewsets.ModelViewSet):
+class HealthRecordViewSet(AuditedReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for patients to manage their health records (vitals).
     - Patients can CRUD their own records.
     - Doctors can READ records of patients they have appointments with.
+    Reads by anyone but the patient are recorded in the access log (health/audit.py).
     """
     serializer_class = HealthRecordSerializer
+    audit_resource = AccessLog.Resource.VITALS
+    max_page_size = 500
+
+    def get_throttles(self):
+        # Only ingest is rate limited, keyed by user and by reporting device
+        if self.action == 'create':
+            return [VitalsUserRateThrottle(), VitalsDeviceRateThrottle()]
+        return super().get_throttles()
 
     def get_queryset(self):
         user = self.request.user
@@ -74,14 +145,92 @@ class HealthRecordViewSet(viewsets.ModelViewSet):
              return HealthRecord.objects.none() # No profile, no records
 
         if user.profile.role == Role.PATIENT:
-            # Patients see only their own records, newest first
-            return HealthRecord.objects.filter(patient=user).order_by('-record_time')
+            # Patients see only their own records, newest first (from their shard, see health/sharding.py)
+            return shard_queryset(HealthRecord.objects.filter(patient=user).order_by('-record_time'), [user.id])
         elif user.profile.role == Role.DOCTOR:
-            # Doctors see records of patients they have appointments with
-            patient_ids = Appointment.objects.filter(doctor=user).values_list('patient_id', flat=True).distinct()
-            return HealthRecord.objects.filter(patient_id__in=patient_ids).order_by('patient__username', '-record_time')
+            # Doctors see records of patients they have appointments with, gathered from those patients' shards
+            patient_ids = doctor_patient_ids(user)
+            queryset = HealthRecord.objects.filter(patient_id__in=patient_ids).order_by('patient__username', '-record_time')
+            return shard_queryset(queryset, patient_ids)
         return HealthRecord.objects.none()
 
+    def visible_patient_ids(self):
+        """Patient ids whose records the current user may read (same rules as get_queryset)."""
+        user = self.request.user
+        if not hasattr(user, 'profile'):
+            return []
+        if user.profile.role == Role.PATIENT:
+            return [user.id]
+        elif user.profile.role == Role.DOCTOR:
+            return list(doctor_patient_ids(user))
+        return []
+
+    def visible_patients(self):
+        """{id: User} of the patients whose records the current user may read, in list order (doctors: by username)."""
+        user = self.request.user
+        if user.profile.role == Role.PATIENT:
+            return {user.id: user}
+        patients = User.objects.filter(pk__in=self.visible_patient_ids()).order_by('username')
+        return {patient.pk: patient for patient in patients}
+
+    def list(self, request, *args, **kwargs):
+        """
+        Hot-table records plus archived ones (health/archive.py), newest first (doctors: by patient username first).
+        Optional ?start=/&end= (ISO datetimes) limit the range and which archive chunks are read.
+        With ?page_size= the response is one page, {'next': url, 'results': [...]}: it reads at most
+        page_size + 1 hot rows and decodes only the archive chunks that page reaches.
+        """
+        from .archive import decode_list_cursor, merged_records
+
+        start = parse_range_param(request, 'start')
+        end = parse_range_param(request, 'end')
+        try:
+            cursor = decode_list_cursor(request.query_params['cursor']) if request.query_params.get('cursor') else None
+            page_size = min(int(request.query_params['page_size']), self.max_page_size) if request.query_params.get('page_size') else None
+        except ValueError:
+            return Response({'detail': 'Invalid cursor or page_size.'}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size is not None and page_size < 1:
+            return Response({'detail': 'Invalid cursor or page_size.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = sparse_queryset(self.filter_queryset(self.get_queryset()), self.get_serializer_class(), request, always=['patient', 'record_time']) # The merge orders by record_time
+        if start:
+            queryset = queryset.filter(record_time__gte=start)
+        if end:
+            queryset = queryset.filter(record_time__lt=end)
+        patients = self.visible_patients() if hasattr(request.user, 'profile') else {}
+        try:
+            records, next_cursor = merged_records(queryset, patients, start, end, cursor, page_size)
+        except ValueError: # Cursor on a patient this user can't see (any more)
+            return Response({'detail': 'Invalid cursor or page_size.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = self.get_serializer(records, many=True).data
+        if page_size is None:
+            return Response(data)
+        next_url = None
+        if next_cursor:
+            params = request.query_params.copy()
+            params['cursor'] = next_cursor
+            next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+        return Response({'next': next_url, 'results': data})
+
+    def retrieve(self, request, *args, **kwargs):
+        # Archived records are read-only and only reachable through retrieve/list
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            from .archive import get_archived_record
+
+            pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+            record = get_archived_record(int(pk), self.visible_patient_ids()) if str(pk).isdigit() else None
+            if record is None:
+                raise
+            self.check_object_permissions(request, record)
+            return Response(self.get_serializer(record).data)
+
+    @idempotent # Retried uploads replay the first response instead of adding a duplicate reading
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         # Only allow patients to create records for themselves
         if self.request.user.profile.role == Role.PATIENT:
@@ -111,14 +260,16 @@ class HealthRecordViewSet(viewsets.ModelViewSet):
 
 
 # Appointment ViewSet
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(AuditedReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing appointments.
     - Patients can list their own appointments and create new ones.
     - Doctors can list their own appointments and update status/notes.
     - Both can cancel scheduled appointments they are part of.
+    Reads by anyone but the patient are recorded in the access log (health/audit.py).
     """
     permission_classes = [permissions.IsAuthenticated] # Base permission
+    audit_resource = AccessLog.Resource.APPOINTMENTS
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -135,14 +286,21 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         # Prefetch related user details for efficiency
         base_queryset = Appointment.objects.select_related('patient__profile', 'doctor__profile')
 
+        if self.action == 'list':
+            base_queryset = sparse_queryset(base_queryset, AppointmentListSerializer, self.request, always=['patient'])
+
         if user.profile.role == Role.PATIENT:
-            # Patients see their appointments, ordered by time
-            return base_queryset.filter(patient=user).order_by('-appointment_time')
+            # Patients see their appointments, ordered by time (from their shard, see health/sharding.py)
+            return shard_queryset(base_queryset.filter(patient=user).order_by('-appointment_time'), [user.id])
         elif user.profile.role == Role.DOCTOR:
-            # Doctors see their assigned appointments, ordered by time
-            return base_queryset.filter(doctor=user).order_by('-appointment_time')
+            # Doctors see their assigned appointments, ordered by time, merged from every shard
+            return shard_queryset(base_queryset.filter(doctor=user).order_by('-appointment_time'))
         return Appointment.objects.none()
 
+    @idempotent # Retried bookings replay the first response instead of booking twice
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """
         Handle appointment creation.
@@ -167,7 +325,8 @@ class AppointmentViewSet(viewsets.ModelViewSet):
 
     # Custom action for doctors to complete appointment and add notes
     @action(detail=True, methods=['post'], permission_classes=[IsDoctor])
-    def complete(self, request, pk=null):
+    @idempotent
+    def complete(self, request, pk=None):
         appointment = self.get_object()
         # Ensure the doctor performing the action is the assigned doctor
         if appointment.doctor != request.user:
@@ -192,6 +351,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
 
     # Custom action for cancelling
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated]) # Both can attempt cancel
+    @idempotent
     def cancel(self, request, pk=None):
         appointment = self.get_object()
         # Check if the user is the patient or the doctor for this appointment
@@ -222,21 +382,248 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     #     return super().get_permissions()
 
 # Doctor's View of Assigned Patients
-class DoctorPatientListView(generics.ListAPIView):
+class DoctorPatientListView(AuditedReadMixin, generics.ListAPIView):
     """
     API endpoint for doctors to view a list of patients they have appointments with.
+    Each listed patient gets an access log entry (health/audit.py).
     """
     serializer_class = DoctorPatientSerializer
     permission_classes = [permissions.IsAuthenticated, IsDoctor] # Only doctors
+    audit_resource = AccessLog.Resource.PATIENT_LIST
+    audit_patient_field = 'id' # The listed objects are the patients themselves
 
     def get_queryset(self):
         doctor = self.request.user
-        # Get distinct patient IDs from appointments assigned to this doctor (any status)
-        patient_ids = Appointment.objects.filter(doctor=doctor).values_list('patient_id', flat=True).distinct()
+        # Get distinct patient IDs from appointments assigned to this doctor (any status, on any shard)
+        patient_ids = doctor_patient_ids(doctor)
         # Return User objects for these patients, optimizing with profile details
-        return User.objects.filter(
+        queryset = User.objects.filter(
             id__in=patient_ids, profile__role=Role.PATIENT
         ).select_related('profile').order_by('first_name', 'last_name')
+        return sparse_queryset(queryset, DoctorPatientSerializer, self.request)
+
+# Patient Timeline (appointments + vitals, newest first, cursor paginated)
+class PatientTimelineView(generics.GenericAPIView):
+    """
+    GET /api/patients/{id}/timeline/?cursor=&page_size=
+    Visible to the patient and to doctors with an appointment with them (IsOwnerOrDoctorReadOnly).
+    Consultation notes are only included for the patient and the appointment's own doctor.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrDoctorReadOnly]
+    default_page_size = 50
+    max_page_size = 200
+
+    def get(self, request, patient_id):
+        from .timeline import timeline_page, decode_cursor
+
+        patient = get_object_or_404(User.objects.select_related('profile'), pk=patient_id, profile__role=Role.PATIENT)
+        # IsOwnerOrDoctorReadOnly checks obj.patient, so check against a stand-in owned by this patient
+        self.check_object_permissions(request, SimpleNamespace(patient=patient))
+
+        try:
+            cursor = decode_cursor(request.query_params['cursor']) if request.query_params.get('cursor') else None
+            page_size = min(int(request.query_params.get('page_size', self.default_page_size)), self.max_page_size)
+        except ValueError:
+            return Response({'detail': 'Invalid cursor or page_size.'}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size < 1:
+            return Response({'detail': 'Invalid cursor or page_size.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries, next_cursor = timeline_page(patient, cursor, page_size)
+        for model, resource in ((HealthRecord, AccessLog.Resource.VITALS), (Appointment, AccessLog.Resource.APPOINTMENTS)):
+            if any(isinstance(obj, model) for _, obj in entries):
+                record_reads(request, resource, [patient.id])
+        next_url = None
+        if next_cursor:
+            next_url = request.build_absolute_uri(f'{request.path}?cursor={next_cursor}&page_size={page_size}')
+        return Response({
+            'next': next_url,
+            'results': [self.serialize_entry(key, obj) for key, obj in entries],
+        })
+
+    def serialize_entry(self, key, obj):
+        from .timeline import APPOINTMENT_EVENTS, KIND_APPOINTMENT
+
+        when, kind, pk = key
+        if kind == KIND_APPOINTMENT:
+            data = AppointmentListSerializer(obj).data
+            if obj.consultation_notes and self.request.user.id in (obj.patient_id, obj.doctor_id):
+                data['consultation_notes'] = obj.consultation_notes
+            return {'type': 'appointment', 'event': APPOINTMENT_EVENTS.get(obj.status, obj.status.lower()),
+                    'time': data['appointment_time'], 'id': pk, 'data': data}
+        data = HealthRecordSerializer(obj).data
+        return {'type': 'vitals', 'event': 'reading', 'time': data['record_time'], 'id': pk, 'data': data}
+
+
+# Several API calls in one round trip (see health/batch.py)
+class BatchView(APIView):
+    """
+    POST /api/batch/ {"requests": [{"id", "method", "path", "body", "headers"}, ...]}
+    Returns {"responses": [{"id", "status", "body"}, ...]} in request order.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        from .batch import BatchError, parse_operations, run_batch
+
+        try:
+            operations = parse_operations(request.data)
+        except BatchError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'responses': run_batch(request, operations)})
+
+
+# Who read a patient's data (the patient themselves, or staff)
+class PatientAccessLogView(generics.ListAPIView):
+    """
+    GET /api/patients/{id}/access-log/?start=&end=
+    Newest first. Entries are buffered briefly before they are written (health/audit.py),
+    so the last second or so of reads may not be listed yet.
+    """
+    serializer_class = AccessLogSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        patient_id = self.kwargs['patient_id']
+        if self.request.user.id != patient_id and not self.request.user.is_staff:
+            raise PermissionDenied("Only the patient or staff can read this access log.")
+        start = parse_range_param(self.request, 'start')
+        end = parse_range_param(self.request, 'end')
+        return access_history(patient_id, start, end)
+
+
+# Bulk onboarding of a clinic's patients and doctors (staff only)
+class UserImportView(APIView):
+    """
+    POST /api/admin/import/?format=csv|ndjson&dry_run=1
+    Body: a multipart upload in `file`, or the raw CSV/NDJSON (Content-Type text/csv or
+    application/x-ndjson). Returns counts and one result per row (see health/importing.py);
+    413 for files above max_rows / max_upload_bytes. Rows must not carry a password: every
+    user gets a set-password token instead.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    # Runs inside a web worker: no password hashing (users get set-password tokens) and small
+    # files only; `manage.py import_users` takes any size and hashes in a process pool
+    max_upload_bytes = 64 * 1024
+    max_rows = 200
+
+    def post(self, request):
+        import io
+        from itertools import islice
+        from .importing import ImportFormatError, UserImporter, decode_lines, guess_format, read_rows
+
+        too_large = Response(
+            {'detail': f'At most {self.max_rows} rows and {self.max_upload_bytes // 1024} KiB per request; '
+                       'use `manage.py import_users` for larger files.'},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        upload = None
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'file': 'Upload the CSV/NDJSON file in this field.'}, status=status.HTTP_400_BAD_REQUEST)
+        size = upload.size if upload else int(request.META.get('CONTENT_LENGTH') or 0)
+        if size > self.max_upload_bytes:
+            return too_large
+        fmt = request.query_params.get('format') or guess_format(upload.name if upload else '', request.content_type)
+        if fmt is None:
+            return Response({'format': 'Pass ?format=csv or ?format=ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+        importer = UserImporter(dry_run=request.query_params.get('dry_run') in ('1', 'true'), passwords=False)
+        try:
+            rows = list(islice(read_rows(decode_lines(upload or io.BytesIO(request.body)), fmt), self.max_rows + 1))
+            if len(rows) > self.max_rows:
+                return too_large
+            results = list(importer.run(rows))
+        except ImportFormatError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': importer.created, 'failed': importer.failed, 'results': results})
+
+
+# Full-text search over the caller's appointment reasons/notes and vitals notes
+class SearchView(APIView):
+    """
+    GET /api/search/?q=&limit=
+    Ranked matches (best first), scoped to what the caller may read (see health/search.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 100
+
+    def get(self, request):
+        from .search import search
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'q': 'This query parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), self.max_limit))
+        except ValueError:
+            return Response({'limit': 'Must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        results = search(request.user, query, limit)
+        for kind, resource in (('vitals', AccessLog.Resource.VITALS), ('appointment', AccessLog.Resource.APPOINTMENTS)):
+            patient_ids = {result['patient_id'] for result in results if result['type'] == kind}
+            if patient_ids:
+                record_reads(request, resource, sorted(patient_ids))
+        return Response({'q': query, 'results': results})
+
+
+# Initial state for the dashboard (one request instead of four)
+class BootstrapView(APIView):
+    """
+    GET /api/bootstrap/
+    The caller's profile and upcoming appointments, plus recent vitals and the doctor list for
+    patients, or the patient list for doctors. Per-user, so cacheable only privately: clients
+    revalidate with If-None-Match and get a 304 while nothing changed.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    upcoming_limit = 5
+    vitals_limit = 5
+
+    def get(self, request):
+        user = request.user
+        profile = get_object_or_404(
+            UserProfile.objects.select_related('user', 'doctor_details', 'patient_details'), user=user
+        )
+        is_doctor = profile.role == Role.DOCTOR
+        upcoming = Appointment.objects.filter(
+            status=Appointment.StatusChoices.SCHEDULED, appointment_time__gte=timezone.now(),
+            **{'doctor' if is_doctor else 'patient': user}
+        ).select_related('patient', 'doctor').order_by('appointment_time')[:self.upcoming_limit]
+        upcoming = list(shard_queryset(upcoming, None if is_doctor else [user.id])) # A doctor's span every shard
+        # No request in the serializer context: ?fields= is for the list endpoints, not this composite
+        data = {
+            'profile': UserProfileSerializer(profile).data,
+            'upcoming_appointments': AppointmentListSerializer(upcoming, many=True, context={}).data,
+        }
+        # Logged as /api/appointments/ and /api/vitals/ would log the same data
+        record_reads(request, AccessLog.Resource.APPOINTMENTS, sorted({a.patient_id for a in upcoming}))
+        if is_doctor:
+            patient_ids = doctor_patient_ids(user)
+            patients = User.objects.filter(
+                id__in=patient_ids, profile__role=Role.PATIENT
+            ).select_related('profile').order_by('first_name', 'last_name')
+            data['patients'] = DoctorPatientSerializer(patients, many=True, context={}).data
+            record_reads(request, AccessLog.Resource.PATIENT_LIST, [patient['id'] for patient in data['patients']])
+        else:
+            vitals = HealthRecord.objects.filter(patient=user).select_related('patient').order_by('-record_time')[:self.vitals_limit]
+            vitals = shard_queryset(vitals, [user.id])
+            doctors = User.objects.filter(profile__role=Role.DOCTOR).order_by('first_name', 'last_name')
+            data['recent_vitals'] = HealthRecordSerializer(vitals, many=True, context={}).data
+            if data['recent_vitals']:
+                record_reads(request, AccessLog.Resource.VITALS, [user.id])
+            data['doctors'] = UserSerializer(doctors, many=True).data
+
+        body = json.dumps(data, cls=JSONEncoder, sort_keys=True).encode()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        # Weak comparison: the compression middleware marks the ETag weak on compressed responses
+        client_etags = {tag.removeprefix('W/') for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))}
+        if etag in client_etags or '*' in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True) # Store, but always revalidate
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
 
 # View to get list of available doctors (for patients booking appointments)
 class DoctorListView(generics.ListAPIView):
@@ -14,4 +14,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'telemed_platform.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
+
+# Serving processes write the access audit log from a background thread (see health/audit.py)
+from health.audit import enable_background
+enable_background()
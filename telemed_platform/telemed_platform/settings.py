@@ -36,6 +36,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # CORS middleware - Place it high, especially before CommonMiddleware
+    'health.throttling.LoadSheddingMiddleware', # Shed API load (503) before workers saturate
+    'health.compression.CompressionMiddleware', # br/gzip for API responses, negotiated via Accept-Encoding
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +78,20 @@ DATABASES = {
     }
 }
 
+# Vitals and appointments sharded by patient (see health/sharding.py). Off while SHARDS is empty;
+# TELEMED_SHARDS=N adds N local SQLite shards (migrate each with `migrate --database shard_N`)
+LOCAL_SHARDS = int(os.environ.get('TELEMED_SHARDS', 0))
+for _n in range(1, LOCAL_SHARDS + 1):
+    DATABASES[f'shard_{_n}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db_shard_{_n}.sqlite3',
+    }
+SHARDING = {
+    'SHARDS': ['default'] + [f'shard_{n}' for n in range(1, LOCAL_SHARDS + 1)] if LOCAL_SHARDS else [],
+    'MAX_WORKERS': 8,
+}
+DATABASE_ROUTERS = ['health.sharding.PatientShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -88,6 +104,28 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing: PBKDF2 cost from PASSWORD_HASHING, other hashers kept to verify legacy hashes
+PASSWORD_HASHERS = [
+    'health.hashing.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Hashing policy (see health/hashing.py). Re-tune with `python manage.py calibrate_hashing`.
+PASSWORD_HASHING = {
+    'PBKDF2_ITERATIONS': 600000,  # Django 4.2 default; hashes are upgraded on login when changed
+    'EXECUTOR': 'thread',         # 'inline', 'thread' or 'process'
+    'MAX_WORKERS': 4,             # Concurrent hashes per worker process
+    'TIMEOUT': 30,
+}
+
+AUTHENTICATION_BACKENDS = [
+    'health.authentication.PooledPasswordBackend', # ModelBackend using the hashing policy
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 LANGUAGE_CODE = 'en-us'
@@ -110,11 +148,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'health.authentication.RevocationAwareJWTAuthentication', # SimpleJWT + in-memory revocation check
+        'health.authentication.BatchSubRequestAuthentication', # /api/batch/ items run as the batch caller
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly', # Allow read-only for unauthenticated users for some endpoints if needed later
-    )
+    ),
+    # Token-bucket rates ("capacity/period") used by health/throttling.py
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '10/min',          # Per IP
+        'register': '5/min',        # Per IP
+        'vitals_user': '120/min',   # Per authenticated user
+        'vitals_device': '60/min',  # Per X-Device-Id header
+    },
+}
+
+# Throttle store and adaptive load shedding (see health/throttling.py for all keys)
+THROTTLING = {
+    'STORE': 'local',           # 'cache' shares buckets across workers via CACHES['default']
+    'MAX_IN_FLIGHT': 64,
+    'MIN_IN_FLIGHT': 4,
+    'P95_LATENCY_MS': 1500,
 }
 
 # Simple JWT Settings
@@ -145,8 +199,61 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+
+    # Reject revoked refresh tokens (see health/revocation.py)
+    'TOKEN_REFRESH_SERIALIZER': 'health.serializers.RevocationAwareTokenRefreshSerializer',
 }
 
+# Token revocation (jti deny-set + per-user watermarks mirrored in memory per worker)
+# The simplejwt blacklist app is not installed; it would query the DB on every request.
+TOKEN_REVOCATION = {
+    'SYNC_INTERVAL': 2.0,        # Max seconds before another worker's revocation takes effect
+    'BLOOM_BITS': 1 << 20,
+    'BLOOM_HASHES': 7,
+    'CLAIMS_CACHE_SIZE': 4096,
+}
+
+# Vitals archive tier (see health/archive.py, `python manage.py archive_vitals`)
+VITALS_ARCHIVE = {
+    'HORIZON_DAYS': 365, # Readings older than this (rounded down to whole months) leave the hot table
+}
+
+# API response compression (see health/compression.py); Brotli is used if the brotli package is installed
+COMPRESSION = {
+    'MIN_SIZE': 1024, # Bytes
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+# POST /api/batch/ (see health/batch.py)
+API_BATCH = {
+    'MAX_OPERATIONS': 20,
+    'MAX_WORKERS': 4, # Threads for concurrent read-only sub-requests
+}
+
+# Idempotency-Key handling for booking/vitals POSTs (see health/idempotency.py)
+IDEMPOTENCY = {
+    'TTL_SECONDS': 24 * 3600, # Retries within this window replay the stored response
+    'LEASE_SECONDS': 30,
+    'WAIT_SECONDS': 1.0,      # A concurrent duplicate waits this long before getting 409
+}
+
+# Access audit log: buffered in memory, inserted in batches (see health/audit.py)
+AUDIT_LOG = {
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,  # Max seconds an event waits before it is written
+    'MAX_BUFFER': 10_000,   # Requests write the buffer themselves beyond this (backpressure)
+}
+
+# Appointment reminders, sent by `python manage.py run_scheduler` (see health/reminders.py)
+REMINDERS = {
+    'LEAD_HOURS': [24, 1],
+    'NOTIFIER': 'health.reminders.LogNotifier', # Local stub: logs instead of sending
+}
+
+# Admin changelists switch to statistics-based counts above this many rows (see health/admin.py)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+
 # CORS Settings (Allow requests from your Vercel frontend)
 # --- IMPORTANT FOR DEPLOYMENT ---
 CORS_ALLOWED_ORIGINS = [
@@ -17,5 +17,9 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'telemed_platform.settings')
 
 application = get_wsgi_application()
 
+# Serving processes write the access audit log from a background thread (see health/audit.py)
+from health.audit import enable_background
+enable_background()
+
 # Note: This file will likely need modification for deployment on PythonAnywhere,
 # as shown in the deployment instructions. This is the default version.
\ No newline at end of file